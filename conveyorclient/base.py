@@ -22,6 +22,7 @@ import abc
 import contextlib
 import hashlib
 import os
+import threading
 
 import six
 
@@ -57,9 +58,15 @@ class Manager(utils.HookableMixin):
     etc.) and provide CRUD operations for them.
     """
     resource_class = None
+    # The methods calling the API, timed and traced when the client has
+    # metrics or a tracer.
+    api_methods = ()
 
     def __init__(self, api):
         self.api = api
+        # NOTE: managers are shared by the threads using a client, keep
+        #       the open completion cache files per thread.
+        self._local = threading.local()
 
     def _list(self, url, response_key, obj_class=None, body=None):
         resp = None
@@ -98,25 +105,11 @@ class Manager(utils.HookableMixin):
         Delete is not handled because listings are assumed to be performed
         often enough to keep the cache reasonably up-to-date.
         """
-        base_dir = utils.env('V2VCLIENT_UUID_CACHE_DIR',
-                             default="~/.conveyorclient")
-
         # NOTE(sirp): Keep separate UUID caches for each username + endpoint
         # pair
         username = utils.env('OS_USERNAME', 'V2V_USERNAME')
         url = utils.env('OS_URL', 'V2V_URL')
-        uniqifier = hashlib.md5(username.encode('utf-8') +
-                                url.encode('utf-8')).hexdigest()
-
-        cache_dir = os.path.expanduser(os.path.join(base_dir, uniqifier))
-
-        try:
-            os.makedirs(cache_dir, 0o755)
-        except OSError:
-            # NOTE(kiall): This is typically either permission denied while
-            #              attempting to create the directory, or the directory
-            #              already exists. Either way, don't fail.
-            pass
+        cache_dir = self._get_cache_dir(username + url)
 
         resource = obj_class.__name__.lower()
         filename = "%s-%s-cache" % (resource, cache_type.replace('_', '-'))
@@ -125,7 +118,7 @@ class Manager(utils.HookableMixin):
         cache_attr = "_%s_cache" % cache_type
 
         try:
-            setattr(self, cache_attr, open(path, mode))
+            setattr(self._local, cache_attr, open(path, mode))
         except IOError:
             # NOTE(kiall): This is typically a permission denied while
             #              attempting to write the cache file.
@@ -134,13 +127,34 @@ class Manager(utils.HookableMixin):
         try:
             yield
         finally:
-            cache = getattr(self, cache_attr, None)
+            cache = getattr(self._local, cache_attr, None)
             if cache:
                 cache.close()
-                delattr(self, cache_attr)
+                delattr(self._local, cache_attr)
+
+    def _get_cache_dir(self, key):
+        """
+        Return the directory holding client-side caches for ``key``.
+
+        The directory is created on demand below
+        env[V2VCLIENT_UUID_CACHE_DIR] (default ~/.conveyorclient).
+        """
+        base_dir = utils.env('V2VCLIENT_UUID_CACHE_DIR',
+                             default="~/.conveyorclient")
+        uniqifier = hashlib.md5(key.encode('utf-8')).hexdigest()
+        cache_dir = os.path.expanduser(os.path.join(base_dir, uniqifier))
+
+        try:
+            os.makedirs(cache_dir, 0o755)
+        except OSError:
+            # NOTE(kiall): This is typically either permission denied while
+            #              attempting to create the directory, or the directory
+            #              already exists. Either way, don't fail.
+            pass
+        return cache_dir
 
     def write_to_completion_cache(self, cache_type, val):
-        cache = getattr(self, "_%s_cache" % cache_type, None)
+        cache = getattr(self._local, "_%s_cache" % cache_type, None)
         if cache:
             cache.write("%s\n" % val)
 
@@ -20,7 +20,12 @@ OpenStack Client interface. Handles the REST calls and responses.
 
 from __future__ import print_function
 
+import copy
+import functools
 import logging
+import threading
+import time
+import weakref
 
 try:
     import urlparse
@@ -39,10 +44,25 @@ except ImportError:
 
 from keystoneclient import access
 from keystoneclient import adapter
+from keystoneclient import exceptions as ks_exceptions
 from keystoneclient.auth.identity import base
 import requests
 from oslo_utils import strutils
-
+from oslo_utils import timeutils
+import six
+
+from conveyorclient.common import balancer
+from conveyorclient.common import circuit_breaker
+from conveyorclient.common import deadline
+from conveyorclient.common import hedging
+from conveyorclient.common import http_cache
+from conveyorclient.common import metrics
+from conveyorclient.common import rate_limit
+from conveyorclient.common import request_log as request_log_mod
+from conveyorclient.common import retry
+from conveyorclient.common import singleflight
+from conveyorclient.common import tracing
+from conveyorclient.common import unix_socket
 from conveyorclient import exceptions
 from conveyorclient import utils
 
@@ -55,6 +75,9 @@ _VALID_VERSIONS = ['v1']
 
 DEFAULT_CONVEYOR_SERVICE_TYPE = 'conveyor'
 
+# Seconds before its expiry at which a token is renewed.
+DEFAULT_TOKEN_RENEWAL_MARGIN = 60
+
 
 def get_conveyor_api_from_url(url):
     scheme, netloc, path, query, frag = urlparse.urlsplit(url)
@@ -69,27 +92,513 @@ def get_conveyor_api_from_url(url):
     raise exceptions.UnsupportedVersion(msg)
 
 
+def _make_circuit_breakers(circuit_breakers):
+    if circuit_breakers is True:
+        return circuit_breaker.CircuitBreakers()
+    return circuit_breakers or None
+
+
+def _make_rate_limiter(rate_limiter):
+    if isinstance(rate_limiter, (int, float)) and rate_limiter > 0:
+        return rate_limit.RateLimiter(rate_limiter)
+    return rate_limiter or None
+
+
+def _make_hedger(hedge_gets):
+    if hedge_gets is True:
+        return hedging.Hedger()
+    return hedge_gets or None
+
+
+def _hedge_rate_limit(client, url):
+    """Return the function hedges wait for client.rate_limiter with.
+
+    Each hedge is one more request to the API, so it takes a token like
+    the first request of the attempt.
+    """
+    if client.rate_limiter is None:
+        return None
+    return lambda: client.rate_limiter.acquire(url)
+
+
+def _make_metrics(registry):
+    if registry is True:
+        return metrics.Registry()
+    return registry or None
+
+
+def _hedge_targets(primary, endpoints):
+    """Return primary followed by the other endpoints to hedge to.
+
+    With a single endpoint the hedge goes to the same URL, where a load
+    balancer may still route it to another replica.
+    """
+    others = [endpoint for endpoint in endpoints if endpoint != primary]
+    return [primary] + (others or [primary])
+
+
+def _make_balancer(load_balancing):
+    if isinstance(load_balancing, six.string_types):
+        return balancer.EndpointPool(load_balancing)
+    return load_balancing or None
+
+
+def _send_to_endpoints(client, url, method, send_to, connection_errors):
+    """Send a request with send_to(endpoint), choosing the endpoint(s).
+
+    The endpoint is picked by client.balancer, if any, and a GET is hedged
+    by client.hedger, if any. A GET failing to connect fails over to the
+    next endpoint. Every send to an endpoint goes through its circuit
+    breaker in client.circuit_breakers, if any, and one whose breaker is
+    open is skipped for the next one.
+    """
+    if client.circuit_breakers is not None:
+        send_to = _guard_with_breakers(client.circuit_breakers, send_to,
+                                       connection_errors)
+    send = send_to
+    if client.hedger is not None and method == 'GET':
+        def send(endpoint):
+            return client.hedger.call(
+                send_to, _hedge_targets(endpoint, client.get_endpoints()),
+                before_hedge=_hedge_rate_limit(client, url))
+
+    if client.balancer is None:
+        return send(client.get_endpoint())
+
+    endpoints = client.get_endpoints()
+    tried = []
+    while True:
+        endpoint = client.balancer.acquire(endpoints, exclude=tried)
+        tried.append(endpoint)
+        ok = None
+        try:
+            result = send(endpoint)
+            ok = True
+            return result
+        except exceptions.ClientException as e:
+            ok = e.code < 500
+            raise
+        except exceptions.CircuitOpen as e:
+            # Nothing was sent, any request may go to the next endpoint.
+            if len(tried) >= len(endpoints):
+                raise
+            client._logger.debug("%s, failing over" % e)
+        except connection_errors as e:
+            ok = False
+            if method != 'GET' or len(tried) >= len(endpoints):
+                raise
+            client._logger.debug("Connection error on %s: %s, failing over"
+                                 % (endpoint + url, e))
+        finally:
+            client.balancer.release(endpoint, ok)
+
+
+def _catalog_regions(catalog, service_type, endpoint_type):
+    """Return the sorted regions having an endpoint of service_type."""
+    endpoints = catalog.get_endpoints(service_type=service_type,
+                                      endpoint_type=endpoint_type)
+    return sorted(set(endpoint.get('region_id') or endpoint.get('region')
+                      for endpoint in endpoints.get(service_type, ())))
+
+
+def _copy_for_region(client, region_name):
+    """Return a shallow copy of client using the endpoint of region_name.
+
+    The copy shares the authentication and the timings of client, but not
+    its caches, which are keyed by path.
+    """
+    region_client = copy.copy(client)
+    region_client.region_name = region_name
+    if client.response_cache is not None:
+        region_client.response_cache = http_cache.ResponseCache(
+            client.response_cache.max_entries,
+            client.response_cache.max_bytes)
+    if client.coalescer is not None:
+        region_client.coalescer = singleflight.SingleFlight()
+    return region_client
+
+
+def _copy_request_kwargs(kwargs):
+    """Copy kwargs so that concurrent sends do not share their headers."""
+    kwargs = dict(kwargs)
+    kwargs['headers'] = dict(kwargs.get('headers') or {})
+    return kwargs
+
+
+def _make_response_cache(size):
+    if not size or size <= 0:
+        return None
+    return http_cache.ResponseCache(max_entries=size)
+
+
+def _conditional_request(cache, key, send, url, method, **kwargs):
+    """Send a request, revalidating GETs against the response cache.
+
+    :param cache: a :class:`http_cache.ResponseCache` or None.
+    :param key: the cache key of the request, usually the full URL.
+    :param send: the function doing the actual request, called with
+                 (url, method, **kwargs) and returning (resp, body).
+    """
+    if cache is None or method != 'GET':
+        return send(url, method, **kwargs)
+
+    headers = kwargs.setdefault('headers', {})
+    headers.update(cache.conditional_headers(key))
+    resp, body = send(url, method, **kwargs)
+    if resp.status_code == 304:
+        body = cache.not_modified(key)
+        if body is not None:
+            return resp, body
+        # The entry was evicted while the request was in flight.
+        headers.pop('If-None-Match', None)
+        headers.pop('If-Modified-Since', None)
+        resp, body = send(url, method, **kwargs)
+    cache.store(key, resp, body)
+    return resp, body
+
+
+def _guard_with_breakers(breakers, send_to, connection_errors):
+    """Wrap send_to(endpoint) so that it reports its outcome to the
+    breaker of the endpoint.
+
+    Connection errors and 5xx answers count as failures, any other answer
+    as a success. The wrapped send_to raises
+    :class:`exceptions.CircuitOpen` without sending anything while the
+    breaker is open.
+    """
+    def guarded_send_to(endpoint):
+        breaker = breakers.get(endpoint)
+        breaker.before_request()
+        try:
+            result = send_to(endpoint)
+        except exceptions.ClientException as e:
+            if e.code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        except connection_errors:
+            breaker.record_failure()
+            raise
+        except Exception:
+            breaker.record_ignored()
+            raise
+        breaker.record_success()
+        return result
+
+    return guarded_send_to
+
+
+def _body_size(body):
+    return len(body) if body else 0
+
+
+def _measure_request(registry, method, send):
+    """Call send(), returning (resp, body), and record the request in
+    registry."""
+    start = time.time()
+    status = metrics.ERROR
+    try:
+        resp, body = send()
+        status = metrics.status_class(resp.status_code)
+        if resp.request is not None:
+            registry.inc('bytes_sent', _body_size(resp.request.body),
+                         method=method)
+        registry.inc('bytes_received', _body_size(resp.content),
+                     method=method)
+        return resp, body
+    finally:
+        registry.observe('request_seconds', time.time() - start,
+                         method=method, status=status)
+
+
+def _observe_request(client, method, url, headers, send):
+    """Send one HTTP request, in a span of client.tracer and recorded in
+    client.metrics, if any.
+
+    :param headers: the headers of the request, the context of the span
+                    is added to them.
+    :param send: function sending the request, returns (resp, body).
+    """
+    if client.metrics is not None:
+        send = functools.partial(_measure_request, client.metrics, method,
+                                 send)
+    if client.tracer is None:
+        return send()
+    with client.tracer.span('HTTP %s' % method,
+                            **{'http.method': method,
+                               'http.url': url}) as span:
+        client.tracer.inject(headers)
+        resp, body = send()
+        span.set_tag('http.status_code', resp.status_code)
+        request_id = tracing.request_id(resp.headers)
+        if request_id:
+            span.set_tag('request_id', request_id)
+        return resp, body
+
+
+def _make_request_log(request_log):
+    if isinstance(request_log, six.string_types):
+        return request_log_mod.RequestLog(request_log)
+    return request_log or None
+
+
+def _log_attempt(request_log, method, url, attempt, retry_state):
+    """Wrap attempt() so that it logs the request in request_log."""
+    def logged_attempt():
+        start = time.time()
+        try:
+            resp, body = attempt()
+        except Exception as e:
+            if request_log.log_errors or request_log.sampled():
+                status = (e.code if isinstance(e, exceptions.ClientException)
+                          else None)
+                request_log.record(method, url, start, time.time() - start,
+                                   status=status, retry=retry_state.retries,
+                                   error=e)
+            raise
+        if request_log.sampled():
+            request_log.record(method, url, start, time.time() - start,
+                               status=resp.status_code, resp=resp,
+                               retry=retry_state.retries)
+        return resp, body
+
+    return logged_attempt
+
+
+def _request_with_retries(client, url, method, attempt, connection_errors,
+                          wrap_connection_errors=False):
+    """Call attempt() until it succeeds or client.retry_policy gives up.
+
+    Retries that would not complete before the deadline of the calling
+    thread are not attempted. Every attempt waits for client.rate_limiter
+    first and is logged to client.request_log, if any.
+
+    :param attempt: function sending the request once, returns
+                    (resp, body) or raises.
+    :param connection_errors: the exceptions raised when the connection
+                              to the server fails.
+    :param wrap_connection_errors: raise :class:`exceptions.ConnectionError`
+                                   instead of the original exception once
+                                   the retries are exhausted.
+    """
+    retry_state = client.retry_policy.start()
+    start_time = time.time()
+    throttled = []
+    if client.request_log is not None:
+        attempt = _log_attempt(client.request_log, method, url, attempt,
+                               retry_state)
+    if client.rate_limiter is not None:
+        send_once = attempt
+
+        def attempt():
+            throttled.append(client.rate_limiter.acquire(url))
+            return send_once()
+
+    try:
+        while True:
+            try:
+                return attempt()
+            except exceptions.ClientException as e:
+                delay = retry_state.next_delay(e.code, e.retry_after)
+                if delay is None or not deadline.allows(delay):
+                    raise
+            except connection_errors as e:
+                client._logger.debug("Connection error: %s" % e)
+                delay = retry_state.next_delay()
+                if delay is None or not deadline.allows(delay):
+                    if wrap_connection_errors:
+                        msg = 'Unable to establish connection: %s' % e
+                        raise exceptions.ConnectionError(msg)
+                    raise
+            client._logger.debug(
+                "Failed attempt(%s of %s), retrying in %.2f seconds" %
+                (retry_state.retries, client.retry_policy.max_attempts - 1,
+                 delay))
+            sleep(delay)
+    finally:
+        if client.timings:
+            client.times.append({'request': "%s %s" % (method, url),
+                                 'start': start_time,
+                                 'end': time.time(),
+                                 'retries': retry_state.retries,
+                                 'throttled': sum(throttled)})
+        if client.metrics is not None and retry_state.retries:
+            client.metrics.inc('retries', retry_state.retries,
+                               method=method)
+
+
+def _coalesce_key(url, method, scope, kwargs):
+    headers = kwargs.get('headers')
+    if headers:
+        headers = tuple(sorted(headers.items()))
+    return (method, url, scope, headers)
+
+
+def _copy_response(result):
+    # Each coalesced caller gets a body of its own to build resources from.
+    resp, body = result
+    return resp, copy.deepcopy(body)
+
+
 class SessionClient(adapter.LegacyJsonAdapter):
 
     def __init__(self, **kwargs):
         kwargs.setdefault('user_agent', 'python-conveyorclient')
         kwargs.setdefault('service_type', DEFAULT_CONVEYOR_SERVICE_TYPE)
+        self.response_cache = _make_response_cache(
+            kwargs.pop('response_cache_size',
+                       http_cache.DEFAULT_MAX_ENTRIES))
+        if kwargs.pop('coalesce_requests', False):
+            self.coalescer = singleflight.SingleFlight(copy=_copy_response)
+        else:
+            self.coalescer = None
+        self._auth_lock = threading.RLock()
+        retries = kwargs.pop('retries', None)
+        self.retry_policy = (kwargs.pop('retry_policy', None) or
+                             retry.RetryPolicy.from_retries(retries))
+        self.timings = kwargs.pop('timings', False)
+        self.times = []
+        self.circuit_breakers = _make_circuit_breakers(
+            kwargs.pop('circuit_breakers', None))
+        self.request_deadline = kwargs.pop('request_deadline', None)
+        self.rate_limiter = _make_rate_limiter(
+            kwargs.pop('rate_limiter', None))
+        self.hedger = _make_hedger(kwargs.pop('hedge_gets', None))
+        self.balancer = _make_balancer(kwargs.pop('load_balancing', None))
+        self.endpoints = kwargs.pop('endpoints', None)
+        self.metrics = _make_metrics(kwargs.pop('metrics', None))
+        self.tracer = kwargs.pop('tracer', None)
+        self.request_log = _make_request_log(kwargs.pop('request_log', None))
+        cassette = kwargs.pop('cassette', None)
+        self._logger = logging.getLogger(__name__)
         super(SessionClient, self).__init__(**kwargs)
+        # Accept http+unix endpoints, eg: as endpoint_override.
+        unix_socket.mount(self.session.session)
+        if cassette is not None:
+            cassette.mount(self.session.session)
 
     def request(self, *args, **kwargs):
         kwargs.setdefault('authenticated', False)
         raise_exc = kwargs.pop('raise_exc', True)
-        resp, body = super(SessionClient, self).request(*args,
-                                                        raise_exc=False,
-                                                        **kwargs)
+        timeout = deadline.timeout(kwargs.get('timeout',
+                                              self.session.timeout))
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        if self.tracer is not None:
+            # The context of the span of each request is added to them.
+            kwargs['headers'] = dict(kwargs.get('headers') or {})
+        try:
+            resp, body = self._send(*args, **kwargs)
+        except ks_exceptions.RequestTimeout:
+            # Timed out because the deadline was reached.
+            deadline.check()
+            raise
         if raise_exc and resp.status_code >= 400:
             raise exceptions.from_response(resp, body)
         return resp, body
 
+    def _send(self, url, method, **kwargs):
+        def send():
+            return _observe_request(
+                self, method, url, kwargs.get('headers'),
+                functools.partial(super(SessionClient, self).request, url,
+                                  method, raise_exc=False, **kwargs))
+
+        if kwargs['authenticated'] and kwargs.pop('allow_reauth', True):
+            # NOTE: the session would invalidate the token in every thread
+            #       that gets a 401, reauthenticate here once instead.
+            token = self._get_token()
+            kwargs['allow_reauth'] = False
+            resp, body = send()
+            if resp.status_code == 401:
+                self._refresh_token(token)
+                resp, body = send()
+        else:
+            resp, body = send()
+        return resp, body
+
     def _cs_request(self, url, method, **kwargs):
         # this function is mostly redundant but makes compatibility easier
         kwargs.setdefault('authenticated', True)
-        return self.request(url, method, **kwargs)
+        with deadline.scope(self.request_deadline):
+            if self.coalescer is not None and method == 'GET':
+                key = _coalesce_key(url, method, self._auth_scope(), kwargs)
+                return self.coalescer.do(key, self._retrying_request, url,
+                                         method, **kwargs)
+            return self._retrying_request(url, method, **kwargs)
+
+    def _retrying_request(self, url, method, **kwargs):
+        def send_to(endpoint):
+            request_kwargs = _copy_request_kwargs(kwargs)
+            request_kwargs['endpoint_override'] = endpoint
+            return _conditional_request(self.response_cache, endpoint + url,
+                                        self.request, url, method,
+                                        **request_kwargs)
+
+        def attempt():
+            if (self.hedger or self.balancer or self.endpoints or
+                    self.circuit_breakers):
+                return _send_to_endpoints(self, url, method, send_to,
+                                          ks_exceptions.ConnectionError)
+            return _conditional_request(self.response_cache, url,
+                                        self.request, url, method, **kwargs)
+
+        return _request_with_retries(self, url, method, attempt,
+                                     ks_exceptions.ConnectionError)
+
+    def get_regions(self):
+        """Return the regions of the catalog having a conveyor endpoint."""
+        try:
+            catalog = self.service_catalog
+        except AttributeError:
+            return [self.region_name]
+        return _catalog_regions(catalog, self.service_type,
+                                self.interface or 'publicURL')
+
+    def for_region(self, region_name):
+        """Return a client of the conveyor endpoint of region_name.
+
+        It shares the session, and so the token, of this client.
+        """
+        region_client = _copy_for_region(self, region_name)
+        region_client.endpoints = None
+        return region_client
+
+    def get_endpoint(self, auth=None, **kwargs):
+        if self.endpoints and not self.endpoint_override:
+            return self.endpoints[0]
+        return super(SessionClient, self).get_endpoint(auth, **kwargs)
+
+    def get_endpoints(self):
+        """Return the URLs of all the conveyor endpoints.
+
+        That is the endpoints given to the client, or else all the
+        endpoints of the catalog matching its service type, interface and
+        region.
+        """
+        if self.endpoint_override:
+            return [self.endpoint_override]
+        if self.endpoints:
+            return list(self.endpoints)
+        try:
+            urls = self.service_catalog.get_urls(
+                service_type=self.service_type,
+                endpoint_type=self.interface or 'publicURL',
+                region_name=self.region_name,
+                service_name=self.service_name)
+        except AttributeError:
+            # There is no service catalog for this type of auth plugin.
+            urls = None
+        if not urls:
+            return [self.get_endpoint()]
+        return [url.rstrip('/') for url in urls]
+
+    def get_timings(self):
+        return self.times
+
+    def reset_timings(self):
+        self.times = []
 
     def get(self, url, **kwargs):
         return self._cs_request(url, 'GET', **kwargs)
@@ -124,11 +633,35 @@ class SessionClient(adapter.LegacyJsonAdapter):
         return self.session.get_endpoint(auth or self.auth, **kwargs)
 
     def get_conveyor_api_version_from_endpoint(self):
+        if self.endpoint_override or self.endpoints:
+            # The endpoints given may be missing from the catalog, eg: a
+            # local http+unix one.
+            return get_conveyor_api_from_url(self.get_endpoints()[0])
         return get_conveyor_api_from_url(self._get_endpoint())
 
+    def _auth_scope(self):
+        if not (self.auth or self.session.auth):
+            return None
+        return (self.get_user_id(), self.get_project_id())
+
     def authenticate(self, auth=None):
-        self._invalidate(auth)
-        return self._get_token(auth)
+        with self._auth_lock:
+            self._invalidate(auth)
+            self._count_authentication()
+            return self._get_token(auth)
+
+    def _refresh_token(self, stale_token):
+        """Fetch a new token unless another thread already replaced it."""
+        with self._auth_lock:
+            if self._get_token() == stale_token:
+                self._invalidate()
+                self._count_authentication()
+                self._get_token()
+
+    def _count_authentication(self):
+        # The first token is fetched by the session, out of sight.
+        if self.metrics is not None:
+            self.metrics.inc('authentications')
 
     @property
     def service_catalog(self):
@@ -152,7 +685,15 @@ class HTTPClient(object):
                  endpoint_type='publicURL', service_type=None,
                  service_name=None, retries=None,
                  http_log_debug=False, cacert=None,
-                 auth_system='keystone', auth_plugin=None):
+                 auth_system='keystone', auth_plugin=None,
+                 response_cache_size=http_cache.DEFAULT_MAX_ENTRIES,
+                 coalesce_requests=False,
+                 token_renewal_margin=DEFAULT_TOKEN_RENEWAL_MARGIN,
+                 background_token_renewal=False,
+                 retry_policy=None, timings=False, circuit_breakers=None,
+                 request_deadline=None, rate_limiter=None, hedge_gets=None,
+                 endpoints=None, load_balancing=None, cassette=None,
+                 metrics=None, tracer=None, request_log=None):
         self.user = user
         self.password = password
         self.projectid = projectid
@@ -173,10 +714,34 @@ class HTTPClient(object):
         self.service_type = service_type
         self.service_name = service_name
         self.retries = int(retries or 0)
+        self.retry_policy = (retry_policy or
+                             retry.RetryPolicy.from_retries(self.retries))
         self.http_log_debug = http_log_debug
+        self.timings = timings
+        self.times = []
+        self.circuit_breakers = _make_circuit_breakers(circuit_breakers)
+        # Seconds one API call may take overall, retries included.
+        self.request_deadline = request_deadline
+        # Requests per second, or a rate_limit.RateLimiter shared with
+        # other clients.
+        self.rate_limiter = _make_rate_limiter(rate_limiter)
+        # Hedged GETs, see hedging.Hedger.
+        self.hedger = _make_hedger(hedge_gets)
+        # Spread the requests over the endpoints, see balancer.EndpointPool
+        self.balancer = _make_balancer(load_balancing)
+        # Counters and latency histograms, see metrics.Registry.
+        self.metrics = _make_metrics(metrics)
+        # Spans of the requests, see tracing.Tracer.
+        self.tracer = tracer
+        # JSON lines log of the requests, see request_log.RequestLog.
+        self.request_log = _make_request_log(request_log)
 
         self.management_url = None
+        # The conveyor endpoints, given or else read from the catalog.
+        self.endpoints = [endpoint.rstrip('/') for endpoint in endpoints or ()]
+        self.catalog_urls = []
         self.auth_token = None
+        self.auth_ref = None
         self.proxy_token = proxy_token
         self.proxy_tenant_id = proxy_tenant_id
         self.timeout = timeout
@@ -192,6 +757,34 @@ class HTTPClient(object):
         self.auth_system = auth_system
         self.auth_plugin = auth_plugin
 
+        # Conditional GET cache, see _conditional_request()
+        self.response_cache = _make_response_cache(response_cache_size)
+        # Share one in-flight GET between threads asking for the same URL
+        self.coalescer = (singleflight.SingleFlight(copy=_copy_response)
+                          if coalesce_requests else None)
+
+        # Serializes (re)authentication and guards auth_token and
+        # management_url, which are shared by all the threads using this
+        # client.
+        self._auth_lock = threading.RLock()
+
+        # Tokens are renewed token_renewal_margin seconds before they
+        # expire: by the next request, or by a timer thread when
+        # background_token_renewal is set. Requests then do not have to
+        # fail with a 401 to learn that the token expired.
+        self.token_renewal_margin = token_renewal_margin
+        self.background_token_renewal = background_token_renewal
+        self._renewal_timer = None
+
+        # Keeps the connections to the API open between requests, and
+        # accepts http+unix endpoints for an API listening on a local
+        # unix socket.
+        self.http = requests.Session()
+        unix_socket.mount(self.http)
+        # Record or replay the exchanges, see cassette.Cassette.
+        if cassette is not None:
+            cassette.mount(self.http)
+
         self._logger = logging.getLogger(__name__)
 
     def http_log_req(self, args, kwargs):
@@ -235,24 +828,36 @@ class HTTPClient(object):
             kwargs['data'] = json.dumps(kwargs['body'])
             del kwargs['body']
 
-        if self.timeout:
-            kwargs.setdefault('timeout', self.timeout)
-        self.http_log_req((url, method,), kwargs)
-        resp = requests.request(
-            method,
-            url,
-            verify=self.verify_cert,
-            **kwargs)
-        self.http_log_resp(resp)
-
-        if resp.text:
-            try:
-                body = json.loads(resp.text)
-            except ValueError:
-                pass
+        timeout = deadline.timeout(kwargs.get('timeout') or self.timeout)
+        if timeout:
+            kwargs['timeout'] = timeout
+
+        def send():
+            self.http_log_req((url, method,), kwargs)
+            resp = self.http.request(
+                method,
+                url,
+                verify=self.verify_cert,
+                **kwargs)
+            self.http_log_resp(resp)
+
+            if resp.text:
+                try:
+                    body = json.loads(resp.text)
+                except ValueError:
+                    pass
+                    body = None
+            else:
                 body = None
-        else:
-            body = None
+            return resp, body
+
+        try:
+            resp, body = _observe_request(self, method, url,
+                                          kwargs['headers'], send)
+        except requests.exceptions.Timeout:
+            # Timed out because the deadline was reached.
+            deadline.check()
+            raise
 
         if resp.status_code >= 400:
             raise exceptions.from_response(resp, body)
@@ -260,49 +865,53 @@ class HTTPClient(object):
         return resp, body
 
     def _cs_request(self, url, method, **kwargs):
-        auth_attempts = 0
-        attempts = 0
-        backoff = 1
-        while True:
-            attempts += 1
-            if not self.management_url or not self.auth_token:
-                self.authenticate()
-            kwargs.setdefault('headers', {})['X-Auth-Token'] = self.auth_token
+        with deadline.scope(self.request_deadline):
+            if self.coalescer is not None and method == 'GET':
+                key = _coalesce_key(url, method, self._auth_scope(), kwargs)
+                return self.coalescer.do(key, self._retrying_request, url,
+                                         method, **kwargs)
+            return self._retrying_request(url, method, **kwargs)
+
+    def _auth_scope(self):
+        return (self.auth_url, self.user, self.projectid or self.tenant_id,
+                self.proxy_token)
+
+    def _retrying_request(self, url, method, **kwargs):
+        def send(auth_token, endpoint):
+            request_kwargs = _copy_request_kwargs(kwargs)
+            request_kwargs['headers']['X-Auth-Token'] = auth_token
             if self.projectid:
-                kwargs['headers']['X-Auth-Project-Id'] = self.projectid
+                request_kwargs['headers']['X-Auth-Project-Id'] = \
+                    self.projectid
+            full_url = endpoint + url
+            return _conditional_request(self.response_cache, full_url,
+                                        self.request, full_url, method,
+                                        **request_kwargs)
+
+        def send_to(endpoint):
+            auth_token, management_url = self._get_auth_state()
             try:
-                resp, body = self.request(self.management_url + url, method,
-                                          **kwargs)
-                return resp, body
-            except exceptions.BadRequest as e:
-                if attempts > self.retries:
-                    raise
+                return send(auth_token, endpoint or management_url)
             except exceptions.Unauthorized:
-                if auth_attempts > 0:
-                    raise
                 self._logger.debug("Unauthorized, reauthenticating.")
-                self.management_url = self.auth_token = None
-                # First reauth. Discount this attempt.
-                attempts -= 1
-                auth_attempts += 1
-                continue
-            except exceptions.ClientException as e:
-                if attempts > self.retries:
-                    raise
-                if 500 <= e.code <= 599:
-                    pass
-                else:
-                    raise
-            except requests.exceptions.ConnectionError as e:
-                self._logger.debug("Connection error: %s" % e)
-                if attempts > self.retries:
-                    msg = 'Unable to establish connection: %s' % e
-                    raise exceptions.ConnectionError(msg)
-            self._logger.debug(
-                "Failed attempt(%s of %s), retrying in %s seconds" %
-                (attempts, self.retries, backoff))
-            sleep(backoff)
-            backoff *= 2
+                self._refresh_auth(auth_token)
+                # First reauth. Does not count as a retry.
+                auth_token, management_url = self._get_auth_state()
+                return send(auth_token, endpoint or management_url)
+
+        def attempt():
+            return _send_to_endpoints(self, url, method, send_to,
+                                      requests.exceptions.ConnectionError)
+
+        return _request_with_retries(self, url, method, attempt,
+                                     requests.exceptions.ConnectionError,
+                                     wrap_connection_errors=True)
+
+    def get_timings(self):
+        return self.times
+
+    def reset_timings(self):
+        self.times = []
 
     def get(self, url, **kwargs):
         return self._cs_request(url, 'GET', **kwargs)
@@ -319,6 +928,129 @@ class HTTPClient(object):
     def get_conveyor_api_version_from_endpoint(self):
         return get_conveyor_api_from_url(self.management_url)
 
+    def get_endpoint(self):
+        return self._get_auth_state()[1]
+
+    def get_regions(self):
+        """Return the regions of the catalog having a conveyor endpoint."""
+        self._get_auth_state()
+        if self.auth_ref is None:
+            # No catalog with v1 authentication.
+            return [self.region_name]
+        return _catalog_regions(self.service_catalog, self.service_type,
+                                self.endpoint_type)
+
+    def for_region(self, region_name):
+        """Return a client of the conveyor endpoint of region_name.
+
+        It reuses the token of this client instead of authenticating
+        again.
+        """
+        self._get_auth_state()
+        if self.auth_ref is None:
+            raise exceptions.EndpointNotFound(
+                "No service catalog to find the endpoint of region %s in."
+                % region_name)
+        region_client = _copy_for_region(self, region_name)
+        region_client.endpoints = []
+        region_client.background_token_renewal = False
+        region_client._renewal_timer = None
+        region_client.management_url = self.service_catalog.url_for(
+            region_name=region_name,
+            endpoint_type=self.endpoint_type,
+            service_type=self.service_type).rstrip('/')
+        urls = self.service_catalog.get_urls(
+            region_name=region_name,
+            endpoint_type=self.endpoint_type,
+            service_type=self.service_type)
+        region_client.catalog_urls = [url.rstrip('/') for url in urls or ()]
+        return region_client
+
+    def get_endpoints(self):
+        """Return the URLs of all the conveyor endpoints.
+
+        That is the endpoints given to the client, or else all the
+        endpoints of the catalog matching its service type, endpoint type
+        and region.
+        """
+        management_url = self.get_endpoint()
+        return list(self.endpoints or self.catalog_urls or [management_url])
+
+    def _get_auth_state(self):
+        """Return (auth_token, management_url), authenticating if needed.
+
+        Both values are read under the auth lock so that a thread never
+        pairs a token with the endpoint of another authentication.
+        """
+        with self._auth_lock:
+            if (not self.management_url or not self.auth_token or
+                    self._token_expires_soon()):
+                self._do_authenticate()
+            return self.auth_token, self.management_url
+
+    def _token_renewal_delay(self):
+        """Return the seconds left before the token should be renewed.
+
+        Returns None when the expiry of the token is unknown, eg: with v1
+        or proxy tokens.
+        """
+        if self.auth_ref is None or self.proxy_token:
+            return None
+        try:
+            expires = timeutils.normalize_time(self.auth_ref.expires)
+        except Exception:
+            return None
+        margin = self.token_renewal_margin or 0
+        try:
+            issued = timeutils.normalize_time(self.auth_ref.issued)
+        except Exception:
+            pass
+        else:
+            # Never renew earlier than half way through the token lifetime,
+            # short lived tokens would otherwise be renewed on every request.
+            margin = min(margin,
+                         timeutils.delta_seconds(issued, expires) / 2.0)
+        return timeutils.delta_seconds(timeutils.utcnow(), expires) - margin
+
+    def _token_expires_soon(self):
+        delay = self._token_renewal_delay()
+        return delay is not None and delay <= 0
+
+    def _schedule_token_renewal(self):
+        if self._renewal_timer is not None:
+            self._renewal_timer.cancel()
+            self._renewal_timer = None
+        if not self.background_token_renewal:
+            return
+        delay = self._token_renewal_delay()
+        if delay is None:
+            return
+        self._renewal_timer = threading.Timer(max(delay, 0),
+                                              _renew_token,
+                                              args=(weakref.ref(self),))
+        self._renewal_timer.daemon = True
+        self._renewal_timer.start()
+
+    def close(self):
+        """Stop the background token renewal, if any, and close the
+        connections.
+        """
+        with self._auth_lock:
+            self.background_token_renewal = False
+            self._schedule_token_renewal()
+        self.http.close()
+
+    def _refresh_auth(self, stale_token):
+        """Re-authenticate after stale_token was rejected.
+
+        Threads rejected with the same token queue on the auth lock; only
+        the first one re-authenticates, the others reuse its new token.
+        """
+        with self._auth_lock:
+            if self.auth_token == stale_token:
+                self.management_url = self.auth_token = None
+                self._do_authenticate()
+
     def _extract_service_catalog(self, url, resp, body, extract_token=True):
         """See what the auth service told us and process the response.
         We may get redirected to another site, fail or actually get
@@ -338,7 +1070,13 @@ class HTTPClient(object):
                     region_name=self.region_name,
                     endpoint_type=self.endpoint_type,
                     service_type=self.service_type)
-                self.management_url = management_url.rstrip('/')
+                urls = self.service_catalog.get_urls(
+                    region_name=self.region_name,
+                    endpoint_type=self.endpoint_type,
+                    service_type=self.service_type)
+                self.catalog_urls = [url.rstrip('/') for url in urls or ()]
+                self.management_url = (self.endpoints[0] if self.endpoints
+                                       else management_url.rstrip('/'))
                 return None
             except exceptions.AmbiguousEndpoints:
                 print("Found more than one valid endpoint. Use a more "
@@ -377,6 +1115,17 @@ class HTTPClient(object):
                                              extract_token=False)
 
     def authenticate(self):
+        with self._auth_lock:
+            self._do_authenticate()
+
+    def _do_authenticate(self):
+        if self.metrics is not None:
+            self.metrics.inc('authentications')
+        self.auth_ref = None
+        self._authenticate_by_version()
+        self._schedule_token_renewal()
+
+    def _authenticate_by_version(self):
         magic_tuple = urlparse.urlsplit(self.auth_url)
         scheme, netloc, path, query, frag = magic_tuple
         port = magic_tuple.port
@@ -476,6 +1225,22 @@ class HTTPClient(object):
         return self._extract_service_catalog(url, resp, body)
 
 
+def _renew_token(client_ref):
+    """Timer callback renewing the token of a still alive HTTPClient."""
+    client = client_ref()
+    if client is None:
+        return
+    with client._auth_lock:
+        if not client.background_token_renewal:
+            return
+        client._logger.debug("Token expires soon, renewing it.")
+        try:
+            client._do_authenticate()
+        except Exception as e:
+            # The next request will retry, the token is still valid.
+            client._logger.warning("Unable to renew the token: %s", e)
+
+
 def _construct_http_client(username=None, password=None, project_id=None,
                            auth_url=None, insecure=False, timeout=None,
                            proxy_tenant_id=None, proxy_token=None,
@@ -488,6 +1253,23 @@ def _construct_http_client(username=None, password=None, project_id=None,
                            cacert=None, tenant_id=None,
                            session=None,
                            auth=None,
+                           response_cache_size=(
+                               http_cache.DEFAULT_MAX_ENTRIES),
+                           coalesce_requests=False,
+                           token_renewal_margin=DEFAULT_TOKEN_RENEWAL_MARGIN,
+                           background_token_renewal=False,
+                           retry_policy=None,
+                           timings=False,
+                           circuit_breakers=None,
+                           request_deadline=None,
+                           rate_limiter=None,
+                           hedge_gets=None,
+                           endpoints=None,
+                           load_balancing=None,
+                           cassette=None,
+                           metrics=None,
+                           tracer=None,
+                           request_log=None,
                            **kwargs):
 
     if session:
@@ -497,6 +1279,21 @@ def _construct_http_client(username=None, password=None, project_id=None,
                              service_type=service_type,
                              service_name=service_name,
                              region_name=region_name,
+                             response_cache_size=response_cache_size,
+                             coalesce_requests=coalesce_requests,
+                             retries=retries,
+                             retry_policy=retry_policy,
+                             timings=timings,
+                             circuit_breakers=circuit_breakers,
+                             request_deadline=request_deadline,
+                             rate_limiter=rate_limiter,
+                             hedge_gets=hedge_gets,
+                             endpoints=endpoints,
+                             load_balancing=load_balancing,
+                             cassette=cassette,
+                             metrics=metrics,
+                             tracer=tracer,
+                             request_log=request_log,
                              **kwargs)
     else:
         # FIXME(jamielennox): username and password are now optional. Need
@@ -519,6 +1316,22 @@ def _construct_http_client(username=None, password=None, project_id=None,
                           cacert=cacert,
                           auth_system=auth_system,
                           auth_plugin=auth_plugin,
+                          response_cache_size=response_cache_size,
+                          coalesce_requests=coalesce_requests,
+                          token_renewal_margin=token_renewal_margin,
+                          background_token_renewal=background_token_renewal,
+                          retry_policy=retry_policy,
+                          timings=timings,
+                          circuit_breakers=circuit_breakers,
+                          request_deadline=request_deadline,
+                          rate_limiter=rate_limiter,
+                          hedge_gets=hedge_gets,
+                          endpoints=endpoints,
+                          load_balancing=load_balancing,
+                          cassette=cassette,
+                          metrics=metrics,
+                          tracer=tracer,
+                          request_log=request_log,
                           )
 
 
@@ -0,0 +1,153 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Load balancing of the requests over several conveyor endpoints.
+
+Endpoints failing several requests in a row (connection errors and 5xx
+answers) are ejected for a while, then a single probe request is let
+through: if it succeeds the endpoint is back, else it is ejected again
+for twice as long.
+"""
+
+import logging
+import threading
+import time
+
+ROUND_ROBIN = 'round_robin'
+LEAST_OUTSTANDING = 'least_outstanding'
+STRATEGIES = (ROUND_ROBIN, LEAST_OUTSTANDING)
+
+LOG = logging.getLogger(__name__)
+
+
+class _Endpoint(object):
+    def __init__(self):
+        self.outstanding = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = None
+        self.probing = False
+
+
+class EndpointPool(object):
+    """Spread requests over endpoints and eject the unhealthy ones.
+
+    :param strategy: ROUND_ROBIN or LEAST_OUTSTANDING, the latter picking
+                     the endpoint with the fewest requests in flight.
+    :param failure_threshold: consecutive failures ejecting an endpoint.
+    :param ejection_time: seconds the first ejection lasts, doubled on
+                          each ejection in a row.
+    :param max_ejection_time: the longest an ejection may last.
+    """
+
+    def __init__(self, strategy=ROUND_ROBIN, failure_threshold=3,
+                 ejection_time=30, max_ejection_time=300, clock=time.time):
+        if strategy not in STRATEGIES:
+            raise ValueError("Unknown load balancing strategy %s, must be "
+                             "one of %s" % (strategy, ', '.join(STRATEGIES)))
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self._clock = clock
+        self._endpoints = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, endpoints, exclude=()):
+        """Pick the endpoint of the next request among endpoints.
+
+        Every acquired endpoint must be given back with :meth:`release`.
+        """
+        with self._lock:
+            now = self._clock()
+            states = [(url, self._endpoints.setdefault(url, _Endpoint()))
+                      for url in endpoints if url not in exclude]
+            if not states:
+                states = [(url, self._endpoints.setdefault(url, _Endpoint()))
+                          for url in endpoints]
+            healthy = [(url, state) for url, state in states
+                       if state.ejected_until is None]
+            probe = [(url, state) for url, state in states
+                     if state.ejected_until is not None and
+                     not state.probing and state.ejected_until <= now]
+            if probe:
+                url, state = probe[0]
+                state.probing = True
+                LOG.info("Probing ejected endpoint %s", url)
+            elif healthy:
+                url, state = self._pick(healthy)
+            else:
+                # Everything is ejected: better try the endpoint coming
+                # back first than fail without trying.
+                url, state = min(states, key=lambda s: s[1].ejected_until)
+            state.outstanding += 1
+            return url
+
+    def release(self, endpoint, ok):
+        """Report the outcome of a request sent to endpoint.
+
+        :param ok: True on success, False on failure, None when the
+                   outcome says nothing of the endpoint.
+        """
+        with self._lock:
+            state = self._endpoints[endpoint]
+            state.outstanding -= 1
+            if ok is None:
+                state.probing = False
+            elif ok:
+                if state.ejected_until is not None:
+                    LOG.info("Endpoint %s is back", endpoint)
+                state.failures = 0
+                state.ejections = 0
+                state.ejected_until = None
+                state.probing = False
+            else:
+                state.failures += 1
+                if (state.probing or
+                        (state.ejected_until is None and
+                         state.failures >= self.failure_threshold)):
+                    self._eject(endpoint, state)
+
+    def snapshot(self):
+        """Return the state of every endpoint, keyed by URL."""
+        with self._lock:
+            now = self._clock()
+            return dict(
+                (url, {'outstanding': state.outstanding,
+                       'failures': state.failures,
+                       'ejected': state.ejected_until is not None,
+                       'ejected_for': (max(state.ejected_until - now, 0)
+                                       if state.ejected_until is not None
+                                       else None)})
+                for url, state in self._endpoints.items())
+
+    def _pick(self, healthy):
+        if self.strategy == LEAST_OUTSTANDING:
+            fewest = min(state.outstanding for _url, state in healthy)
+            healthy = [(url, state) for url, state in healthy
+                       if state.outstanding == fewest]
+        choice = healthy[self._next % len(healthy)]
+        self._next += 1
+        return choice
+
+    def _eject(self, endpoint, state):
+        duration = min(self.ejection_time * 2 ** state.ejections,
+                       self.max_ejection_time)
+        state.ejections += 1
+        state.ejected_until = self._clock() + duration
+        state.probing = False
+        LOG.warning("Ejecting endpoint %s for %s seconds after %s failures",
+                    endpoint, duration, state.failures)
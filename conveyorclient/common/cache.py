@@ -0,0 +1,109 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Small caches used to avoid repeating read-only API lookups.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class TTLCache(object):
+    """A thread-safe in-process cache whose entries expire after a TTL.
+
+    A ttl of None or less than or equal to zero disables caching: set()
+    becomes a no-op and get() always misses.
+    """
+
+    def __init__(self, ttl=None, clock=time.time):
+        self.ttl = ttl
+        self._clock = clock
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return default
+            if expires_at <= self._clock():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        if not ttl or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._clock() + ttl, value)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else default
+
+    def remove_if(self, predicate):
+        """Drop every entry whose key satisfies predicate(key)."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+def load_json_cache(path, clock=time.time):
+    """Return (value, remaining_ttl) stored by :func:`save_json_cache`.
+
+    Missing, unreadable, corrupted and expired files are all treated as a
+    cache miss and return (None, 0).
+    """
+    try:
+        with open(path, 'r') as f:
+            entry = json.load(f)
+        remaining = entry['expires_at'] - clock()
+        if remaining <= 0:
+            return None, 0
+        return entry['value'], remaining
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return None, 0
+
+
+def save_json_cache(path, value, ttl, clock=time.time):
+    """Atomically store a JSON serializable value that expires after ttl."""
+    if not ttl or ttl <= 0:
+        return
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'expires_at': clock() + ttl, 'value': value}, f)
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        # NOTE: the disk cache is an optimization only, failing to write it
+        #       (permission denied, read-only home...) must not fail the call.
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
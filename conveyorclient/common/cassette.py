@@ -0,0 +1,309 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Record and replay of the HTTP exchanges of the client.
+
+A cassette in record mode saves every request sent through the requests
+sessions it is mounted on, keystone ones included, with its response and
+its duration. In replay mode the same requests are answered from the
+cassette, offline, after the recorded duration divided by the speed (0
+answers at once).
+
+Credentials and tokens are scrubbed before anything is written: the auth
+headers, the passwords and keys of the bodies, the token ids, and the
+tokens passed in the URLs, eg: GET /v2.0/tokens/<token>?belongsTo=<tenant>.
+
+The cassette is a file of JSON lines, gzipped if its name ends in .gz.
+"""
+
+import base64
+import datetime
+import gzip
+import json
+import threading
+import time
+
+from requests import adapters
+from requests import exceptions as requests_exceptions
+from requests import models
+from requests import structures
+import six
+from six.moves.urllib import parse
+
+RECORD = 'record'
+REPLAY = 'replay'
+MODES = (RECORD, REPLAY)
+
+SCRUBBED = '<scrubbed>'
+
+SECRET_HEADERS = ('authorization', 'cookie', 'set-cookie', 'x-auth-key',
+                  'x-auth-token', 'x-service-token', 'x-subject-token')
+SECRET_KEYS = ('adminPass', 'apiKey', 'passcode', 'password', 'secret')
+SECRET_QUERY_PARAMS = ('auth_token', 'password', 'secret', 'token',
+                       'x-auth-token')
+
+
+def _open(path, mode):
+    if not path.endswith('.gz'):
+        return open(path, mode)
+    if six.PY3:
+        return gzip.open(path, mode + 't')
+    return gzip.open(path, mode + 'b')
+
+
+def _scrub_url(url):
+    # The token following a tokens/ segment of the path, and the query
+    # parameters carrying a token or a password.
+    parts = parse.urlsplit(url)
+    segments = parts.path.split('/')
+    for i in range(1, len(segments)):
+        if segments[i - 1] == 'tokens' and segments[i]:
+            segments[i] = SCRUBBED
+    params = []
+    for param in parts.query.split('&') if parts.query else []:
+        name, sep, value = param.partition('=')
+        if sep and parse.unquote(name).lower() in SECRET_QUERY_PARAMS:
+            param = name + sep + SCRUBBED
+        params.append(param)
+    return parse.urlunsplit(parts._replace(path='/'.join(segments),
+                                           query='&'.join(params)))
+
+
+def _request_key(method, url):
+    parts = parse.urlsplit(_scrub_url(url))
+    return method.upper(), parts.path.rstrip('/'), parts.query
+
+
+class Cassette(object):
+    """A file of recorded HTTP exchanges.
+
+    :param path: the cassette file.
+    :param mode: RECORD, overwriting the file, or REPLAY.
+    :param speed: replay this many times faster than recorded, 0 to answer
+                  at once.
+    """
+
+    def __init__(self, path, mode=REPLAY, speed=1.0, sleep=time.sleep):
+        if mode not in MODES:
+            raise ValueError("Unknown cassette mode %s, must be one of %s"
+                             % (mode, ', '.join(MODES)))
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._secrets = set()
+        self._file = None
+        self._interactions = {}
+        self._played = {}
+        if mode == RECORD:
+            self._file = _open(path, 'w')
+        else:
+            with _open(path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        self._add(json.loads(line))
+
+    def mount(self, session):
+        """Record or replay the requests of the requests session."""
+        for prefix, adapter in list(session.adapters.items()):
+            if not isinstance(adapter, CassetteAdapter):
+                session.mount(prefix, CassetteAdapter(self, adapter))
+
+    def close(self):
+        """Finish writing the cassette being recorded."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Recording
+
+    def record(self, request, response, elapsed):
+        with self._lock:
+            if self._file is None:
+                return
+            self._collect_secrets(response)
+            interaction = {
+                'request': {
+                    'method': request.method,
+                    'url': self._scrub_text(_scrub_url(request.url)),
+                    'headers': self._scrub_headers(request.headers),
+                    'body': self._encode_body(request.body,
+                                              request.headers)},
+                'response': {
+                    'status': response.status_code,
+                    'reason': response.reason,
+                    'headers': self._scrub_headers(response.headers),
+                    'body': self._encode_body(response.content,
+                                              response.headers)},
+                'elapsed': elapsed,
+            }
+            self._file.write(json.dumps(interaction,
+                                        separators=(',', ':')) + '\n')
+            self._file.flush()
+
+    def _collect_secrets(self, response):
+        # The tokens handed out by keystone, to scrub wherever they are
+        # echoed later, eg: in the X-Auth-Token of the next requests.
+        token = response.headers.get('X-Subject-Token')
+        if token:
+            self._secrets.add(token)
+        try:
+            body = response.json()
+            token = body['access']['token']['id']
+        except Exception:
+            return
+        self._secrets.add(token)
+
+    def _scrub_text(self, text):
+        for secret in self._secrets:
+            text = text.replace(secret, SCRUBBED)
+        return text
+
+    def _scrub_headers(self, headers):
+        return dict((name, SCRUBBED if name.lower() in SECRET_HEADERS
+                     else self._scrub_text(value))
+                    for name, value in headers.items())
+
+    def _scrub(self, data):
+        if isinstance(data, dict):
+            scrubbed = {}
+            for key, value in data.items():
+                if key in SECRET_KEYS:
+                    value = SCRUBBED
+                elif (key == 'token' and isinstance(value, dict) and
+                        'id' in value):
+                    value = dict(self._scrub(value), id=SCRUBBED)
+                else:
+                    value = self._scrub(value)
+                scrubbed[key] = value
+            return scrubbed
+        if isinstance(data, list):
+            return [self._scrub(value) for value in data]
+        if isinstance(data, six.string_types):
+            return self._scrub_text(data)
+        return data
+
+    def _encode_body(self, body, headers):
+        if not body:
+            return None
+        if isinstance(body, six.text_type):
+            body = body.encode('utf-8')
+        try:
+            text = body.decode('utf-8')
+        except UnicodeDecodeError:
+            return {'base64': base64.b64encode(body).decode('ascii')}
+        if 'json' in headers.get('Content-Type', ''):
+            try:
+                return {'json': self._scrub(json.loads(text))}
+            except ValueError:
+                pass
+        return {'text': self._scrub_text(text)}
+
+    # Replay
+
+    def _add(self, interaction):
+        request = interaction['request']
+        key = _request_key(request['method'], request['url'])
+        self._interactions.setdefault(key, []).append(interaction)
+
+    def play(self, request):
+        """Return the recorded interaction answering request.
+
+        The interactions recorded for a method and URL are played in
+        order, preferring one with the same body, and the last one keeps
+        answering once they are all played.
+        """
+        key = _request_key(request.method, request.url)
+        body = self._encode_body(request.body, request.headers)
+        if body is not None and 'json' in body:
+            body = {'json': self._scrub(body['json'])}
+        with self._lock:
+            interactions = self._interactions.get(key)
+            if not interactions:
+                raise requests_exceptions.ConnectionError(
+                    "No interaction recorded in %s for %s %s"
+                    % (self.path, request.method, request.url),
+                    request=request)
+            played = self._played.setdefault(key, set())
+            candidates = [i for i in range(len(interactions))
+                          if i not in played]
+            matching = [i for i in candidates
+                        if interactions[i]['request']['body'] == body]
+            if matching:
+                index = matching[0]
+            elif candidates:
+                index = candidates[0]
+            else:
+                index = len(interactions) - 1
+            played.add(index)
+            return interactions[index]
+
+    def response(self, request, interaction, adapter):
+        recorded = interaction['response']
+        elapsed = interaction.get('elapsed') or 0
+        if self.speed:
+            self._sleep(elapsed / float(self.speed))
+        response = models.Response()
+        response.status_code = recorded['status']
+        response.reason = recorded.get('reason')
+        response.headers = structures.CaseInsensitiveDict(
+            recorded.get('headers') or {})
+        body = recorded.get('body') or {}
+        if 'json' in body:
+            content = json.dumps(body['json']).encode('utf-8')
+        elif 'base64' in body:
+            content = base64.b64decode(body['base64'])
+        else:
+            content = body.get('text', '').encode('utf-8')
+        response._content = content
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        response.elapsed = datetime.timedelta(seconds=elapsed)
+        return response
+
+
+class CassetteAdapter(adapters.BaseAdapter):
+    """A requests transport adapter recording or replaying through a
+    cassette, wrapping the adapter it replaces.
+    """
+
+    def __init__(self, cassette, adapter):
+        super(CassetteAdapter, self).__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        if self.cassette.mode == REPLAY:
+            interaction = self.cassette.play(request)
+            return self.cassette.response(request, interaction, self)
+        start = time.time()
+        response = self.adapter.send(request, **kwargs)
+        # Read the body now, to record it.
+        response.content
+        self.cassette.record(request, response, time.time() - start)
+        return response
+
+    def close(self):
+        self.adapter.close()
@@ -0,0 +1,149 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Client side circuit breakers, one per conveyor endpoint.
+
+A breaker is CLOSED while the endpoint is healthy. It OPENS when the rate of
+failed requests (connection errors and 5xx answers) over a rolling window
+crosses a threshold, and requests then fail fast with
+:class:`conveyorclient.exceptions.CircuitOpen` instead of waiting for a
+timeout. After reset_timeout seconds it turns HALF_OPEN and lets a few probe
+requests through: a successful probe closes it, a failed one opens it again.
+"""
+
+import collections
+import logging
+import threading
+import time
+
+from conveyorclient import exceptions
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+LOG = logging.getLogger(__name__)
+
+
+class CircuitBreaker(object):
+    """The circuit breaker of a single endpoint."""
+
+    def __init__(self, name, failure_threshold=0.5, window=60,
+                 min_requests=10, reset_timeout=30, half_open_probes=1,
+                 clock=time.time):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.min_requests = min_requests
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.opened_at = None
+        self._clock = clock
+        self._outcomes = collections.deque()
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Raise CircuitOpen if the request must not be sent."""
+        with self._lock:
+            if self.state == OPEN:
+                if self._clock() - self.opened_at < self.reset_timeout:
+                    raise exceptions.CircuitOpen(self.name)
+                self._set_state(HALF_OPEN)
+                self._probes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    raise exceptions.CircuitOpen(self.name)
+                self._probes += 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._outcomes.clear()
+                self._set_state(CLOSED)
+            else:
+                self._record(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            self._record(False)
+            if self.state != CLOSED or len(self._outcomes) < self.min_requests:
+                return
+            failures = sum(1 for (_t, ok) in self._outcomes if not ok)
+            if failures >= self.failure_threshold * len(self._outcomes):
+                self._open()
+
+    def record_ignored(self):
+        """Forget a request whose outcome says nothing of the endpoint."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def snapshot(self):
+        with self._lock:
+            failures = sum(1 for (_t, ok) in self._outcomes if not ok)
+            return {'state': self.state,
+                    'opened_at': self.opened_at,
+                    'requests': len(self._outcomes),
+                    'failures': failures}
+
+    def _record(self, ok):
+        now = self._clock()
+        self._outcomes.append((now, ok))
+        while self._outcomes and self._outcomes[0][0] <= now - self.window:
+            self._outcomes.popleft()
+
+    def _open(self):
+        self.opened_at = self._clock()
+        self._outcomes.clear()
+        self._set_state(OPEN)
+
+    def _set_state(self, state):
+        if state != self.state:
+            log = LOG.warning if state == OPEN else LOG.info
+            log("Circuit breaker of %s: %s -> %s", self.name, self.state,
+                state)
+            self.state = state
+
+
+class CircuitBreakers(object):
+    """Registry creating one :class:`CircuitBreaker` per endpoint.
+
+    The keyword arguments are passed to every breaker it creates.
+    """
+
+    def __init__(self, **breaker_kwargs):
+        self.breaker_kwargs = breaker_kwargs
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint):
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(endpoint, **self.breaker_kwargs)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def snapshot(self):
+        """Return the state of every breaker, keyed by endpoint."""
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return dict((endpoint, breaker.snapshot())
+                    for endpoint, breaker in breakers)
@@ -0,0 +1,205 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Adaptive concurrency of the bulk operations.
+
+The number of calls in flight is controlled by additive increase,
+multiplicative decrease (AIMD): the limit grows by one for every limit
+calls completing quickly and successfully, and is cut by a factor as soon
+as the API is overloaded, i.e. it answers 5xx, 413 or 429, the connection
+fails, or the latency rises well above its usual value.
+"""
+
+import logging
+import threading
+import time
+
+from conveyorclient.common import deadline
+from conveyorclient.common import tracing
+from conveyorclient import exceptions
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_INITIAL_LIMIT = 4
+# Default of Client(max_concurrency=...) and of --max-concurrency.
+DEFAULT_MAX_LIMIT = 16
+
+# Statuses telling that the API is overloaded.
+OVERLOAD_STATUSES = (413, 429)
+
+
+def is_overload(exc):
+    """Tell whether exc means that the API is overloaded."""
+    if isinstance(exc, exceptions.ClientException):
+        return exc.code >= 500 or exc.code in OVERLOAD_STATUSES
+    return isinstance(exc, exceptions.ConnectionError)
+
+
+class AIMDLimiter(object):
+    """Bound the calls in flight to a limit adjusted by AIMD.
+
+    :param initial: the limit to start with.
+    :param min_limit: the limit never goes below it.
+    :param max_limit: the limit never goes above it.
+    :param backoff: the factor applied to the limit on overload.
+    :param latency_tolerance: a call slower than this many times the
+                              usual latency counts as an overload.
+    :param history_size: number of limit changes remembered.
+    """
+
+    def __init__(self, initial=DEFAULT_INITIAL_LIMIT, min_limit=1,
+                 max_limit=DEFAULT_MAX_LIMIT, backoff=0.5,
+                 latency_tolerance=2.0, history_size=100, clock=time.time):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.history_size = history_size
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self.latency = None
+        self.history = []
+        self._clock = clock
+        self._last_decrease = None
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot and return the start time of the call."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            return self._clock()
+
+    def release(self, start, exc=None):
+        """Free the slot of a call started at start.
+
+        :param exc: the exception the call raised, if any.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            latency = self._clock() - start
+            if is_overload(exc):
+                self._decrease(start, 'overload')
+            elif (self.latency is not None and
+                    latency > self.latency * self.latency_tolerance):
+                self._decrease(start, 'latency')
+            else:
+                if self.latency is None:
+                    self.latency = latency
+                else:
+                    self.latency = 0.9 * self.latency + 0.1 * latency
+                if self.limit < self.max_limit:
+                    self._set_limit(self.limit + 1.0 / int(self.limit),
+                                    'increase')
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {'limit': int(self.limit),
+                    'in_flight': self.in_flight,
+                    'latency': self.latency,
+                    'history': list(self.history)}
+
+    def _decrease(self, start, reason):
+        # The calls started before the last decrease saw the same
+        # congestion, back off once for all of them.
+        if self._last_decrease is not None and start <= self._last_decrease:
+            return
+        self._last_decrease = self._clock()
+        self._set_limit(max(self.min_limit, self.limit * self.backoff),
+                        reason)
+
+    def _set_limit(self, limit, reason):
+        limit = min(limit, self.max_limit)
+        changed = int(limit) != int(self.limit)
+        self.limit = limit
+        if changed:
+            LOG.debug("Bulk concurrency limit %s (%s)", int(limit), reason)
+            self.history.append((self._clock(), int(limit), reason))
+            del self.history[:-self.history_size]
+
+
+class BulkExecutor(object):
+    """Run a function over many items with adaptive concurrency."""
+
+    def __init__(self, limiter=None):
+        self.limiter = limiter or AIMDLimiter()
+
+    def map(self, fn, items):
+        """Call fn(item) for every item.
+
+        Returns a list of (item, result, exception) tuples in the order of
+        items. An exception raised by fn is returned in its tuple instead
+        of stopping the other calls. The calls share the deadline and the
+        span of the calling thread.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        threads = []
+        caller_deadline = deadline.current()
+        caller_span = tracing.current()
+
+        def run(index, item, start):
+            try:
+                with deadline.attach(caller_deadline), \
+                        tracing.attach(caller_span):
+                    result = fn(item)
+            except Exception as e:
+                self.limiter.release(start, e)
+                results[index] = (item, None, e)
+            else:
+                self.limiter.release(start)
+                results[index] = (item, result, None)
+
+        for index, item in enumerate(items):
+            start = self.limiter.acquire()
+            thread = threading.Thread(target=run, args=(index, item, start))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return results
+
+
+def map_threads(fn, items):
+    """Call fn(item) for every item, each in a thread of its own.
+
+    Returns the same (item, result, exception) tuples as
+    :meth:`BulkExecutor.map`, but takes no slot of any limiter. Meant for
+    a few items, such as regions, whose calls may run bulk operations of
+    their own: those would wait forever for the slots held by their
+    callers once there are more callers than slots.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    caller_deadline = deadline.current()
+
+    def run(index, item):
+        try:
+            with deadline.attach(caller_deadline):
+                results[index] = (item, fn(item), None)
+        except Exception as e:
+            results[index] = (item, None, e)
+
+    threads = [threading.Thread(target=run, args=(index, item))
+               for index, item in enumerate(items)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
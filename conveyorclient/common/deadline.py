@@ -0,0 +1,132 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Overall time budgets for API calls.
+
+A deadline is opened with :func:`scope` and applies to every request sent
+by the current thread until the scope exits::
+
+    with deadline.scope(30):
+        cs.plans.get(plan_id)
+        cs.clones.clone(plan_id, destination, resources)
+
+Each request gets the remaining time as its timeout. Retries and backoff
+sleeps that would overrun the deadline are not attempted, and
+:class:`conveyorclient.exceptions.DeadlineExceeded` is raised once the
+budget is spent. Nested scopes can only shorten the deadline.
+"""
+
+import contextlib
+import threading
+import time
+
+from conveyorclient import exceptions
+
+_local = threading.local()
+
+
+class Deadline(object):
+    """A point in time by which the work must be done."""
+
+    def __init__(self, budget, clock=time.time):
+        self.budget = budget
+        self._clock = clock
+        self.expires_at = clock() + budget
+
+    def remaining(self):
+        return max(self.expires_at - self._clock(), 0.0)
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self):
+        """Raise DeadlineExceeded if the deadline has passed."""
+        if self.expired():
+            raise exceptions.DeadlineExceeded(self.budget)
+
+
+def current():
+    """Return the deadline of the current thread, or None."""
+    return getattr(_local, 'deadline', None)
+
+
+@contextlib.contextmanager
+def scope(budget, clock=time.time):
+    """Bound the calls made in the block to budget seconds.
+
+    A budget of None opens no new deadline but keeps the enclosing one.
+    """
+    outer = current()
+    if budget is None:
+        yield outer
+        return
+    inner = Deadline(budget, clock)
+    if outer is not None and outer.expires_at <= inner.expires_at:
+        inner = outer
+    with attach(inner):
+        yield inner
+
+
+@contextlib.contextmanager
+def attach(deadline):
+    """Make deadline, eg: the one of another thread, the current one."""
+    outer = current()
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = outer
+
+
+def check():
+    """Raise DeadlineExceeded if the current deadline has passed."""
+    deadline = current()
+    if deadline is not None:
+        deadline.check()
+
+
+def timeout(default=None):
+    """Return the timeout of the next request.
+
+    That is default bounded by the time left before the current deadline.
+    Raises DeadlineExceeded if no time is left.
+    """
+    deadline = current()
+    if deadline is None:
+        return default
+    deadline.check()
+    remaining = deadline.remaining()
+    if default is None:
+        return remaining
+    return min(float(default), remaining)
+
+
+def allows(seconds):
+    """Tell whether waiting seconds still leaves time before the deadline."""
+    deadline = current()
+    return deadline is None or seconds < deadline.remaining()
+
+
+def sleep(seconds, sleep_fn=time.sleep):
+    """Sleep seconds, but never past the current deadline.
+
+    Raises DeadlineExceeded if the deadline is reached before seconds
+    elapsed.
+    """
+    deadline = current()
+    if deadline is not None and seconds >= deadline.remaining():
+        sleep_fn(deadline.remaining())
+        raise exceptions.DeadlineExceeded(deadline.budget)
+    sleep_fn(seconds)
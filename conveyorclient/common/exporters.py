@@ -0,0 +1,276 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Export of the metrics of the client, see metrics.Registry, out of
+short-lived processes.
+
+An exporter flushes the registry when :meth:`Exporter.stop` is called, at
+exit, and every interval seconds if one is given::
+
+    exporter = exporters.PrometheusTextfile(cs.metrics,
+                                            '/var/lib/node_exporter')
+    exporter.start()
+
+- :class:`PrometheusTextfile` writes the metrics to a .prom file of the
+  directory read by the textfile collector of the node exporter;
+- :class:`Statsd` sends what changed since the last flush to a StatsD
+  server over UDP.
+"""
+
+import atexit
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from conveyorclient.common import metrics
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PREFIX = 'conveyorclient'
+DEFAULT_TEXTFILE_NAME = 'conveyorclient.prom'
+DEFAULT_STATSD_PORT = 8125
+
+# Keep the datagrams under the usual MTU of the path to the server.
+MAX_DATAGRAM = 1432
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _statsd_bound(bound):
+    return 'inf' if bound == float('inf') else ('%g' % bound).replace('.', '_')
+
+
+class Exporter(object):
+    """Flush a registry at exit and every interval seconds.
+
+    :param registry: the :class:`metrics.Registry` to export.
+    :param interval: seconds between two flushes, None to flush only at
+                     exit.
+    """
+
+    def __init__(self, registry, interval=None):
+        self.registry = registry
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._started = False
+
+    def start(self):
+        """Flush at exit, and on the interval if any, from now on."""
+        if self._started:
+            return self
+        self._started = True
+        atexit.register(self.stop)
+        if self.interval:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the periodic flushes and flush one last time."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Export the metrics now.
+
+        The failures are logged rather than raised, the metrics must not
+        break the calls of the client.
+        """
+        with self._lock:
+            try:
+                self._export(self.registry.snapshot())
+            except Exception as e:
+                LOG.warning("Unable to export the metrics with %s: %s",
+                            self.__class__.__name__, e)
+
+    def _export(self, snapshot):
+        raise NotImplementedError()
+
+
+class PrometheusTextfile(Exporter):
+    """Write the metrics for the textfile collector of the node exporter.
+
+    The file is replaced atomically, so that the collector never reads it
+    half written. The processes exporting at the same time should use
+    different file names.
+
+    :param directory: the directory of the textfile collector, ie: its
+                      --collector.textfile.directory.
+    :param name: the name of the file, ending in .prom.
+    :param prefix: the prefix of the names of the metrics.
+    :param labels: dict of labels added to every metric, eg: the job.
+    """
+
+    def __init__(self, registry, directory, name=DEFAULT_TEXTFILE_NAME,
+                 prefix=DEFAULT_PREFIX, labels=None, interval=None):
+        super(PrometheusTextfile, self).__init__(registry, interval)
+        self.path = os.path.join(directory, name)
+        self.prefix = prefix
+        self.labels = labels or {}
+
+    def _export(self, snapshot):
+        text = self.render(snapshot)
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.',
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.chmod(tmp_path, 0o644)
+            os.rename(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def render(self, snapshot):
+        """Return snapshot in the Prometheus text format."""
+        lines = []
+        for name, metric in sorted(snapshot.items()):
+            full_name = '%s_%s' % (self.prefix, name)
+            if metric['type'] == metrics.COUNTER:
+                full_name += '_total'
+            lines.append('# HELP %s %s' % (full_name, metric['help']))
+            lines.append('# TYPE %s %s' % (full_name, metric['type']))
+            for sample in metric['samples']:
+                labels = dict(self.labels, **sample['labels'])
+                if metric['type'] == metrics.COUNTER:
+                    lines.append(self._line(full_name, labels,
+                                            sample['value']))
+                    continue
+                for bound, count in sample['buckets']:
+                    bucket_labels = dict(labels, le=_format_bound(bound))
+                    lines.append(self._line(full_name + '_bucket',
+                                            bucket_labels, count))
+                lines.append(self._line(full_name + '_sum', labels,
+                                        sample['sum']))
+                lines.append(self._line(full_name + '_count', labels,
+                                        sample['count']))
+        full_name = '%s_last_flush_timestamp_seconds' % self.prefix
+        lines.append('# HELP %s When the metrics were written.' % full_name)
+        lines.append('# TYPE %s gauge' % full_name)
+        lines.append(self._line(full_name, self.labels, time.time()))
+        return '\n'.join(lines) + '\n'
+
+    def _line(self, name, labels, value):
+        if not labels:
+            return '%s %s' % (name, value)
+        return '%s{%s} %s' % (name, ','.join(
+            '%s="%s"' % (key, self._escape(labels[key]))
+            for key in sorted(labels)), value)
+
+    def _escape(self, value):
+        return ('%s' % value).replace('\\', r'\\').replace(
+            '"', r'\"').replace('\n', r'\n')
+
+
+class Statsd(Exporter):
+    """Send the metrics to a StatsD server over UDP.
+
+    The counters are sent as StatsD counters of their increase since the
+    last flush. So are the count, sum and cumulative buckets of the
+    histograms, eg: conveyorclient.call_seconds.plans.list.le_0_5 for the
+    calls of plans.list completing within half a second. The values of
+    the labels are appended to the name, in the order of the label names.
+
+    :param host: the StatsD server.
+    :param port: its UDP port.
+    :param prefix: the prefix of the names of the metrics.
+    """
+
+    def __init__(self, registry, host='127.0.0.1', port=DEFAULT_STATSD_PORT,
+                 prefix=DEFAULT_PREFIX, interval=None):
+        super(Statsd, self).__init__(registry, interval)
+        self.address = (host, port)
+        self.prefix = prefix
+        self._sent = {}
+        self._socket = None
+
+    def _export(self, snapshot):
+        lines = self.render(snapshot)
+        if not lines:
+            return
+        if self._socket is None:
+            family = socket.getaddrinfo(self.address[0], self.address[1],
+                                        0, socket.SOCK_DGRAM)[0][0]
+            self._socket = socket.socket(family, socket.SOCK_DGRAM)
+        datagram = []
+        size = 0
+        for line in lines:
+            if datagram and size + len(line) + 1 > MAX_DATAGRAM:
+                self._send('\n'.join(datagram))
+                datagram = []
+                size = 0
+            datagram.append(line)
+            size += len(line) + 1
+        self._send('\n'.join(datagram))
+
+    def _send(self, payload):
+        self._socket.sendto(payload.encode('utf-8'), self.address)
+
+    def render(self, snapshot):
+        """Return the StatsD lines of what changed since the last call."""
+        lines = []
+        for name, metric in sorted(snapshot.items()):
+            for sample in metric['samples']:
+                labels = sample['labels']
+                path = '.'.join([self.prefix, name] + [
+                    self._escape(labels[key]) for key in sorted(labels)])
+                if metric['type'] == metrics.COUNTER:
+                    values = [(path, sample['value'])]
+                else:
+                    values = [(path + '.count', sample['count']),
+                              (path + '.sum', sample['sum'])]
+                    values.extend((path + '.le_' + _statsd_bound(bound), count)
+                                  for bound, count in sample['buckets'])
+                for key, value in values:
+                    sent = self._sent.get(key, 0)
+                    # The registry may have been reset since.
+                    delta = value - sent if value >= sent else value
+                    if delta:
+                        self._sent[key] = value
+                        lines.append('%s:%s|c' % (key, self._format(delta)))
+        return lines
+
+    def _format(self, value):
+        if isinstance(value, float):
+            return '%.6f' % value
+        return '%d' % value
+
+    def _escape(self, value):
+        return ('%s' % value).replace(':', '_').replace('|', '_').replace(
+            '@', '_').replace(' ', '_').replace('/', '_')
+
+    def stop(self):
+        super(Statsd, self).stop()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
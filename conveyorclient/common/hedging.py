@@ -0,0 +1,175 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Hedged requests.
+
+A hedged GET is sent to one endpoint. If no answer came back after the
+usual latency of the GETs (a high percentile of the recent ones), the same
+GET is sent to another endpoint and the first answer wins. This trims the
+latency tail caused by an occasional slow replica for the price of a few
+percent more requests.
+
+Hedges wait for the rate limiter of the client like any other request.
+They do not take a slot of the bulk concurrency limiter though: a bulk
+call holds its slot while its first request and its hedges are in
+flight, so the limiter bounds the calls and each call sends at most
+max_hedges more requests. A hedge waiting for the slot held by its own
+call would never be sent.
+"""
+
+import collections
+import sys
+import threading
+import time
+
+import six
+from six.moves import queue
+
+from conveyorclient.common import deadline
+from conveyorclient.common import tracing
+from conveyorclient import exceptions
+
+
+class Hedger(object):
+    """Send hedged requests and track the latency they are based on.
+
+    :param percentile: the hedge is sent after this percentile of the
+                       recent latencies, between 0 and 1.
+    :param window: number of recent latencies the percentile is computed
+                   over.
+    :param min_samples: latencies needed before the percentile is used,
+                        initial_delay is used until then.
+    :param initial_delay: hedging delay before enough latencies are known.
+    :param min_delay: the hedging delay never goes below it.
+    :param max_hedges: additional requests sent at most per call.
+    """
+
+    def __init__(self, percentile=0.95, window=200, min_samples=20,
+                 initial_delay=0.5, min_delay=0.01, max_hedges=1,
+                 clock=time.time):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_hedges = max_hedges
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies = collections.deque(maxlen=window)
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """Return the seconds to wait for an answer before hedging."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            latencies = sorted(self._latencies)
+        index = int(round(self.percentile * (len(latencies) - 1)))
+        return max(latencies[index], self.min_delay)
+
+    def record(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls,
+                    'hedges': self.hedges,
+                    'hedge_wins': self.hedge_wins}
+
+    def call(self, send, targets, before_hedge=None):
+        """Call send(target), hedging over targets.
+
+        send(targets[0]) is called first. The next target is tried when no
+        answer came within delay(), or as soon as the previous attempts
+        all failed with a connection error or a 5xx. The first answer is
+        returned and the others are dropped. Requests already on the wire
+        can not be interrupted, but hedges not sent yet are cancelled.
+
+        before_hedge() is called before each hedge is sent, to wait for a
+        rate limiter for example.
+        """
+        targets = list(targets)[:self.max_hedges + 1]
+        results = queue.Queue()
+        cancelled = threading.Event()
+        caller_deadline = deadline.current()
+        caller_span = tracing.current()
+        delay = self.delay()
+
+        def run(index, target):
+            if cancelled.is_set():
+                return
+            start = self._clock()
+            try:
+                with deadline.attach(caller_deadline), \
+                        tracing.attach(caller_span):
+                    if index and before_hedge is not None:
+                        before_hedge()
+                        if cancelled.is_set():
+                            return
+                    result = send(target)
+            except Exception:
+                results.put((index, False, sys.exc_info(), None))
+            else:
+                results.put((index, True, result, self._clock() - start))
+
+        def start_next():
+            index = len(started)
+            thread = threading.Thread(target=run,
+                                      args=(index, targets[index]))
+            thread.daemon = True
+            thread.start()
+            started.append(thread)
+            if index:
+                with self._lock:
+                    self.hedges += 1
+
+        with self._lock:
+            self.calls += 1
+        started = []
+        pending = 0
+        exc_info = None
+        start_next()
+        pending += 1
+        try:
+            while True:
+                timeout = delay if len(started) < len(targets) else None
+                try:
+                    index, ok, value, latency = results.get(timeout=timeout)
+                except queue.Empty:
+                    start_next()
+                    pending += 1
+                    continue
+                pending -= 1
+                if ok:
+                    self.record(latency)
+                    if index:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return value
+                exc_info = value
+                error = exc_info[1]
+                if (isinstance(error, exceptions.ClientException) and
+                        error.code < 500):
+                    # An answer, even if it is an error.
+                    six.reraise(*exc_info)
+                if not pending:
+                    if len(started) == len(targets):
+                        six.reraise(*exc_info)
+                    start_next()
+                    pending += 1
+        finally:
+            cancelled.set()
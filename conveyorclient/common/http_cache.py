@@ -0,0 +1,125 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Conditional GET support for the conveyor HTTP clients.
+
+Responses carrying an ETag or Last-Modified validator are remembered with
+their body. The next GET of the same URL sends If-None-Match /
+If-Modified-Since, and a 304 answer is served from the cache instead of
+transferring the body again.
+"""
+
+import collections
+import json
+import threading
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+class ResponseCache(object):
+    """A size bounded LRU of GET bodies keyed by URL.
+
+    The bodies are kept as the JSON text received and decoded on every
+    hit, so that the callers, eg: the resources built from them, never
+    share what they may modify. Decoding costs a fraction of a deep copy.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def conditional_headers(self, key):
+        """Return the validator headers to send when requesting key."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        etag, last_modified = entry[0], entry[1]
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def not_modified(self, key):
+        """Return the decoded body of key after the server answered 304.
+
+        Returns None if the entry was evicted in the meantime, the caller
+        must then repeat the request unconditionally.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            try:
+                self._entries.move_to_end(key)
+            except AttributeError:
+                # Python 2 OrderedDict has no move_to_end().
+                self._entries[key] = self._entries.pop(key)
+            self.hits += 1
+            self.bytes_saved += entry[3]
+        return json.loads(entry[2])
+
+    def store(self, key, resp, body):
+        """Remember the body of resp if it carries a validator, else forget
+        key.
+
+        :param body: the body of resp decoded, None if it is not JSON.
+        """
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        size = len(resp.content or b'')
+        with self._lock:
+            self.misses += 1
+            self._discard(key)
+            if not (etag or last_modified) or body is None:
+                return
+            if self.max_bytes and size > self.max_bytes:
+                return
+            self._entries[key] = (etag, last_modified, resp.text, size)
+            self.size += size
+            while self._entries and (
+                    len(self._entries) > self.max_entries or
+                    (self.max_bytes and self.size > self.max_bytes)):
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'bytes': self.size,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'bytes_saved': self.bytes_saved}
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[3]
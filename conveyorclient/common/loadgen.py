@@ -0,0 +1,205 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Load generation against the conveyor API.
+
+A mix of weighted operations is run for a duration, either by a fixed
+number of workers calling back to back (closed loop), or at a target rate
+(open loop). In the latter case the latency of a call is measured from the
+time it was scheduled at, so that a saturated API shows up as growing
+latencies rather than as a silently lower rate: the calls scheduled while
+every worker is busy wait for one, and their wait counts.
+"""
+
+import random
+import threading
+import time
+
+from six.moves import queue
+
+from conveyorclient import exceptions
+
+
+def percentile(samples, fraction):
+    """Return the fraction percentile of the sorted samples, or None."""
+    if not samples:
+        return None
+    index = int(round(fraction * (len(samples) - 1)))
+    return samples[index]
+
+
+def error_key(exc):
+    """Return the key errors are grouped by in the report."""
+    if isinstance(exc, exceptions.ClientException):
+        return '%s %s' % (exc.code, exc.__class__.__name__)
+    return exc.__class__.__name__
+
+
+class OperationStats(object):
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        return {'requests': len(latencies),
+                'errors': sum(self.errors.values()),
+                'throughput': len(latencies) / elapsed if elapsed else 0.0,
+                'p50': percentile(latencies, 0.50),
+                'p90': percentile(latencies, 0.90),
+                'p99': percentile(latencies, 0.99),
+                'max': latencies[-1] if latencies else None}
+
+
+class LoadGenerator(object):
+    """Run a weighted mix of operations for a while and time them.
+
+    :param operations: list of (name, weight, fn) tuples, fn taking no
+                       argument.
+    :param duration: seconds to generate load for.
+    :param concurrency: number of workers, i.e. the most calls in flight.
+    :param rate: calls started per second, None to call back to back.
+    :param seed: seed of the choice of the operations.
+    """
+
+    def __init__(self, operations, duration=10, concurrency=10, rate=None,
+                 seed=None, clock=time.time, sleep=time.sleep):
+        if not operations:
+            raise ValueError("No operation to run")
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+        if rate is not None and rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.operations = operations
+        self.duration = duration
+        self.concurrency = concurrency
+        self.rate = rate
+        self.stats = dict((name, OperationStats())
+                          for name, _weight, _fn in operations)
+        self.elapsed = None
+        self.late = 0
+        self._busy = 0
+        self._rng = random.Random(seed)
+        self._total_weight = float(sum(w for _n, w, _f in operations))
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def _choose(self):
+        with self._lock:
+            point = self._rng.uniform(0, self._total_weight)
+        for name, weight, fn in self.operations:
+            point -= weight
+            if point <= 0:
+                return name, fn
+        return self.operations[-1][0], self.operations[-1][2]
+
+    def _call(self, scheduled=None):
+        name, fn = self._choose()
+        start = self._clock()
+        error = None
+        try:
+            fn()
+        except Exception as e:
+            error = e
+        latency = self._clock() - (start if scheduled is None else scheduled)
+        with self._lock:
+            stats = self.stats[name]
+            stats.latencies.append(latency)
+            if error is not None:
+                key = error_key(error)
+                stats.errors[key] = stats.errors.get(key, 0) + 1
+
+    def run(self):
+        """Generate the load, then return the report, see :meth:`report`."""
+        start = self._clock()
+        end = start + self.duration
+        if self.rate is None:
+            target = self._closed_loop
+            args = (end,)
+        else:
+            # Unbounded, so that no scheduled call is dropped.
+            schedule = queue.Queue()
+            target = self._open_loop
+            args = (schedule,)
+        workers = [threading.Thread(target=target, args=args)
+                   for _i in range(self.concurrency)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        if self.rate is not None:
+            self._schedule(schedule, start, end)
+        for worker in workers:
+            worker.join()
+        self.elapsed = self._clock() - start
+        return self.report()
+
+    def _closed_loop(self, end):
+        while self._clock() < end:
+            self._call()
+
+    def _open_loop(self, schedule):
+        while True:
+            scheduled = schedule.get()
+            if scheduled is None:
+                return
+            with self._lock:
+                self._busy += 1
+            try:
+                self._call(scheduled)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+
+    def _schedule(self, schedule, start, end):
+        interval = 1.0 / self.rate
+        scheduled = start
+        while scheduled < end:
+            now = self._clock()
+            if scheduled > now:
+                self._sleep(scheduled - now)
+            with self._lock:
+                if self._busy + schedule.qsize() >= self.concurrency:
+                    # Every worker is busy: the call starts late, the API
+                    # can not keep up with the rate.
+                    self.late += 1
+            schedule.put(scheduled)
+            scheduled += interval
+        for _i in range(self.concurrency):
+            schedule.put(None)
+
+    def report(self):
+        """Return the results of the run.
+
+        A dict with the elapsed seconds, the calls started late because
+        every worker was busy, the summary of every operation and of all of
+        them (under None), and the errors as a dict of counts keyed by
+        (operation, error).
+        """
+        total = OperationStats()
+        errors = {}
+        operations = {}
+        with self._lock:
+            for name, stats in self.stats.items():
+                operations[name] = stats.summary(self.elapsed)
+                total.latencies.extend(stats.latencies)
+                for key, count in stats.errors.items():
+                    errors[(name, key)] = count
+                    total.errors[key] = total.errors.get(key, 0) + count
+        operations[None] = total.summary(self.elapsed)
+        return {'elapsed': self.elapsed,
+                'late': self.late,
+                'operations': operations,
+                'errors': errors}
@@ -0,0 +1,189 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+In-process metrics of the client: counters and latency histograms.
+
+The client records:
+
+- call_seconds: histogram of the manager calls, by operation, eg:
+  plans.list or resources.get_resource_detail;
+- call_errors: counter of the calls raising, by operation and error;
+- request_seconds: histogram of the HTTP requests, by method and status
+  class (2xx, 3xx, 4xx, 5xx, or error when no answer came back);
+- retries: counter of the requests retried, by method;
+- bytes_sent and bytes_received: counters of the bodies of the answered
+  requests, by method;
+- authentications: counter of the tokens fetched.
+
+Recording takes a lock and a few dict lookups, the histograms having
+fixed buckets, so that it can be left on in production.
+"""
+
+import bisect
+import functools
+import threading
+import time
+
+# Upper bounds of the latency buckets, in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+HELP = {
+    'call_seconds': 'Duration of the manager calls.',
+    'call_errors': 'Manager calls raising an error.',
+    'request_seconds': 'Duration of the HTTP requests.',
+    'retries': 'HTTP requests retried.',
+    'bytes_sent': 'Bytes of the bodies of the HTTP requests.',
+    'bytes_received': 'Bytes of the bodies of the HTTP responses.',
+    'authentications': 'Tokens fetched from keystone.',
+}
+
+ERROR = 'error'
+
+
+def status_class(code):
+    """Return the class of an HTTP status, eg: 4xx for 404."""
+    return '%dxx' % (code // 100)
+
+
+class Histogram(object):
+    """Counts of observations falling under each bucket bound."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # The last count is for the observations above every bound.
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """Return the count, sum and cumulative (bound, count) buckets."""
+        buckets = []
+        total = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class Registry(object):
+    """Thread-safe counters and histograms, identified by a name and labels.
+
+    :param buckets: the upper bounds of the histogram buckets, in seconds.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Add an observation, eg: a duration, to a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def snapshot(self):
+        """Return the metrics recorded so far, keyed by name.
+
+        Every metric is a dict with its type (COUNTER or HISTOGRAM), help
+        text and samples, one per set of labels: a dict with the labels
+        and either the value of the counter, or the count, sum and
+        cumulative buckets of the histogram.
+        """
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = [(key, histogram.snapshot())
+                          for key, histogram in self._histograms.items()]
+        result = {}
+        for (name, labels), value in counters:
+            sample = {'labels': dict(labels), 'value': value}
+            self._metric(result, name, COUNTER)['samples'].append(sample)
+        for (name, labels), sample in histograms:
+            sample['labels'] = dict(labels)
+            self._metric(result, name, HISTOGRAM)['samples'].append(sample)
+        return result
+
+    def _metric(self, result, name, kind):
+        metric = result.get(name)
+        if metric is None:
+            metric = result[name] = {'type': kind,
+                                     'help': HELP.get(name, ''),
+                                     'samples': []}
+        return metric
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def _timed(registry, operation, fn):
+    @functools.wraps(fn)
+    def timed(*args, **kwargs):
+        start = time.time()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            registry.inc('call_errors', operation=operation,
+                         error=e.__class__.__name__)
+            raise
+        finally:
+            registry.observe('call_seconds', time.time() - start,
+                             operation=operation)
+
+    return timed
+
+
+def manager_methods(manager):
+    """Yield the (name, bound method) of the API methods of manager.
+
+    That is the methods listed in its api_methods, see
+    :class:`conveyorclient.base.Manager`. The helpers, eg: find() or the
+    cache invalidations, are left out.
+    """
+    for attr in manager.api_methods:
+        yield attr, getattr(manager, attr)
+
+
+def instrument(manager, name, registry):
+    """Record the calls of the API methods of manager in registry.
+
+    The operations are named after name and the method, eg: plans.list.
+    """
+    for attr, method in manager_methods(manager):
+        setattr(manager, attr, _timed(registry, '%s.%s' % (name, attr),
+                                      method))
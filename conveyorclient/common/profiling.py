@@ -0,0 +1,88 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+CPU and memory profiling of a block of code, for the --profile and
+--profile-memory options of the shell.
+"""
+
+from __future__ import print_function
+
+import contextlib
+import cProfile
+import pstats
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python < 3.4
+    tracemalloc = None
+
+from conveyorclient import exceptions
+
+DEFAULT_TOP = 20
+
+
+@contextlib.contextmanager
+def profile(stats_file=None, memory=False, top=DEFAULT_TOP, stream=None):
+    """Profile the block.
+
+    :param stats_file: run cProfile and save its stats to this file, which
+                       pstats or snakeviz can load.
+    :param memory: trace the allocations with tracemalloc.
+    :param top: number of functions, or allocation sites, summarized.
+    :param stream: where the summaries are printed, stderr by default.
+    """
+    if memory and tracemalloc is None:
+        raise exceptions.CommandError("Memory profiling needs Python 3.4 "
+                                      "or later.")
+    stream = stream or sys.stderr
+    profiler = cProfile.Profile() if stats_file else None
+    if memory:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        if profiler:
+            profiler.dump_stats(stats_file)
+            print("\nProfile saved to %s, %s functions by cumulative "
+                  "time:" % (stats_file, top), file=stream)
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.strip_dirs().sort_stats('cumulative').print_stats(top)
+        if memory:
+            _print_allocations(snapshot, current, peak, top, stream)
+
+
+def _print_allocations(snapshot, current, peak, top, stream):
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    print("\nMemory: %.1f KiB allocated at the end, %.1f KiB at the peak. "
+          "Top %s allocation sites:" % (current / 1024.0, peak / 1024.0, top),
+          file=stream)
+    for index, stat in enumerate(snapshot.statistics('lineno')[:top], 1):
+        frame = stat.traceback[0]
+        print("%3d. %s:%s: %.1f KiB in %s blocks"
+              % (index, frame.filename, frame.lineno, stat.size / 1024.0,
+                 stat.count), file=stream)
@@ -0,0 +1,107 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Client side rate limiting of the requests sent to the conveyor API.
+"""
+
+import threading
+import time
+
+try:
+    from eventlet import sleep
+except ImportError:
+    from time import sleep
+
+from conveyorclient.common import deadline
+
+
+class TokenBucket(object):
+    """A token bucket refilled at rate tokens per second.
+
+    The bucket holds at most burst tokens, so up to burst requests can be
+    sent at once after an idle period. It is safe to share between threads:
+    waiters reserve their token under the lock and then sleep outside of
+    it, so they are served in arrival order.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.time):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return the seconds to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) *
+                               self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter(object):
+    """Limit the request rate, overall and per path class.
+
+    The path class of a request is the first segment of its path, eg:
+    'resources' for ``/resources/detail``.
+
+    :param rate: requests per second, None for no overall limit.
+    :param burst: requests that may be sent at once, defaults to rate.
+    :param path_classes: dict mapping a path class to a (rate, burst)
+                         tuple, limiting it further.
+    """
+
+    def __init__(self, rate=None, burst=None, path_classes=None,
+                 clock=time.time, sleep=sleep):
+        self.bucket = TokenBucket(rate, burst, clock) if rate else None
+        self.path_buckets = dict(
+            (path_class, TokenBucket(class_rate, class_burst, clock))
+            for path_class, (class_rate, class_burst)
+            in (path_classes or {}).items())
+        self._sleep = sleep
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def path_class(url):
+        """Return the path class of url, a path relative to the endpoint."""
+        return url.split('?', 1)[0].strip('/').split('/', 1)[0]
+
+    def acquire(self, url):
+        """Wait until a request to url may be sent.
+
+        Returns the seconds waited. Raises DeadlineExceeded instead of
+        waiting past the deadline of the calling thread.
+        """
+        wait = 0.0
+        if self.bucket is not None:
+            wait = self.bucket.reserve()
+        bucket = self.path_buckets.get(self.path_class(url))
+        if bucket is not None:
+            wait = max(wait, bucket.reserve())
+        if wait > 0:
+            deadline.sleep(wait, self._sleep)
+            with self._lock:
+                self.waited += wait
+        return wait
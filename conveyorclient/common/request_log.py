@@ -0,0 +1,136 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Structured log of the HTTP requests of the client, one JSON object per
+line::
+
+    {"time": 1500000000.0, "method": "GET", "path": "/plans/detail",
+     "status": 200, "duration": 0.012, "request_bytes": 0,
+     "response_bytes": 5321, "request_id": "req-...", "retry": 0}
+
+Unlike --debug, which logs every request and response in full, a fraction
+of the requests can be logged, the failed ones always being, and the
+bodies are left out or truncated to a few bytes before the passwords are
+masked. Headers are never logged, they hold the tokens.
+"""
+
+import json
+import random
+import threading
+
+from oslo_utils import strutils
+import six
+
+from conveyorclient.common import tracing
+
+DEFAULT_MAX_BODY = 0
+
+# Bytes masked past the truncation, so that a password cut by it is still
+# recognized and masked.
+MASK_MARGIN = 256
+
+# Bytes of the error messages logged when the bodies are left out.
+MAX_ERROR = 200
+
+
+def _size(body):
+    return len(body) if body else 0
+
+
+class RequestLog(object):
+    """Write a JSON line per HTTP request.
+
+    :param output: the file to append the lines to, or a stream.
+    :param sample_rate: fraction of the successful requests logged.
+    :param log_errors: log every failed request, whatever the sample rate.
+    :param max_body: log the bodies truncated to this many bytes, 0 to
+                     leave them out.
+    """
+
+    def __init__(self, output, sample_rate=1.0, log_errors=True,
+                 max_body=DEFAULT_MAX_BODY, rng=None):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("The sample rate must be between 0 and 1")
+        if isinstance(output, six.string_types):
+            # Line buffered, so that the lines are complete whenever the
+            # process stops.
+            self._stream = open(output, 'a', 1)
+            self._owned = True
+        else:
+            self._stream = output
+            self._owned = False
+        self.sample_rate = sample_rate
+        self.log_errors = log_errors
+        self.max_body = max_body
+        self._random = (rng or random.Random()).random
+        self._lock = threading.Lock()
+
+    def sampled(self):
+        """Tell whether the next successful request is to be logged."""
+        return self.sample_rate >= 1 or self._random() < self.sample_rate
+
+    def record(self, method, path, start, duration, status=None, resp=None,
+               retry=0, error=None):
+        """Log a request, answered with resp unless it failed with error.
+
+        :param status: the status of the answer, None when none came back.
+        """
+        entry = {'time': start,
+                 'method': method,
+                 'path': path,
+                 'status': status,
+                 'duration': round(duration, 6),
+                 'retry': retry}
+        if resp is not None:
+            request_body = (resp.request.body if resp.request is not None
+                            else None)
+            entry['request_bytes'] = _size(request_body)
+            entry['response_bytes'] = _size(resp.content)
+            entry['request_id'] = tracing.request_id(resp.headers)
+            if self.max_body:
+                entry['request_body'] = self._truncate(request_body)
+                entry['response_body'] = self._truncate(resp.content)
+        if error is not None:
+            entry['request_id'] = getattr(error, 'request_id', None)
+            entry['error'] = self._truncate(
+                '%s: %s' % (error.__class__.__name__, error),
+                self.max_body or MAX_ERROR)
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._stream.write(line)
+
+    def _truncate(self, body, max_body=None):
+        if not body:
+            return None
+        max_body = max_body or self.max_body
+        # Masking the whole body would cost too much, mask the part kept.
+        head = body[:max_body + MASK_MARGIN]
+        if isinstance(head, six.binary_type):
+            head = head.decode('utf-8', 'replace')
+        truncated = strutils.mask_password(head)[:max_body]
+        if len(body) > max_body:
+            truncated += '...(%d bytes)' % len(body)
+        return truncated
+
+    def close(self):
+        if self._owned:
+            with self._lock:
+                self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
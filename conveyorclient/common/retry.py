@@ -0,0 +1,150 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Retry policy of the conveyor HTTP clients.
+"""
+
+import calendar
+import email.utils
+import random
+import time
+
+# Statuses retried by default: throttling and transient server errors.
+DEFAULT_RETRY_STATUSES = (413, 429, 500, 502, 503, 504)
+
+
+def parse_retry_after(value, now=None):
+    """Return the seconds to wait from a Retry-After header value.
+
+    Both the delta-seconds and the HTTP-date forms are accepted. Returns
+    None if the value can not be parsed.
+    """
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    if parsed[9] is None:
+        timestamp = calendar.timegm(parsed[:9])
+    else:
+        timestamp = email.utils.mktime_tz(parsed)
+    return max(timestamp - (now or time.time()), 0.0)
+
+
+class RetryPolicy(object):
+    """Decide whether and when a failed request is retried.
+
+    Delays follow the "decorrelated jitter" backoff: each delay is drawn
+    at random between base_delay and three times the previous delay, capped
+    by max_delay, so that many clients failing together do not retry in
+    lockstep.
+
+    :param max_attempts: attempts per request, including the first one.
+    :param base_delay: minimal delay between two attempts, in seconds.
+    :param max_delay: maximal delay between two attempts, in seconds.
+    :param retry_statuses: HTTP statuses to retry. Either a list, or a dict
+                           mapping a status to the maximal number of
+                           retries for it (None meaning max_attempts).
+    :param retry_connection_errors: retry when the connection fails.
+    :param respect_retry_after: wait as long as the Retry-After header of
+                                413, 429 and 503 responses asks for.
+    :param max_retry_after: give up instead of honoring a Retry-After
+                            longer than this, in seconds.
+    :param budget: maximal total delay slept for one request, in seconds.
+                   A retry that would exceed it is not attempted.
+    """
+
+    def __init__(self, max_attempts=1, base_delay=1.0, max_delay=30.0,
+                 retry_statuses=DEFAULT_RETRY_STATUSES,
+                 retry_connection_errors=True, respect_retry_after=True,
+                 max_retry_after=120.0, budget=None):
+        self.max_attempts = max(int(max_attempts), 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        if isinstance(retry_statuses, dict):
+            self.retry_statuses = dict(retry_statuses)
+        else:
+            self.retry_statuses = dict((s, None) for s in retry_statuses)
+        self.retry_connection_errors = retry_connection_errors
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+
+    @classmethod
+    def from_retries(cls, retries, **kwargs):
+        """Build the policy matching the legacy ``retries`` option."""
+        return cls(max_attempts=int(retries or 0) + 1, **kwargs)
+
+    def start(self):
+        """Return the retry state of a new request."""
+        return RetryState(self)
+
+
+class RetryState(object):
+    """Book-keeping of the retries of a single request."""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.retries = 0
+        self.slept = 0.0
+        self._last_delay = policy.base_delay
+        self._status_retries = {}
+
+    def next_delay(self, status=None, retry_after=None):
+        """Return the seconds to wait before retrying, or None to give up.
+
+        :param status: the HTTP status of the failed attempt, None for a
+                       connection error.
+        :param retry_after: the Retry-After header of the response.
+        """
+        policy = self.policy
+        if self.retries + 1 >= policy.max_attempts:
+            return None
+
+        if status is None:
+            if not policy.retry_connection_errors:
+                return None
+        else:
+            if status not in policy.retry_statuses:
+                return None
+            limit = policy.retry_statuses[status]
+            done = self._status_retries.get(status, 0)
+            if limit is not None and done >= limit:
+                return None
+            self._status_retries[status] = done + 1
+
+        delay = min(policy.max_delay,
+                    random.uniform(policy.base_delay, self._last_delay * 3))
+        self._last_delay = delay
+
+        if (policy.respect_retry_after and status in (413, 429, 503) and
+                retry_after is not None):
+            wait = parse_retry_after(retry_after)
+            if wait is not None:
+                if (policy.max_retry_after is not None and
+                        wait > policy.max_retry_after):
+                    return None
+                delay = max(delay, wait)
+
+        if policy.budget is not None and self.slept + delay > policy.budget:
+            return None
+
+        self.retries += 1
+        self.slept += delay
+        return delay
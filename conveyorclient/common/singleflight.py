@@ -0,0 +1,79 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Duplicate call suppression for concurrent identical requests.
+"""
+
+import sys
+import threading
+
+import six
+
+from conveyorclient.common import deadline
+from conveyorclient import exceptions
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class SingleFlight(object):
+    """Run a function at most once at a time per key.
+
+    Callers asking for a key while a call for it is in flight wait for that
+    call and share its result (or exception) instead of making their own.
+    They wait no longer than their own :mod:`deadline`.
+
+    :param copy: function returning the copy of the result given to each
+                 waiting caller, so that they do not share mutable data.
+    """
+
+    def __init__(self, copy=None):
+        self._copy = copy
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            if not call.done.wait(deadline.timeout()):
+                raise exceptions.DeadlineExceeded(deadline.current().budget)
+            if call.exc_info:
+                six.reraise(*call.exc_info)
+            if self._copy is not None:
+                return self._copy(call.result)
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception:
+            call.exc_info = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
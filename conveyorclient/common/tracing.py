@@ -0,0 +1,229 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Tracing of the calls of the client.
+
+A client given a tracer opens a span around every call of its managers,
+eg: plans.list or clones.clone, and a child span around every HTTP request
+the call makes. The context of the span is sent along with the request, so
+that the server can attach its own spans to the trace, and the
+x-openstack-request-id of the answer is recorded on the span.
+
+Without a tracer, the managers and the requests are left untouched.
+
+- :class:`Tracer` propagates W3C trace context (traceparent) headers and
+  hands the finished spans to a callback;
+- :class:`OSProfilerTracer` records the spans with osprofiler and
+  propagates its X-Trace-Info headers, like the OpenStack services.
+
+The current span is kept per thread, like the deadlines, and is carried
+over to the threads of the bulk operations and of the hedged requests.
+"""
+
+import contextlib
+import functools
+import logging
+import random
+import re
+import threading
+import time
+
+try:
+    from osprofiler import profiler as osprofiler_profiler
+    from osprofiler import web as osprofiler_web
+except ImportError:
+    osprofiler_profiler = None
+    osprofiler_web = None
+
+from conveyorclient.common import metrics
+
+LOG = logging.getLogger(__name__)
+
+REQUEST_ID_HEADERS = ('x-openstack-request-id', 'x-compute-request-id')
+
+_TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-'
+                          r'[0-9a-f]{2}$')
+
+_local = threading.local()
+
+
+def current():
+    """Return the span of the current thread, or None."""
+    return getattr(_local, 'span', None)
+
+
+@contextlib.contextmanager
+def attach(span):
+    """Make span, eg: the one of another thread, the current one."""
+    outer = current()
+    _local.span = span
+    try:
+        yield span
+    finally:
+        _local.span = outer
+
+
+def request_id(headers):
+    """Return the request id of the headers of an answer, or None."""
+    for name in REQUEST_ID_HEADERS:
+        value = headers.get(name)
+        if value:
+            return value
+    return None
+
+
+def _random_id(bits):
+    value = 0
+    while not value:
+        value = random.getrandbits(bits)
+    return '%0*x' % (bits // 4, value)
+
+
+class Span(object):
+    """A timed operation of a trace, with tags."""
+
+    def __init__(self, name, trace_id, span_id, parent_id=None, tags=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.tags = tags or {}
+        self.error = None
+        self.start = time.time()
+        self.end = None
+
+    def set_tag(self, key, value):
+        self.tags[key] = value
+
+    @property
+    def duration(self):
+        return None if self.end is None else self.end - self.start
+
+    def to_dict(self):
+        return {'name': self.name,
+                'trace_id': self.trace_id,
+                'span_id': self.span_id,
+                'parent_id': self.parent_id,
+                'start': self.start,
+                'duration': self.duration,
+                'error': self.error,
+                'tags': self.tags}
+
+
+def _log_span(span):
+    LOG.debug("Span %(name)s %(trace_id)s/%(span_id)s (parent %(parent_id)s)"
+              " took %(duration).3fs, error: %(error)s, %(tags)s",
+              span.to_dict())
+
+
+class Tracer(object):
+    """Spans propagated with W3C trace context headers.
+
+    :param report: function called with every finished :class:`Span`, to
+                   export it. The spans are logged at the debug level by
+                   default.
+    """
+
+    def __init__(self, report=None):
+        self.report = report or _log_span
+
+    @contextlib.contextmanager
+    def span(self, name, traceparent=None, **tags):
+        """Open a span, child of the current one.
+
+        :param traceparent: the traceparent header of a remote caller, to
+                            continue its trace instead.
+        """
+        parent = current()
+        match = _TRACEPARENT.match(traceparent or '')
+        if match:
+            trace_id, parent_id = match.groups()
+        elif parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = _random_id(128), None
+        span = Span(name, trace_id, _random_id(64), parent_id, tags)
+        try:
+            with attach(span):
+                yield span
+        except Exception as e:
+            span.error = e.__class__.__name__
+            raise
+        finally:
+            span.end = time.time()
+            try:
+                self.report(span)
+            except Exception as e:
+                LOG.warning("Unable to report the span %s: %s", name, e)
+
+    def inject(self, headers):
+        """Add the context of the current span to the request headers."""
+        span = current()
+        if span is not None:
+            headers['traceparent'] = '00-%s-%s-01' % (span.trace_id,
+                                                      span.span_id)
+
+
+class OSProfilerTracer(object):
+    """Spans recorded with osprofiler.
+
+    Nothing is recorded until osprofiler.profiler.init() has been called
+    with the HMAC key of the cloud, in the thread of the calls. The
+    traceparent of :meth:`Tracer.span` is ignored, osprofiler carries its
+    own context.
+    """
+
+    def __init__(self):
+        if osprofiler_profiler is None:
+            raise ImportError("Tracing with osprofiler needs the osprofiler "
+                              "package.")
+
+    @contextlib.contextmanager
+    def span(self, name, traceparent=None, **tags):
+        span = Span(name, None, None, tags=tags)
+        if osprofiler_profiler.get() is None:
+            yield span
+            return
+        osprofiler_profiler.start(name, info=dict(tags))
+        try:
+            yield span
+        except Exception as e:
+            span.error = e.__class__.__name__
+            span.set_tag('error', span.error)
+            raise
+        finally:
+            osprofiler_profiler.stop(info=span.tags)
+
+    def inject(self, headers):
+        headers.update(osprofiler_web.get_trace_id_headers())
+
+
+def _traced(tracer, operation, fn):
+    @functools.wraps(fn)
+    def traced(*args, **kwargs):
+        with tracer.span(operation):
+            return fn(*args, **kwargs)
+
+    return traced
+
+
+def instrument(manager, name, tracer):
+    """Open a span named name.method around the calls of manager.
+
+    The same methods are traced as with :func:`metrics.instrument`.
+    """
+    for attr, method in metrics.manager_methods(manager):
+        setattr(manager, attr, _traced(tracer, '%s.%s' % (name, attr),
+                                       method))
@@ -0,0 +1,122 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+HTTP over unix domain sockets for requests.
+
+A conveyor API listening on a local unix socket is reached with an
+http+unix URL whose host is the percent-encoded path of the socket::
+
+    http+unix://%2Fvar%2Frun%2Fconveyor.sock/v1/<tenant_id>
+
+Mount :class:`UnixAdapter` on a requests session to send such URLs, see
+:func:`mount`.
+"""
+
+import socket
+import threading
+
+from requests import adapters
+from six.moves.urllib import parse
+
+try:
+    from requests.packages.urllib3 import connection
+    from requests.packages.urllib3 import connectionpool
+except ImportError:
+    from urllib3 import connection
+    from urllib3 import connectionpool
+
+SCHEME = 'http+unix'
+
+
+def url(socket_path, path=''):
+    """Return the http+unix URL of path on the server of socket_path."""
+    return '%s://%s%s' % (SCHEME, parse.quote(socket_path, safe=''), path)
+
+
+def mount(session):
+    """Let the requests session send http+unix requests."""
+    prefix = SCHEME + '://'
+    if prefix not in session.adapters:
+        session.mount(prefix, UnixAdapter())
+
+
+class UnixHTTPConnection(connection.HTTPConnection):
+
+    def __init__(self, socket_path, **kwargs):
+        super(UnixHTTPConnection, self).__init__('localhost', **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+
+class UnixHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+
+    def __init__(self, socket_path, **kwargs):
+        super(UnixHTTPConnectionPool, self).__init__('localhost', **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        self.num_connections += 1
+        return UnixHTTPConnection(self.socket_path,
+                                  timeout=self.timeout.connect_timeout)
+
+
+class UnixAdapter(adapters.HTTPAdapter):
+    """A requests transport adapter for http+unix URLs.
+
+    It keeps a pool of connections per socket.
+    """
+
+    def __init__(self, pool_maxsize=adapters.DEFAULT_POOLSIZE, **kwargs):
+        super(UnixAdapter, self).__init__(pool_maxsize=pool_maxsize, **kwargs)
+        self._unix_pool_maxsize = pool_maxsize
+        self._unix_pools = {}
+        self._unix_lock = threading.Lock()
+
+    def _get_pool(self, request_url):
+        socket_path = parse.unquote(parse.urlsplit(request_url).netloc)
+        with self._unix_lock:
+            pool = self._unix_pools.get(socket_path)
+            if pool is None:
+                pool = UnixHTTPConnectionPool(
+                    socket_path, maxsize=self._unix_pool_maxsize)
+                self._unix_pools[socket_path] = pool
+            return pool
+
+    def get_connection(self, url, proxies=None):
+        return self._get_pool(url)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None,
+                                        cert=None):
+        return self._get_pool(request.url)
+
+    def request_url(self, request, proxies):
+        return request.path_url
+
+    def close(self):
+        super(UnixAdapter, self).close()
+        with self._unix_lock:
+            pools, self._unix_pools = self._unix_pools, {}
+        for pool in pools.values():
+            pool.close()
@@ -67,6 +67,27 @@ class ConnectionError(Exception):
     pass
 
 
+class CircuitOpen(ConnectionError):
+    """The circuit breaker of the endpoint is open: the API is considered
+       unavailable and the request was not sent.
+    """
+    def __init__(self, endpoint=None):
+        self.endpoint = endpoint
+
+    def __str__(self):
+        return ("Circuit breaker open for %s, the request was not sent."
+                % self.endpoint)
+
+
+class DeadlineExceeded(Exception):
+    """The time budget of the call was spent before it completed."""
+    def __init__(self, budget=None):
+        self.budget = budget
+
+    def __str__(self):
+        return "Deadline of %s seconds exceeded." % self.budget
+
+
 class AmbiguousEndpoints(Exception):
     """Found more than one matching endpoint in Service Catalog."""
     def __init__(self, endpoints=None):
@@ -80,11 +101,13 @@ class ClientException(Exception):
     """
     The base exception class for all exceptions this library raises.
     """
-    def __init__(self, code, message=None, details=None, request_id=None):
+    def __init__(self, code, message=None, details=None, request_id=None,
+                 retry_after=None):
         self.code = code
         self.message = message or self.__class__.message
         self.details = details
         self.request_id = request_id
+        self.retry_after = retry_after
 
     def __str__(self):
         formatted_string = "%s (HTTP %s)" % (self.message, self.code)
@@ -168,9 +191,12 @@ def from_response(response, body):
     """
     cls = _code_map.get(response.status_code, ClientException)
     if response.headers:
-        request_id = response.headers.get('x-compute-request-id')
+        request_id = (response.headers.get('x-openstack-request-id') or
+                      response.headers.get('x-compute-request-id'))
+        retry_after = response.headers.get('Retry-After')
     else:
         request_id = None
+        retry_after = None
     if body:
         message = "n/a"
         details = "n/a"
@@ -179,7 +205,7 @@ def from_response(response, body):
             message = error.get('message', None)
             details = error.get('details', None)
         return cls(code=response.status_code, message=message, details=details,
-                   request_id=request_id)
+                   request_id=request_id, retry_after=retry_after)
     else:
         return cls(code=response.status_code, request_id=request_id,
-                   message=response.reason)
+                   message=response.reason, retry_after=retry_after)
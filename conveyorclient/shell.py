@@ -39,11 +39,16 @@ from keystoneclient.exceptions import DiscoveryFailure
 from oslo_utils import encodeutils
 import six.moves.urllib.parse as urlparse
 
+from conveyorclient.common import cassette
+from conveyorclient.common import exporters
+from conveyorclient.common import profiling
+from conveyorclient.common import request_log
 from conveyorclient import client
 from conveyorclient import exceptions as exc
 from conveyorclient import utils
 import conveyorclient.auth_plugin
 import conveyorclient.extension
+from conveyorclient.common import concurrency
 from conveyorclient.common.gettextutils import _
 from conveyorclient.v1 import shell as shell_v1
 
@@ -102,6 +107,14 @@ class ConveyorClientArgumentParser(argparse.ArgumentParser):
 
 class OpenStackConveyorShell(object):
 
+    # Records or replays the HTTP exchanges, see --record and --replay.
+    cassette = None
+    # Flush the metrics of the client, see --metrics-textfile-dir and
+    # --metrics-statsd.
+    exporters = ()
+    # Logs the requests as JSON lines, see --request-log.
+    request_log = None
+
     def get_base_parser(self):
         parser = ConveyorClientArgumentParser(
             prog='conveyor',
@@ -177,6 +190,119 @@ class OpenStackConveyorShell(object):
                             default=0,
                             help='Number of retries.')
 
+        parser.add_argument('--timings',
+                            default=False,
+                            action='store_true',
+                            help="Print call timing info.")
+
+        parser.add_argument('--rate-limit',
+                            metavar='<requests/sec>',
+                            type=float,
+                            default=None,
+                            help='Maximal rate of the requests sent to the '
+                                 'conveyor API. Default: no limit.')
+
+        parser.add_argument('--max-concurrency',
+                            metavar='<requests>',
+                            type=int,
+                            default=concurrency.DEFAULT_MAX_LIMIT,
+                            help='Maximal number of concurrent requests of '
+                                 'the commands acting on several objects, '
+                                 'the actual number adapts to the load of '
+                                 'the API. Default=%d.'
+                                 % concurrency.DEFAULT_MAX_LIMIT)
+
+        parser.add_argument('--deadline',
+                            metavar='<seconds>',
+                            type=float,
+                            default=None,
+                            help='Total time the command may take, retries '
+                                 'and status polling included. '
+                                 'Default: no limit.')
+
+        parser.add_argument('--record',
+                            metavar='<cassette>',
+                            default=None,
+                            help='Record the HTTP exchanges of the command, '
+                                 'credentials scrubbed, to this file '
+                                 '(gzipped if it ends in .gz).')
+
+        parser.add_argument('--replay',
+                            metavar='<cassette>',
+                            default=None,
+                            help='Answer the HTTP requests of the command '
+                                 'from this file recorded with --record, '
+                                 'offline.')
+
+        parser.add_argument('--replay-speed',
+                            metavar='<factor>',
+                            type=float,
+                            default=1.0,
+                            help='Replay this many times faster than '
+                                 'recorded, 0 to answer at once. '
+                                 'Default=1.0.')
+
+        parser.add_argument('--profile',
+                            metavar='<file>',
+                            default=None,
+                            help='Profile the command with cProfile, save '
+                                 'the stats to this file and print the '
+                                 'functions taking the most time.')
+
+        parser.add_argument('--profile-memory',
+                            default=False,
+                            action='store_true',
+                            help='Trace the memory allocations of the '
+                                 'command and print the top allocation '
+                                 'sites.')
+
+        parser.add_argument('--metrics-textfile-dir',
+                            metavar='<directory>',
+                            default=utils.env('CONVEYOR_METRICS_TEXTFILE_DIR'),
+                            help='Write the metrics of the client to '
+                                 'conveyorclient.prom in this directory of '
+                                 'the textfile collector of the Prometheus '
+                                 'node exporter. '
+                                 'Default=env[CONVEYOR_METRICS_TEXTFILE_DIR].')
+
+        parser.add_argument('--metrics-statsd',
+                            metavar='<host:port>',
+                            default=utils.env('CONVEYOR_METRICS_STATSD'),
+                            help='Send the metrics of the client to this '
+                                 'StatsD server over UDP. '
+                                 'Default=env[CONVEYOR_METRICS_STATSD].')
+
+        parser.add_argument('--request-log',
+                            metavar='<file>',
+                            default=utils.env('CONVEYOR_REQUEST_LOG'),
+                            help='Append a JSON line per HTTP request to '
+                                 'this file: method, path, status, '
+                                 'duration, sizes, request id and retry '
+                                 'number. Default=env[CONVEYOR_REQUEST_LOG].')
+
+        parser.add_argument('--request-log-sample-rate',
+                            metavar='<fraction>',
+                            type=float,
+                            default=1.0,
+                            help='Fraction of the successful requests '
+                                 'logged by --request-log, the failed ones '
+                                 'are always logged. Default=1.0.')
+
+        parser.add_argument('--request-log-max-body',
+                            metavar='<bytes>',
+                            type=int,
+                            default=0,
+                            help='Also log the bodies, truncated to this '
+                                 'many bytes. Default=0, no body.')
+
+        parser.add_argument('--metrics-interval',
+                            metavar='<seconds>',
+                            type=float,
+                            default=None,
+                            help='Also export the metrics every this many '
+                                 'seconds, not only when the command '
+                                 'exits.')
+
         self._append_global_identity_args(parser)
 
         # The auth-system-plugins might require some extra options
@@ -247,6 +373,15 @@ class OpenStackConveyorShell(object):
         parser.add_argument('--os_auth_url',
                             help=argparse.SUPPRESS)
 
+        parser.add_argument('--os-conveyor-endpoint',
+                            metavar='<conveyor-endpoint>',
+                            default=utils.env('OS_CONVEYOR_ENDPOINT'),
+                            help='URL of the conveyor API to use instead of '
+                            'the one of the service catalog, eg: '
+                            'http+unix://%%2Fvar%%2Frun%%2Fconveyor.sock/v1/'
+                            '<tenant-id> for an API listening on a local unix '
+                            'socket. Default=env[OS_CONVEYOR_ENDPOINT].')
+
         parser.add_argument(
             '--os-user-id', metavar='<auth-user-id>',
             default=utils.env('OS_USER_ID'),
@@ -485,7 +620,34 @@ class OpenStackConveyorShell(object):
         ks_logger = logging.getLogger("keystoneclient")
         ks_logger.setLevel(logging.DEBUG)
 
+    def _start_exporters(self, args):
+        started = []
+        if self.cs.metrics is None:
+            return started
+        if args.metrics_textfile_dir:
+            started.append(exporters.PrometheusTextfile(
+                self.cs.metrics, args.metrics_textfile_dir,
+                interval=args.metrics_interval).start())
+        if args.metrics_statsd:
+            host, _sep, port = args.metrics_statsd.rpartition(':')
+            try:
+                port = int(port)
+            except ValueError:
+                raise exc.CommandError("--metrics-statsd must be "
+                                       "<host:port>.")
+            started.append(exporters.Statsd(
+                self.cs.metrics, host.strip('[]') or '127.0.0.1', port,
+                interval=args.metrics_interval).start())
+        return started
+
     def main(self, argv):
+        options, _args = self.get_base_parser().parse_known_args(argv)
+        if options.profile or options.profile_memory:
+            with profiling.profile(options.profile, options.profile_memory):
+                return self._main(argv)
+        return self._main(argv)
+
+    def _main(self, argv):
 
         # Parse args once to find version and debug settings
         parser = self.get_base_parser()
@@ -612,6 +774,24 @@ class OpenStackConveyorShell(object):
                 "You must provide an authentication URL "
                 "through --os-auth-url or env[OS_AUTH_URL].")
 
+        if args.record and args.replay:
+            raise exc.CommandError("--record and --replay can not be used "
+                                   "together.")
+        if args.record:
+            self.cassette = cassette.Cassette(args.record, cassette.RECORD)
+        elif args.replay:
+            self.cassette = cassette.Cassette(args.replay, cassette.REPLAY,
+                                              speed=args.replay_speed)
+
+        if args.request_log:
+            try:
+                self.request_log = request_log.RequestLog(
+                    args.request_log,
+                    sample_rate=args.request_log_sample_rate,
+                    max_body=args.request_log_max_body)
+            except (IOError, ValueError) as e:
+                raise exc.CommandError("Invalid --request-log: %s" % e)
+
         auth_session = self._get_keystone_session()
 
         self.cs = client.Client(options.os_conveyor_api_version, os_username,
@@ -623,10 +803,19 @@ class OpenStackConveyorShell(object):
                                 service_type=service_type,
                                 service_name=service_name,
                                 retries=options.retries,
+                                timings=args.timings,
+                                rate_limiter=args.rate_limit,
+                                max_concurrency=args.max_concurrency,
+                                endpoints=([args.os_conveyor_endpoint]
+                                           if args.os_conveyor_endpoint
+                                           else None),
                                 http_log_debug=args.debug,
                                 cacert=cacert, auth_system=os_auth_system,
                                 auth_plugin=auth_plugin,
-                                session=auth_session)
+                                session=auth_session,
+                                cassette=self.cassette,
+                                request_log=self.request_log)
+        self.exporters = self._start_exporters(args)
 
         try:
             if not utils.isunauthenticated(args.func):
@@ -665,7 +854,42 @@ class OpenStackConveyorShell(object):
                                "to the default API version: %s" %
                                endpoint_api_version)
 
-        args.func(self.cs, args)
+        try:
+            with self.cs.deadline(args.deadline):
+                args.func(self.cs, args)
+        finally:
+            if args.timings:
+                self._dump_timings(self.cs.get_timings())
+                self._dump_concurrency(self.cs.get_concurrency())
+
+    def _dump_timings(self, timings):
+        rows = []
+        total = 0.0
+        total_throttled = 0.0
+        for timing in timings:
+            seconds = timing['end'] - timing['start']
+            total += seconds
+            throttled = timing.get('throttled', 0.0)
+            total_throttled += throttled
+            rows.append({'Request': timing['request'],
+                         'Retries': timing['retries'],
+                         'Throttled': "%.3f" % throttled,
+                         'Seconds': "%.3f" % seconds})
+        rows.append({'Request': 'Total', 'Retries': '',
+                     'Throttled': "%.3f" % total_throttled,
+                     'Seconds': "%.3f" % total})
+        utils.print_list(rows, ['Request', 'Retries', 'Throttled', 'Seconds'],
+                         sort=False)
+
+    def _dump_concurrency(self, concurrency):
+        if not concurrency['history']:
+            return
+        start = concurrency['history'][0][0]
+        rows = [{'Seconds': "%.3f" % (changed_at - start),
+                 'Limit': limit,
+                 'Reason': reason}
+                for changed_at, limit, reason in concurrency['history']]
+        utils.print_list(rows, ['Seconds', 'Limit', 'Reason'], sort=False)
 
     def _run_extension_hooks(self, hook_type, *args, **kwargs):
         """Runs hooks for all registered extensions."""
@@ -787,6 +1011,8 @@ class OpenStackConveyorShell(object):
             verify = cacert or True
 
         ks_session = session.Session(verify=verify, cert=cert)
+        if self.cassette is not None:
+            self.cassette.mount(ks_session.session)
         # discover the supported keystone versions using the given url
         (v2_auth_url, v3_auth_url) = self._discover_auth_versions(
             session=ks_session,
@@ -833,12 +1059,12 @@ class OpenStackHelpFormatter(argparse.HelpFormatter):
 
 
 def main():
+    shell = OpenStackConveyorShell()
     try:
         if sys.version_info >= (3, 0):
-            OpenStackConveyorShell().main(sys.argv[1:])
+            shell.main(sys.argv[1:])
         else:
-            OpenStackConveyorShell().main(map(encodeutils.safe_decode,
-                                              sys.argv[1:]))
+            shell.main(map(encodeutils.safe_decode, sys.argv[1:]))
     except KeyboardInterrupt:
         print("... terminating conveyor client", file=sys.stderr)
         sys.exit(130)
@@ -846,6 +1072,13 @@ def main():
         logger.debug(e, exc_info=1)
         print("ERROR: %s" % six.text_type(e), file=sys.stderr)
         sys.exit(1)
+    finally:
+        for exporter in shell.exporters:
+            exporter.stop()
+        if shell.cassette is not None:
+            shell.cassette.close()
+        if shell.request_log is not None:
+            shell.request_log.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,350 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmarks of the client hot paths, run against the stub server.
+
+::
+
+    python -m conveyorclient.tests.benchmarks --output results.json
+    python -m conveyorclient.tests.benchmarks --baseline results.json
+
+The results are written as JSON. Given a baseline, i.e. the results of a
+previous run, every benchmark whose median got slower than the baseline by
+more than --threshold is reported as a regression and the exit status is 1.
+Baselines are only comparable on the same machine and interpreter.
+
+benchmarks_baseline.json, next to this module, is the baseline of 'tox -e
+bench', recorded at 1000 and 10000 plans. Record a new one with --output
+when the hot paths change on purpose, or to compare on another machine.
+"""
+
+from __future__ import print_function
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import six
+
+from conveyorclient.common import template_utils
+from conveyorclient.tests import stub_server
+from conveyorclient import utils
+from conveyorclient.v1 import client
+from conveyorclient.v1 import plans
+from conveyorclient.v1 import shell as v1_shell
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_THRESHOLD = 0.2
+PLAN_FIELDS = ['plan_id', 'plan_name', 'plan_type', 'plan_status',
+               'task_status', 'created_at']
+
+
+class _NullOutput(object):
+    """A stdout throwing away what is written, but not the formatting."""
+
+    def write(self, data):
+        pass
+
+    def flush(self):
+        pass
+
+
+@contextlib.contextmanager
+def _quiet():
+    stdout, sys.stdout = sys.stdout, _NullOutput()
+    try:
+        yield
+    finally:
+        sys.stdout = stdout
+
+
+def measure(fn, repeat=5, warmup=1):
+    """Time fn() repeat times after warmup calls, return the statistics."""
+    for _i in range(warmup):
+        fn()
+    samples = []
+    for _i in range(repeat):
+        start = time.time()
+        fn()
+        samples.append(time.time() - start)
+    samples.sort()
+    return {'repeat': repeat,
+            'min': samples[0],
+            'median': samples[len(samples) // 2],
+            'mean': sum(samples) / len(samples),
+            'max': samples[-1]}
+
+
+class _FakeHTTPClient(object):
+    """Return a canned body, to time Manager._list without the wire."""
+
+    def __init__(self, body):
+        self.body = body
+
+    def get(self, url, **kwargs):
+        return None, self.body
+
+
+class _FakeAPI(object):
+    def __init__(self, body):
+        self.client = _FakeHTTPClient(body)
+
+
+def _client(cloud):
+    return client.Client('user', 'password', 'tenant', cloud.auth_url,
+                         response_cache_size=0)
+
+
+def bench_plan_list(results, sizes, repeat):
+    for size in sizes:
+        with stub_server.StubCloud(plans=size, resources_per_plan=1) as cloud:
+            cs = _client(cloud)
+            results['plans.list[%d]' % size] = measure(
+                cs.plans.list, repeat=repeat)
+
+
+def bench_revalidated_plan_list(results, sizes, repeat):
+    # Every call after the first is answered 304 and decoded from the
+    # response cache, compare with plans.list.
+    for size in sizes:
+        with stub_server.StubCloud(plans=size, resources_per_plan=1) as cloud:
+            cs = client.Client('user', 'password', 'tenant', cloud.auth_url)
+            stats = measure(cs.plans.list, repeat=repeat)
+            stats['bytes_saved'] = cs.client.response_cache.bytes_saved
+            results['plans.list.revalidated[%d]' % size] = stats
+
+
+def bench_manager_list(results, sizes, repeat):
+    api = stub_server.StubConveyorAPI(plans=max(sizes), resources_per_plan=1)
+    data = [api.plans[plan_id] for plan_id in api._plan_order]
+    for size in sizes:
+        manager = plans.PlanManager(_FakeAPI({'plans': data[:size]}))
+        results['Manager._list[%d]' % size] = measure(
+            lambda: manager._list('/plans/detail', 'plans'), repeat=repeat)
+
+
+def bench_resource_list(results, sizes, repeat):
+    for size in sizes:
+        with stub_server.StubCloud(plans=0, servers=size) as cloud:
+            cs = _client(cloud)
+            server_type = 'OS::Nova::Server'
+
+            def list_and_print():
+                servers = cs.resources.list(search_opts={'type': server_type})
+                with _quiet():
+                    v1_shell._print_resources(servers, server_type)
+
+            results['resource-list[%d]' % size] = measure(
+                list_and_print, repeat=repeat)
+
+
+def _write_templates(directory, children, depth, resources):
+    """Write a template nesting depth levels of children templates.
+
+    Every template also has resources resources with a get_file, the
+    files of a level being shared by all of its templates.
+    """
+    for level in range(depth, -1, -1):
+        name = 'level%d.yaml' % level
+        with open(os.path.join(directory, 'script%d.sh' % level), 'w') as f:
+            f.write('#!/bin/sh\necho level %d\n' % level)
+        template = {'heat_template_version': '2013-05-23', 'resources': {}}
+        for i in range(resources):
+            template['resources']['server%d' % i] = {
+                'type': 'OS::Nova::Server',
+                'properties': {
+                    'name': 'server-%d-%d' % (level, i),
+                    'user_data': {'get_file': 'script%d.sh' % level}}}
+        if level < depth:
+            for i in range(children):
+                template['resources']['nested%d' % i] = {
+                    'type': 'level%d.yaml' % (level + 1),
+                    'properties': {}}
+        with open(os.path.join(directory, name), 'w') as f:
+            json.dump(template, f)
+    return os.path.join(directory, 'level0.yaml')
+
+
+def bench_template_contents(results, sizes, repeat):
+    directory = tempfile.mkdtemp()
+    try:
+        for resources in (100, 1000):
+            path = _write_templates(directory, children=4, depth=3,
+                                    resources=resources)
+            results['get_template_contents[%d]' % resources] = measure(
+                lambda: template_utils.get_template_contents(
+                    template_file=path), repeat=repeat)
+    finally:
+        shutil.rmtree(directory)
+
+
+def bench_print(results, sizes, repeat):
+    api = stub_server.StubConveyorAPI(plans=max(sizes), resources_per_plan=1)
+    data = [api.plans[plan_id] for plan_id in api._plan_order]
+    for size in sizes:
+        rows = data[:size]
+        with _quiet():
+            results['print_list[%d]' % size] = measure(
+                lambda: utils.print_list(rows, PLAN_FIELDS), repeat=repeat)
+            results['print_json[%d]' % size] = measure(
+                lambda: utils.print_json(rows), repeat=repeat)
+
+
+def bench_cli(results, sizes, repeat):
+    size = min(sizes)
+    with stub_server.StubCloud(plans=size, servers=size) as cloud:
+        base = [sys.executable, '-m', 'conveyorclient.shell',
+                '--os-auth-url', cloud.auth_url, '--os-username', 'user',
+                '--os-password', 'password', '--os-tenant-name', 'tenant']
+        plan_id = cloud.api._plan_order[0]
+        commands = [('help', ['help']),
+                    ('plan-list', ['plan-list']),
+                    ('plan-show', ['plan-show', plan_id]),
+                    ('resource-list', ['resource-list', 'OS::Nova::Server'])]
+        with open(os.devnull, 'w') as devnull:
+            for name, args in commands:
+                def run():
+                    subprocess.check_call(base + args, stdout=devnull,
+                                          stderr=devnull)
+
+                results['cli %s[%d]' % (name, size)] = measure(
+                    run, repeat=repeat)
+
+
+BENCHMARKS = [('plan_list', bench_plan_list),
+              ('revalidated_plan_list', bench_revalidated_plan_list),
+              ('manager_list', bench_manager_list),
+              ('resource_list', bench_resource_list),
+              ('template_contents', bench_template_contents),
+              ('print', bench_print),
+              ('cli', bench_cli)]
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compare the medians of results to those of baseline.
+
+    Returns a list of (name, baseline median, median, ratio, status) where
+    status is 'regression', 'improvement' or 'ok'.
+    """
+    report = []
+    for name, stats in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = stats['median'] / base['median'] if base['median'] else 1.0
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 - threshold:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        report.append((name, base['median'], stats['median'], ratio, status))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the client hot paths against the stub '
+                    'server.')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma separated data set sizes. '
+                             'Default=%(default)s.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Timed runs per benchmark. Default=5.')
+    parser.add_argument('--only', action='append', default=[],
+                        choices=[name for name, _fn in BENCHMARKS],
+                        help='Run only this benchmark, may be repeated.')
+    parser.add_argument('--output',
+                        help='Write the results to this JSON file.')
+    parser.add_argument('--baseline',
+                        help='Compare the results to those of this JSON '
+                             'file.')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Slowdown of the median flagged as a '
+                             'regression. Default=%(default)s.')
+    args = parser.parse_args(argv)
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+
+    # Keep the completion caches written by the listings out of $HOME.
+    cache_dir = tempfile.mkdtemp()
+    os.environ['V2VCLIENT_UUID_CACHE_DIR'] = cache_dir
+    results = {}
+    try:
+        for name, fn in BENCHMARKS:
+            if args.only and name not in args.only:
+                continue
+            print('Running %s...' % name, file=sys.stderr)
+            fn(results, sizes, args.repeat)
+    finally:
+        shutil.rmtree(cache_dir)
+
+    document = {
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': sizes,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+
+    rows = [[name, stats['min'], stats['median'], stats['max']]
+            for name, stats in sorted(results.items())]
+    utils.print_list(rows, ['Benchmark', 'Min', 'Median', 'Max'],
+                     formatters=dict((field, _column(i)) for i, field in
+                                     enumerate(['Benchmark', 'Min', 'Median',
+                                                'Max'])),
+                     sort=False)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    report = compare(results, baseline, args.threshold)
+    utils.print_list(
+        [[name, base, median, '%.2fx' % ratio, status]
+         for name, base, median, ratio, status in report],
+        ['Benchmark', 'Baseline', 'Median', 'Ratio', 'Status'],
+        formatters=dict((field, _column(i)) for i, field in
+                        enumerate(['Benchmark', 'Baseline', 'Median',
+                                   'Ratio', 'Status'])),
+        sort=False)
+    regressions = [row[0] for row in report if row[4] == 'regression']
+    if regressions:
+        print('Regressions: %s' % ', '.join(regressions), file=sys.stderr)
+        return 1
+    return 0
+
+
+def _column(index):
+    def format(row):
+        value = row[index]
+        if isinstance(value, float):
+            return '%.4f' % value
+        return six.text_type(value)
+    return format
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,328 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+A fake keystone and conveyor API for the unit tests.
+
+:class:`FakeCloud` takes the place of requests.Session.request and answers
+the requests of the clients in memory, so that they are exercised down to
+their HTTP requests without any server::
+
+    cloud = self.useFixture(fakes.FakeCloud(plans=3))
+    cs = client.Client('user', 'password', 'tenant', cloud.auth_url)
+    cs.plans.list()
+
+The requests to any other URL fail to connect.
+"""
+
+import collections
+import datetime
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+
+import fixtures
+import requests
+from six.moves import http_client
+from six.moves.urllib import parse
+
+TENANT_ID = 'c0ffee00c0ffee00c0ffee00c0ffee00'
+USER_ID = 'beef0000beef0000beef0000beef0000'
+REGION = 'RegionOne'
+AUTH_URL = 'http://keystone.example.com:5000/v2.0'
+
+RESOURCE_TYPES = ('OS::Nova::Server', 'OS::Cinder::Volume',
+                  'OS::Neutron::Net', 'OS::Neutron::Port')
+ZONES = ('az01', 'az02')
+
+
+def _timestamp(seconds):
+    return datetime.datetime.utcfromtimestamp(seconds).strftime(
+        '%Y-%m-%dT%H:%M:%S.000000')
+
+
+def _not_found(message):
+    return 404, {'itemNotFound': {'message': message, 'code': 404}}
+
+
+class FakeCloud(fixtures.Fixture):
+    """Keystone v2.0 and the conveyor v1 API of every region, in memory.
+
+    :param plans: number of plans of the data set.
+    :param regions: the regions having a conveyor endpoint.
+    :param replicas: number of conveyor endpoints of every region.
+    :param token_ttl: seconds the tokens are valid for.
+    """
+
+    def __init__(self, plans=3, regions=(REGION,), replicas=1,
+                 token_ttl=3600):
+        super(FakeCloud, self).__init__()
+        self.auth_url = AUTH_URL
+        self.endpoints = collections.OrderedDict(
+            (region, ['http://conveyor%d.%s.example.com:8899/v1/%s'
+                      % (i, region.lower(), TENANT_ID)
+                      for i in range(replicas)])
+            for region in regions)
+        self.token_ttl = token_ttl
+        self.plans = collections.OrderedDict()
+        for i in range(plans):
+            self.add_plan('plan-%06d' % i)
+        # Seconds every answer of the API takes, by endpoint.
+        self.latency = collections.defaultdict(float)
+        # Endpoints refusing the connections.
+        self.down = set()
+        # Answers the next requests to the API get instead of the normal
+        # one: a status, a (status, headers) tuple or an exception.
+        self.script = collections.deque()
+        # (method, endpoint, path) of the requests to the API.
+        self.calls = []
+        self.tokens_issued = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._revoked_before = 0
+        self._lock = threading.Lock()
+
+    def _setUp(self):
+        cloud = self
+
+        def request(session, method, url, **kwargs):
+            return cloud.request(method, url, **kwargs)
+
+        self.useFixture(fixtures.MonkeyPatch('requests.Session.request',
+                                             request))
+
+    @property
+    def endpoint(self):
+        """The first conveyor endpoint of the first region."""
+        return list(self.endpoints.values())[0][0]
+
+    @property
+    def requests(self):
+        """Number of requests made to the API."""
+        return len(self.calls)
+
+    def count(self, endpoint=None, method=None):
+        """Return the number of requests made to endpoint with method."""
+        return len([call for call in self.calls
+                    if endpoint in (None, call[1]) and
+                    method in (None, call[0])])
+
+    def add_plan(self, name, **values):
+        index = len(self.plans)
+        plan = {'plan_id': str(uuid.UUID(int=index + 1)),
+                'plan_name': name,
+                'plan_type': 'clone',
+                'plan_status': 'available',
+                'task_status': '',
+                'created_at': _timestamp(1483228800 + index * 60),
+                'project_id': TENANT_ID,
+                'user_id': USER_ID,
+                'clone_resources': [
+                    {'obj_type': RESOURCE_TYPES[0],
+                     'obj_id': str(uuid.UUID(int=1000 + index))}]}
+        plan.update(values)
+        self.plans[plan['plan_id']] = plan
+        return plan
+
+    def revoke_tokens(self):
+        """Reject the tokens issued so far with a 401."""
+        with self._lock:
+            self._revoked_before = self.tokens_issued
+
+    # HTTP
+
+    def request(self, method, url, data=None, headers=None, timeout=None,
+                **kwargs):
+        headers = headers or {}
+        body = json.loads(data) if data else None
+        if url.startswith(self.auth_url):
+            return self._keystone(method, url, body)
+        for endpoint in sorted((e for urls in self.endpoints.values()
+                                for e in urls), key=len, reverse=True):
+            if url.startswith(endpoint + '/'):
+                break
+        else:
+            raise requests.exceptions.ConnectionError(
+                'Unable to connect to %s' % url)
+        if endpoint in self.down:
+            raise requests.exceptions.ConnectionError(
+                'Connection refused by %s' % endpoint)
+
+        path, _sep, query = url[len(endpoint):].partition('?')
+        with self._lock:
+            self.calls.append((method, endpoint, path))
+            scripted = self.script.popleft() if self.script else None
+        delay = self.latency[endpoint]
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise requests.exceptions.ReadTimeout(
+                'Read timed out after %s seconds' % timeout)
+        if delay:
+            time.sleep(delay)
+        if isinstance(scripted, Exception):
+            raise scripted
+        if scripted is not None:
+            status, error_headers = (scripted if isinstance(scripted, tuple)
+                                     else (scripted, {}))
+            return self._response(method, url, data, status,
+                                  {'error': {'message': 'Scripted error',
+                                             'code': status}},
+                                  error_headers)
+        token = headers.get('X-Auth-Token') or ''
+        if (self._revoked_before and
+                self._token_number(token) <= self._revoked_before):
+            return self._response(method, url, data, 401, {
+                'error': {'message': 'The token is invalid.', 'code': 401}})
+
+        with self._lock:
+            status, result = self._route(method, path,
+                                         dict(parse.parse_qsl(query)), body)
+        if method != 'GET' or status != 200:
+            return self._response(method, url, data, status, result)
+        content = json.dumps(result).encode('utf-8')
+        etag = '"%s"' % hashlib.md5(content).hexdigest()
+        if headers.get('If-None-Match') == etag:
+            with self._lock:
+                self.not_modified += 1
+            return self._response(method, url, data, 304, None,
+                                  {'ETag': etag})
+        with self._lock:
+            self.bytes_sent += len(content)
+        return self._response(method, url, data, 200, result,
+                              {'ETag': etag})
+
+    def _response(self, method, url, data, status, result, headers=None):
+        resp = requests.Response()
+        resp.status_code = status
+        resp.reason = http_client.responses.get(status, '')
+        resp.url = url
+        resp.encoding = 'utf-8'
+        resp.headers.update(headers or {})
+        resp.headers['X-OpenStack-Request-Id'] = 'req-%s' % uuid.uuid4()
+        if result is not None:
+            resp.headers['Content-Type'] = 'application/json'
+            resp._content = json.dumps(result).encode('utf-8')
+        else:
+            resp._content = b''
+        resp.request = requests.Request(method, url, data=data).prepare()
+        return resp
+
+    def _token_number(self, token):
+        try:
+            return int(token.rsplit('-', 1)[1])
+        except (IndexError, ValueError):
+            return 0
+
+    # Keystone
+
+    def _keystone(self, method, url, body):
+        if method != 'POST' or not url.endswith('/tokens'):
+            return self._response(method, url, None, *_not_found(
+                'Unknown path %s' % url))
+        with self._lock:
+            self.tokens_issued += 1
+            token_id = 'fake-token-%d' % self.tokens_issued
+        now = time.time()
+        endpoints = [{'region': region, 'publicURL': endpoint,
+                      'internalURL': endpoint, 'adminURL': endpoint}
+                     for region, urls in self.endpoints.items()
+                     for endpoint in urls]
+        return self._response(method, url, json.dumps(body), 200, {
+            'access': {
+                'token': {'id': token_id,
+                          'issued_at': _timestamp(now) + 'Z',
+                          'expires': _timestamp(now + self.token_ttl) + 'Z',
+                          'tenant': {'id': TENANT_ID, 'name': 'tenant',
+                                     'enabled': True}},
+                'serviceCatalog': [{'type': 'conveyor', 'name': 'conveyor',
+                                    'endpoints': endpoints}],
+                'user': {'id': USER_ID, 'name': 'user', 'roles': []},
+                'metadata': {'roles': [], 'is_admin': 0}}})
+
+    # Conveyor API
+
+    def _route(self, method, path, query, body):
+        match = re.match(r'^/(\w+)(?:/([^/]+))?(?:/(action))?$', path)
+        handler = match and getattr(self, '_%s_%s' % (method.lower(),
+                                                      match.group(1)), None)
+        if handler is None:
+            return _not_found('Unknown path %s' % path)
+        return handler(match.group(2), query, body)
+
+    def _get_plans(self, plan_id, query, body):
+        if plan_id != 'detail':
+            if plan_id not in self.plans:
+                return _not_found('Plan %s could not be found.' % plan_id)
+            return 200, {'plan': self.plans[plan_id]}
+        sort_key = query.get('sort_key', 'created_at')
+        plans = sorted(self.plans.values(),
+                       key=lambda plan: plan.get(sort_key) or '',
+                       reverse=query.get('sort_dir', 'desc') == 'desc')
+        return 200, {'plans': plans}
+
+    def _post_plans(self, plan_id, query, body):
+        if plan_id is not None:
+            if plan_id not in self.plans:
+                return _not_found('Plan %s could not be found.' % plan_id)
+            return 202, None
+        info = body['plan']
+        plan = self.add_plan(info.get('plan_name'),
+                             plan_type=info.get('plan_type'),
+                             plan_status='initiating',
+                             clone_resources=info.get('clone_obj', []))
+        return 200, {'plan': plan}
+
+    def _put_plans(self, plan_id, query, body):
+        if plan_id not in self.plans:
+            return _not_found('Plan %s could not be found.' % plan_id)
+        self.plans[plan_id].update(body['plan'])
+        return 200, {'plan': self.plans[plan_id]}
+
+    def _delete_plans(self, plan_id, query, body):
+        if self.plans.pop(plan_id, None) is None:
+            return _not_found('Plan %s could not be found.' % plan_id)
+        return 202, None
+
+    def _get_resources(self, kind, query, body):
+        if kind == 'types':
+            return 200, {'types': [{'type': t} for t in RESOURCE_TYPES]}
+        return 200, {'resources': []}
+
+    def _post_resources(self, resource_id, query, body):
+        action, info = list(body.items())[0]
+        if action == 'get_resource_detail':
+            return 200, {'resource': {'id': resource_id,
+                                      'type': info['type'],
+                                      'name': 'resource-%s' % resource_id,
+                                      'properties': {}}}
+        if action == 'list-clone_resources_attribute':
+            return 200, {'attribute_list': list(ZONES)}
+        if action == 'list-all_availability_zones':
+            return 200, {'availability_zone_list': list(ZONES)}
+        return 202, None
+
+    def _post_clones(self, plan_id, query, body):
+        if plan_id not in self.plans:
+            return _not_found('Plan %s could not be found.' % plan_id)
+        self.plans[plan_id]['plan_status'] = 'cloning'
+        return 202, None
+
+    def _post_migrates(self, plan_id, query, body):
+        if plan_id not in self.plans:
+            return _not_found('Plan %s could not be found.' % plan_id)
+        self.plans[plan_id]['plan_status'] = 'migrating'
+        return 202, None
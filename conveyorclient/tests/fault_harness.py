@@ -0,0 +1,255 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure the retry, backoff and reauthentication of the client under faults.
+
+Every scenario schedules faults on the stub server (connection resets,
+5xx bursts, slow answers, token expiry, 413 throttling) while workers
+read plans back to back. It is run once per retry policy, and reports:
+
+- goodput, the calls succeeding per second;
+- wasted requests, those reaching the API without making a call succeed
+  (failed attempts, and every attempt of the calls failing in the end);
+- reauthentications;
+- the latency of the calls and their errors.
+
+::
+
+    python -m conveyorclient.tests.fault_harness --duration 10 \\
+        --scenario mixed --policy fast:max_attempts=4,base_delay=0.05
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from conveyorclient.common import loadgen
+from conveyorclient.common import retry
+from conveyorclient.tests import stub_server
+from conveyorclient import utils
+from conveyorclient.v1 import client
+
+
+def _resets(duration):
+    return [stub_server.Fault(stub_server.RESET, start=0.2 * duration,
+                              duration=0.6 * duration, rate=0.3)]
+
+
+def _error_burst(duration):
+    return [stub_server.Fault(stub_server.ERROR, start=0.3 * duration,
+                              duration=0.2 * duration, status=503)]
+
+
+def _slow(duration):
+    return [stub_server.Fault(stub_server.SLOW, start=0.2 * duration,
+                              duration=0.6 * duration, rate=0.2, delay=0.5)]
+
+
+def _token_expiry(duration):
+    return [stub_server.Fault(stub_server.EXPIRE, start=0.5 * duration)]
+
+
+def _throttling(duration):
+    return [stub_server.Fault(stub_server.THROTTLE, start=0.2 * duration,
+                              duration=0.6 * duration, rate=0.5,
+                              retry_after=1)]
+
+
+def _mixed(duration):
+    return [
+        stub_server.Fault(stub_server.RESET, start=0.1 * duration,
+                          duration=0.15 * duration, rate=0.3),
+        stub_server.Fault(stub_server.ERROR, start=0.3 * duration,
+                          duration=0.1 * duration, status=502),
+        stub_server.Fault(stub_server.SLOW, start=0.45 * duration,
+                          duration=0.15 * duration, rate=0.2, delay=0.5),
+        stub_server.Fault(stub_server.EXPIRE, start=0.65 * duration),
+        stub_server.Fault(stub_server.THROTTLE, start=0.75 * duration,
+                          duration=0.15 * duration, rate=0.5,
+                          retry_after=1),
+    ]
+
+
+SCENARIOS = {
+    'resets': _resets,
+    'error-burst': _error_burst,
+    'slow': _slow,
+    'token-expiry': _token_expiry,
+    'throttling': _throttling,
+    'mixed': _mixed,
+}
+
+POLICIES = {
+    'no-retry': {'max_attempts': 1},
+    'retry': {'max_attempts': 4, 'base_delay': 0.1, 'max_delay': 2.0},
+    'retry-budget': {'max_attempts': 4, 'base_delay': 0.1, 'max_delay': 2.0,
+                     'budget': 0.5},
+    'retry-no-retry-after': {'max_attempts': 4, 'base_delay': 0.1,
+                             'max_delay': 2.0, 'respect_retry_after': False},
+}
+
+
+def parse_policy(spec):
+    """Parse name:key=value[,key=value...] into (name, RetryPolicy kwargs).
+
+    The values are numbers, or true/false.
+    """
+    name, _sep, options = spec.partition(':')
+    kwargs = {}
+    for option in filter(None, options.split(',')):
+        key, _sep, value = option.partition('=')
+        if value.lower() in ('true', 'false'):
+            kwargs[key] = value.lower() == 'true'
+        else:
+            kwargs[key] = float(value)
+    return name, kwargs
+
+
+def run(scenario, policy, duration=10, concurrency=8, plans=50,
+        latency=0.005, seed=0):
+    """Run the workload under the faults of scenario with the retry policy.
+
+    :param policy: RetryPolicy keyword arguments.
+    :returns: the summary of the run, a dict.
+    """
+    cloud = stub_server.StubCloud(
+        plans=plans, latency=latency, seed=seed,
+        faults=SCENARIOS[scenario](duration))
+    with cloud:
+        cs = client.Client('user', 'password', 'tenant', cloud.auth_url,
+                           retry_policy=retry.RetryPolicy(**policy),
+                           response_cache_size=0)
+        plan_ids = [plan.plan_id for plan in cs.plans.list()]
+        rng = random.Random(seed)
+        generator = loadgen.LoadGenerator(
+            [('plan-list', 1, lambda: cs.plans.list(limit=20)),
+             ('plan-show', 3,
+              lambda: cs.plans.get(rng.choice(plan_ids)))],
+            duration=duration, concurrency=concurrency, seed=seed)
+        api = cloud.api
+        cloud.keystone.tokens_issued = 0
+        api.restart_faults()
+        requests_before = api.requests
+        report = generator.run()
+        requests = api.requests - requests_before
+
+    total = report['operations'][None]
+    succeeded = total['requests'] - total['errors']
+    errors = {}
+    for (_name, error), count in report['errors'].items():
+        errors[error] = errors.get(error, 0) + count
+    return {'scenario': scenario,
+            'policy': policy,
+            'elapsed': report['elapsed'],
+            'calls': total['requests'],
+            'succeeded': succeeded,
+            'goodput': succeeded / report['elapsed'],
+            'requests': requests,
+            'wasted': requests - succeeded,
+            'reauths': cloud.keystone.tokens_issued,
+            'injected': dict(api.injected),
+            'p50': total['p50'],
+            'p99': total['p99'],
+            'max': total['max'],
+            'errors': errors}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Measure the retries of the client under faults.')
+    parser.add_argument('--scenario', action='append', default=[],
+                        choices=sorted(SCENARIOS),
+                        help='Scenario to run, may be repeated. Default: '
+                             'all of them.')
+    parser.add_argument('--policy', action='append', default=[],
+                        metavar='<name[:key=value,...]>',
+                        help='Retry policy to compare, either one of %s or '
+                             'a name followed by RetryPolicy arguments, '
+                             'eg: fast:max_attempts=4,base_delay=0.05. '
+                             'May be repeated. Default: all the predefined '
+                             'ones.' % ', '.join(sorted(POLICIES)))
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Seconds every run lasts. Default=10.')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Calls in flight. Default=8.')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='Latency of the stub API. Default=0.005.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output',
+                        help='Write the results to this JSON file.')
+    args = parser.parse_args(argv)
+
+    policies = []
+    for spec in args.policy or sorted(POLICIES):
+        name, kwargs = parse_policy(spec)
+        if not kwargs:
+            if name not in POLICIES:
+                parser.error("Unknown retry policy %s" % name)
+            kwargs = POLICIES[name]
+        policies.append((name, kwargs))
+
+    # Keep the completion caches written by the listings out of $HOME.
+    cache_dir = tempfile.mkdtemp()
+    os.environ['V2VCLIENT_UUID_CACHE_DIR'] = cache_dir
+    results = []
+    try:
+        for scenario in args.scenario or sorted(SCENARIOS):
+            for name, kwargs in policies:
+                print('Running %s with %s...' % (scenario, name),
+                      file=sys.stderr)
+                result = run(scenario, kwargs, duration=args.duration,
+                             concurrency=args.concurrency,
+                             latency=args.latency, seed=args.seed)
+                result['policy_name'] = name
+                results.append(result)
+    finally:
+        shutil.rmtree(cache_dir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    def ms(seconds):
+        return '' if seconds is None else '%.1f' % (seconds * 1000)
+
+    rows = [{'Scenario': r['scenario'],
+             'Policy': r['policy_name'],
+             'Calls': r['calls'],
+             'OK': r['succeeded'],
+             'Goodput (/s)': '%.1f' % r['goodput'],
+             'Requests': r['requests'],
+             'Wasted': r['wasted'],
+             'Reauths': r['reauths'],
+             'p50 (ms)': ms(r['p50']),
+             'p99 (ms)': ms(r['p99']),
+             'Max (ms)': ms(r['max']),
+             'Errors': ', '.join('%s: %s' % item
+                                 for item in sorted(r['errors'].items()))}
+            for r in results]
+    utils.print_list(rows, ['Scenario', 'Policy', 'Calls', 'OK',
+                            'Goodput (/s)', 'Requests', 'Wasted', 'Reauths',
+                            'p50 (ms)', 'p99 (ms)', 'Max (ms)', 'Errors'],
+                     sort=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
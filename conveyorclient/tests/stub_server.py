@@ -0,0 +1,802 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+An in-process stub of the conveyor v1 API and of keystone.
+
+It lets the client be developed, tested and benchmarked without a cloud::
+
+    with stub_server.StubCloud(plans=10000, latency=0.01) as cloud:
+        cs = client.Client('1', 'user', 'password', 'tenant',
+                           cloud.auth_url)
+        cs.plans.list()
+
+or from a shell::
+
+    python -m conveyorclient.tests.stub_server --plans 10000 --port 8779
+    conveyor --os-auth-url http://127.0.0.1:8779/identity/v2.0 \\
+        --os-username user --os-password password \\
+        --os-tenant-name tenant plan-list
+
+The data set is generated from a seed, so runs are reproducible. Latency,
+jitter and errors can be injected into the conveyor API, and its GETs
+carry an ETag so that conditional requests can be exercised.
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import errno
+import hashlib
+import json
+import os
+import random
+import re
+import socket
+import struct
+import threading
+import time
+import uuid
+from wsgiref import simple_server
+
+from six.moves import socketserver
+from six.moves.urllib import parse
+
+from conveyorclient.common import unix_socket
+
+TENANT_ID = 'c0ffee00c0ffee00c0ffee00c0ffee00'
+USER_ID = 'beef0000beef0000beef0000beef0000'
+TOKEN_ID = 'stub-token'
+REGION = 'RegionOne'
+
+RESOURCE_TYPES = ('OS::Nova::Server', 'OS::Cinder::Volume',
+                  'OS::Neutron::Net', 'OS::Neutron::Subnet',
+                  'OS::Neutron::Port', 'OS::Neutron::SecurityGroup',
+                  'OS::Neutron::FloatingIP', 'OS::Neutron::Router',
+                  'OS::Nova::KeyPair', 'OS::Nova::Flavor',
+                  'OS::Heat::Stack', 'OS::Cinder::VolumeType')
+PLAN_STATUSES = ('initiating', 'creating', 'available', 'cloning',
+                 'migrating', 'finished', 'error')
+ZONES = ('az01', 'az02', 'az03')
+
+# Kinds of faults, see Fault.
+RESET = 'reset'
+ERROR = 'error'
+SLOW = 'slow'
+EXPIRE = 'expire'
+THROTTLE = 'throttle'
+FAULT_KINDS = (RESET, ERROR, SLOW, EXPIRE, THROTTLE)
+
+_STATUS_LINES = {200: '200 OK', 202: '202 Accepted', 204: '204 No Content',
+                 300: '300 Multiple Choices', 304: '304 Not Modified',
+                 400: '400 Bad Request', 401: '401 Unauthorized',
+                 404: '404 Not Found', 413: '413 Request Entity Too Large',
+                 429: '429 Too Many Requests',
+                 500: '500 Internal Server Error', 502: '502 Bad Gateway',
+                 503: '503 Service Unavailable', 504: '504 Gateway Timeout'}
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _timestamp(seconds):
+    return datetime.datetime.utcfromtimestamp(seconds).strftime(
+        '%Y-%m-%dT%H:%M:%S.000000')
+
+
+def _json_response(start_response, status, body=None, headers=None):
+    data = b'' if body is None else json.dumps(body).encode('utf-8')
+    headers = list(headers or [])
+    if data:
+        headers.append(('Content-Type', 'application/json'))
+    headers.append(('Content-Length', str(len(data))))
+    start_response(_STATUS_LINES.get(status, '%s Stub' % status), headers)
+    return [data]
+
+
+def _error(start_response, status, message, headers=None):
+    return _json_response(start_response, status,
+                          {'error': {'message': message, 'code': status}},
+                          headers)
+
+
+def _token_issued_at(token):
+    try:
+        return float(token.rsplit('-', 1)[1])
+    except (AttributeError, IndexError, ValueError):
+        return 0.0
+
+
+class Fault(object):
+    """A fault injected into the conveyor API for a while.
+
+    :param kind: RESET drops the connection without an answer, ERROR
+                 answers status (503 by default), SLOW delays the answer
+                 by delay seconds, EXPIRE rejects with a 401 the tokens
+                 issued before the fault started, and THROTTLE answers 413
+                 with a Retry-After of retry_after seconds.
+    :param start: seconds after the start of the schedule the fault
+                  starts at.
+    :param duration: seconds the fault lasts, None for ever.
+    :param rate: fraction of the requests affected while it lasts.
+    """
+
+    def __init__(self, kind, start=0.0, duration=None, rate=1.0, status=503,
+                 delay=1.0, retry_after=1):
+        if kind not in FAULT_KINDS:
+            raise ValueError("Unknown fault %s, must be one of %s"
+                             % (kind, ', '.join(FAULT_KINDS)))
+        self.kind = kind
+        self.start = start
+        self.duration = duration
+        self.rate = rate
+        self.status = status
+        self.delay = delay
+        self.retry_after = retry_after
+
+    def active(self, elapsed):
+        return (elapsed >= self.start and
+                (self.duration is None or
+                 elapsed < self.start + self.duration))
+
+
+def _read_body(environ):
+    try:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if not length:
+        return None
+    return json.loads(environ['wsgi.input'].read(length).decode('utf-8'))
+
+
+class StubConveyorAPI(object):
+    """WSGI application stubbing the conveyor v1 API.
+
+    :param plans: number of plans in the data set.
+    :param servers: number of servers listed by /resources/detail.
+    :param resources_per_plan: resources cloned by every plan.
+    :param latency: seconds every request takes.
+    :param jitter: random seconds added to latency, up to jitter.
+    :param error_rate: fraction of the requests failing with error_status.
+    :param error_status: HTTP status of the injected errors.
+    :param retry_after: Retry-After header of the injected errors.
+    :param max_limit: most plans returned by one listing, None for all of
+                      them, like osapi_max_limit.
+    :param seed: seed of the generated data set and of the injections.
+    :param faults: list of :class:`Fault` scheduled from the creation of
+                   the API, or from the last :meth:`restart_faults`.
+    """
+
+    def __init__(self, plans=100, servers=50, resources_per_plan=3,
+                 latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+                 retry_after=None, max_limit=None, seed=0, faults=None):
+        self.faults = list(faults or [])
+        self.injected = dict((kind, 0) for kind in FAULT_KINDS)
+        self._faults_start = time.time()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.max_limit = max_limit
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        # The trace context headers received, see tracing.Tracer.
+        self.traceparents = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._version = 0
+        self._rendered = {}
+        self.servers = [self._make_server(i) for i in range(servers)]
+        self.plans = {}
+        self._plan_order = []
+        for i in range(plans):
+            self._add_plan(self._make_plan(i, resources_per_plan))
+
+    # Data set
+
+    def _make_server(self, index):
+        rng = self._rng
+        return {
+            'id': _uuid(rng),
+            'name': 'server-%05d' % index,
+            'status': 'ACTIVE',
+            'addresses': {
+                'net-%d' % (index % 4): [
+                    {'addr': '10.%d.%d.%d' % (index % 4, index // 250 % 250,
+                                              index % 250 + 2),
+                     'version': 4,
+                     'OS-EXT-IPS:type': 'fixed'}]},
+            'flavor': {'id': '%d' % (index % 8 + 1)},
+            'image': {'id': _uuid(rng)},
+            'hostId': hashlib.sha1(str(index).encode()).hexdigest(),
+            'OS-EXT-SRV-ATTR:host': 'compute-%02d' % (index % 16),
+            'OS-EXT-SRV-ATTR:instance_name': 'instance-%08x' % index,
+            'OS-EXT-STS:power_state': 1,
+            'OS-EXT-STS:task_state': None,
+            'OS-EXT-STS:vm_state': 'active',
+            'OS-EXT-AZ:availability_zone': ZONES[index % len(ZONES)],
+            'tenant_id': TENANT_ID,
+            'user_id': USER_ID,
+            'metadata': {},
+        }
+
+    def _make_plan(self, index, resources_per_plan):
+        rng = self._rng
+        created = 1483228800 + index * 60
+        resources = [{'obj_type': RESOURCE_TYPES[rng.randrange(4)],
+                      'obj_id': _uuid(rng)}
+                     for _i in range(resources_per_plan)]
+        return {
+            'plan_id': _uuid(rng),
+            'plan_name': 'plan-%06d' % index,
+            'plan_type': ('clone', 'migrate')[index % 2],
+            'plan_status': PLAN_STATUSES[rng.randrange(len(PLAN_STATUSES))],
+            'task_status': '',
+            'created_at': _timestamp(created),
+            'updated_at': _timestamp(created + 30),
+            'expired_at': _timestamp(created + 86400),
+            'deleted_at': None,
+            'deleted': False,
+            'project_id': TENANT_ID,
+            'user_id': USER_ID,
+            'stack_id': None,
+            'clone_resources': resources,
+            'original_resources': dict(
+                (r['obj_id'], {'type': r['obj_type'], 'id': r['obj_id']})
+                for r in resources),
+            'updated_resources': {},
+            'original_dependencies': {},
+            'updated_dependencies': {},
+        }
+
+    def _add_plan(self, plan):
+        self.plans[plan['plan_id']] = plan
+        self._plan_order.append(plan['plan_id'])
+        self._changed()
+
+    def _changed(self):
+        self._version += 1
+        self._rendered.clear()
+
+    # WSGI
+
+    def restart_faults(self):
+        """Start the schedule of the faults over, from now."""
+        with self._lock:
+            self._faults_start = time.time()
+            self.injected = dict((kind, 0) for kind in FAULT_KINDS)
+
+    def _fault(self, environ):
+        elapsed = time.time() - self._faults_start
+        for fault in self.faults:
+            if not fault.active(elapsed):
+                continue
+            if fault.kind == EXPIRE:
+                issued = _token_issued_at(environ.get('HTTP_X_AUTH_TOKEN'))
+                if issued < self._faults_start + fault.start:
+                    return fault
+            elif self._rng.random() < fault.rate:
+                return fault
+        return None
+
+    def __call__(self, environ, start_response):
+        # Every answer carries a request id, like the OpenStack APIs.
+        request_id = 'req-%s' % uuid.uuid4()
+
+        def start_response_with_id(status, headers, exc_info=None):
+            headers = list(headers) + [('X-OpenStack-Request-Id',
+                                        request_id)]
+            return start_response(status, headers, exc_info)
+
+        return self._call(environ, start_response_with_id)
+
+    def _call(self, environ, start_response):
+        with self._lock:
+            self.requests += 1
+            if environ.get('HTTP_TRACEPARENT'):
+                self.traceparents.append(environ['HTTP_TRACEPARENT'])
+            delay = self.latency
+            if self.jitter:
+                delay += self._rng.uniform(0, self.jitter)
+            fail = self.error_rate and self._rng.random() < self.error_rate
+            fault = self._fault(environ)
+            if fault is not None:
+                self.injected[fault.kind] += 1
+        if fault is not None and fault.kind == SLOW:
+            delay += fault.delay
+        if delay:
+            time.sleep(delay)
+        if fault is not None and fault.kind == RESET:
+            _reset(environ['stub.connection'])
+        if fault is not None and fault.kind == ERROR:
+            return _error(start_response, fault.status, 'Injected fault')
+        if fault is not None and fault.kind == THROTTLE:
+            return _error(start_response, 413, 'Rate limit exceeded',
+                          [('Retry-After', str(fault.retry_after))])
+        if fault is not None and fault.kind == EXPIRE:
+            return _error(start_response, 401, 'The token has expired.')
+        if fail:
+            with self._lock:
+                self.errors += 1
+            headers = []
+            if self.retry_after is not None:
+                headers.append(('Retry-After', str(self.retry_after)))
+            return _error(start_response, self.error_status,
+                          'Injected failure', headers)
+
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '')
+        match = re.match(r'^/v1/[^/]+(/.*)$', path)
+        if not match:
+            return _error(start_response, 404, 'Unknown path %s' % path)
+        path = match.group(1).rstrip('/')
+        query = dict(parse.parse_qsl(environ.get('QUERY_STRING', '')))
+        try:
+            body = _read_body(environ)
+        except ValueError:
+            return _error(start_response, 400, 'Malformed JSON body')
+
+        if method == 'GET':
+            return self._get(environ, start_response, path, query)
+        with self._lock:
+            status, result = self._route(method, path, query, body)
+        return _json_response(start_response, status, result)
+
+    def _get(self, environ, start_response, path, query):
+        key = (path, tuple(sorted(query.items())))
+        with self._lock:
+            rendered = self._rendered.get(key)
+            if rendered is None:
+                status, result = self._route('GET', path, query, None)
+                data = json.dumps(result).encode('utf-8')
+                etag = '"%s"' % hashlib.md5(data).hexdigest()
+                rendered = (status, data, etag)
+                if status == 200:
+                    self._rendered[key] = rendered
+        status, data, etag = rendered
+        if status != 200:
+            return _json_response(start_response, status, json.loads(
+                data.decode('utf-8')))
+        if environ.get('HTTP_IF_NONE_MATCH') == etag:
+            with self._lock:
+                self.not_modified += 1
+            start_response(_STATUS_LINES[304], [('ETag', etag)])
+            return [b'']
+        with self._lock:
+            self.bytes_sent += len(data)
+        start_response(_STATUS_LINES[200],
+                       [('Content-Type', 'application/json'),
+                        ('Content-Length', str(len(data))),
+                        ('ETag', etag)])
+        return [data]
+
+    def _route(self, method, path, query, body):
+        parts = path.strip('/').split('/')
+        collection = parts[0]
+        handler = getattr(self, '_%s_%s' % (method.lower(), collection), None)
+        if handler is None:
+            return 404, {'error': {'message': 'Unknown path %s' % path,
+                                   'code': 404}}
+        return handler(parts[1:], query, body)
+
+    # /plans
+
+    def _find_plan(self, plan_id):
+        plan = self.plans.get(plan_id)
+        if plan is None:
+            return None, (404, {'itemNotFound': {
+                'message': 'Plan %s could not be found.' % plan_id,
+                'code': 404}})
+        return plan, None
+
+    def _get_plans(self, parts, query, body):
+        if parts and parts[0] != 'detail':
+            plan, error = self._find_plan(parts[0])
+            return error or (200, {'plan': plan})
+
+        plans = [self.plans[plan_id] for plan_id in self._plan_order]
+        for key in ('plan_name', 'plan_type', 'plan_status'):
+            if query.get(key):
+                plans = [p for p in plans if p[key] == query[key]]
+        sort_key = query.get('sort_key', 'created_at')
+        reverse = query.get('sort_dir', 'desc') == 'desc'
+        plans = sorted(plans, key=lambda p: p.get(sort_key) or '',
+                       reverse=reverse)
+        if query.get('marker'):
+            ids = [p['plan_id'] for p in plans]
+            if query['marker'] not in ids:
+                return 400, {'badRequest': {
+                    'message': 'Marker %s could not be found.'
+                               % query['marker'], 'code': 400}}
+            plans = plans[ids.index(query['marker']) + 1:]
+        limit = int(query.get('limit') or 0) or self.max_limit
+        if self.max_limit:
+            limit = min(limit, self.max_limit)
+        if limit:
+            plans = plans[:limit]
+        return 200, {'plans': plans}
+
+    def _post_plans(self, parts, query, body):
+        if parts and parts[0] == 'create_plan_by_template':
+            plan = self._make_plan(len(self.plans), 0)
+            plan['plan_name'] = body['plan'].get('plan_name')
+            plan['plan_status'] = 'available'
+            self._add_plan(plan)
+            return 200, {'plan': {'plan_id': plan['plan_id']}}
+        if len(parts) == 2 and parts[1] == 'action':
+            return self._plan_action(parts[0], body)
+        info = body['plan']
+        plan = self._make_plan(len(self.plans), 0)
+        plan.update(plan_name=info.get('plan_name'),
+                    plan_type=info.get('plan_type'),
+                    plan_status='initiating',
+                    clone_resources=info.get('clone_obj', []))
+        self._add_plan(plan)
+        return 200, {'plan': plan}
+
+    def _put_plans(self, parts, query, body):
+        plan, error = self._find_plan(parts[0])
+        if error:
+            return error
+        plan.update(body['plan'])
+        self._changed()
+        return 200, {'plan': plan}
+
+    def _delete_plans(self, parts, query, body):
+        plan, error = self._find_plan(parts[0])
+        if error:
+            return error
+        del self.plans[plan['plan_id']]
+        self._plan_order.remove(plan['plan_id'])
+        self._changed()
+        return 202, None
+
+    def _plan_action(self, plan_id, body):
+        plan, error = self._find_plan(plan_id)
+        if error:
+            return error
+        action, info = list(body.items())[0]
+        if action == 'download_template':
+            return 200, {'template': {
+                'heat_template_version': '2013-05-23',
+                'resources': dict(
+                    ('resource_%d' % i, {'type': r['obj_type'],
+                                         'properties': {}})
+                    for i, r in enumerate(plan['clone_resources']))}}
+        if action == 'os-reset_state':
+            plan['plan_status'] = info['plan_status']
+        elif action == 'force_delete-plan':
+            del self.plans[plan_id]
+            self._plan_order.remove(plan_id)
+        self._changed()
+        return 202, None
+
+    # /resources
+
+    def _get_resources(self, parts, query, body):
+        if parts == ['types']:
+            return 200, {'types': [{'type': t} for t in RESOURCE_TYPES]}
+        if parts == ['detail']:
+            if query.get('type') != 'OS::Nova::Server':
+                return 200, {'resources': []}
+            servers = self.servers
+            if query.get('name'):
+                servers = [s for s in servers if s['name'] == query['name']]
+            return 200, {'resources': servers}
+        return 404, {'error': {'message': 'Unknown resource path',
+                               'code': 404}}
+
+    def _post_resources(self, parts, query, body):
+        action, info = list(body.items())[0]
+        if action == 'get_resource_detail':
+            return 200, {'resource': {'id': parts[0],
+                                      'type': info['type'],
+                                      'name': 'resource-%s' % parts[0][:8],
+                                      'properties': {}}}
+        if action == 'build-resources_topo':
+            return 200, {'topo': {'plan_id': info['plan_id'],
+                                  'availability_zone_map':
+                                      info['availability_zone_map'],
+                                  'resources': []}}
+        if action == 'list-clone_resources_attribute':
+            return 200, {'attribute_list': list(ZONES)}
+        if action == 'list-all_availability_zones':
+            return 200, {'availability_zone_list': list(ZONES)}
+        if action == 'delete-cloned_resource':
+            return 202, None
+        return 400, {'badRequest': {'message': 'Unknown action %s' % action,
+                                    'code': 400}}
+
+    # /clones, /migrates, /configurations
+
+    def _post_clones(self, parts, query, body):
+        plan, error = self._find_plan(parts[0])
+        if error:
+            return error
+        if 'clone' in body or 'export_template_and_clone' in body:
+            plan['plan_status'] = 'cloning'
+            self._changed()
+        return 202, None
+
+    def _post_migrates(self, parts, query, body):
+        plan, error = self._find_plan(parts[0])
+        if error:
+            return error
+        if 'migrate' in body:
+            plan['plan_status'] = 'migrating'
+            self._changed()
+        return 202, None
+
+    def _post_configurations(self, parts, query, body):
+        return 202, None
+
+
+class StubKeystone(object):
+    """WSGI application stubbing the identity v2.0 and v3 APIs.
+
+    Any credentials are accepted. The catalog lists the conveyor API at
+    the URLs returned by conveyor_urls(), a callable returning a dict
+    mapping regions to URLs.
+    """
+
+    def __init__(self, conveyor_urls, token_ttl=3600):
+        self.conveyor_urls = conveyor_urls
+        self.token_ttl = token_ttl
+        self.tokens_issued = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '').rstrip('/')
+        base = environ['stub.identity_url']
+        if method == 'GET' and path == '':
+            return _json_response(start_response, 300, {'versions': {
+                'values': [self._version('v2.0', base),
+                           self._version('v3.0', base)]}})
+        if method == 'GET' and path in ('/v2.0', '/v3'):
+            version = 'v2.0' if path == '/v2.0' else 'v3.0'
+            return _json_response(start_response, 200,
+                                  {'version': self._version(version, base)})
+        if method == 'POST' and path == '/v2.0/tokens':
+            _read_body(environ)
+            return _json_response(start_response, 200, self._v2_token())
+        if method == 'POST' and path == '/v3/auth/tokens':
+            _read_body(environ)
+            token_id, token = self._v3_token()
+            return _json_response(start_response, 201, token,
+                                  [('X-Subject-Token', token_id)])
+        return _error(start_response, 404, 'Unknown path %s' % path)
+
+    def _version(self, version, base):
+        href = '%s/%s/' % (base, 'v2.0' if version == 'v2.0' else 'v3')
+        return {'id': version, 'status': 'stable',
+                'updated': '2016-04-04T00:00:00Z',
+                'links': [{'rel': 'self', 'href': href}],
+                'media-types': [{
+                    'base': 'application/json',
+                    'type': 'application/vnd.openstack.identity-%s+json'
+                            % version[:2]}]}
+
+    def _issue(self):
+        """Return the id, issue and expiry times of a new token.
+
+        The id tells when the token was issued, for Fault(EXPIRE).
+        """
+        with self._lock:
+            self.tokens_issued += 1
+        now = time.time()
+        return ('%s-%.6f' % (TOKEN_ID, now), _timestamp(now) + 'Z',
+                _timestamp(now + self.token_ttl) + 'Z')
+
+    def _v2_token(self):
+        token_id, issued, expires = self._issue()
+        endpoints = [{'region': region, 'publicURL': url,
+                      'internalURL': url, 'adminURL': url}
+                     for region, url in sorted(self.conveyor_urls().items())]
+        return {'access': {
+            'token': {'id': token_id, 'issued_at': issued,
+                      'expires': expires,
+                      'tenant': {'id': TENANT_ID, 'name': 'tenant',
+                                 'enabled': True}},
+            'serviceCatalog': [{'type': 'conveyor', 'name': 'conveyor',
+                                'endpoints': endpoints}],
+            'user': {'id': USER_ID, 'name': 'user', 'roles': []},
+            'metadata': {'roles': [], 'is_admin': 0}}}
+
+    def _v3_token(self):
+        token_id, issued, expires = self._issue()
+        endpoints = [{'id': uuid.uuid4().hex, 'interface': interface,
+                      'region': region, 'region_id': region, 'url': url}
+                     for region, url in sorted(self.conveyor_urls().items())
+                     for interface in ('public', 'internal', 'admin')]
+        domain = {'id': 'default', 'name': 'Default'}
+        return token_id, {'token': {
+            'methods': ['password'], 'issued_at': issued,
+            'expires_at': expires,
+            'project': {'id': TENANT_ID, 'name': 'tenant',
+                        'domain': domain},
+            'user': {'id': USER_ID, 'name': 'user', 'domain': domain},
+            'roles': [],
+            'catalog': [{'id': uuid.uuid4().hex, 'type': 'conveyor',
+                         'name': 'conveyor', 'endpoints': endpoints}]}}
+
+
+def _reset(connection):
+    """Drop the connection without answering, with a TCP reset."""
+    connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER,
+                          struct.pack('ii', 1, 0))
+    connection.shutdown(socket.SHUT_RDWR)
+    # Lets wsgiref give up on the request silently.
+    raise socket.error(errno.ECONNRESET, 'Injected connection reset')
+
+
+class _QuietHandler(simple_server.WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def get_environ(self):
+        environ = simple_server.WSGIRequestHandler.get_environ(self)
+        environ['stub.connection'] = self.connection
+        return environ
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn,
+                           simple_server.WSGIServer):
+    daemon_threads = True
+    # wsgiref closes the connection after every request: a short listen
+    # backlog would drop connections under load, which then wait for a
+    # SYN retransmission.
+    request_queue_size = 128
+
+
+class _UnixWSGIServer(_ThreadingWSGIServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+        self.setup_environ()
+
+    def get_request(self):
+        # Unix sockets have no peer address, wsgiref wants one.
+        connection = self.socket.accept()[0]
+        return connection, ('127.0.0.1', 0)
+
+
+class StubCloud(object):
+    """A stub keystone and conveyor API served by one local HTTP server.
+
+    The identity API is served under /identity and the conveyor API of
+    each region under /conveyor/<region>/v1/<tenant_id>. The keyword
+    arguments are those of :class:`StubConveyorAPI`, and apply to every
+    region.
+
+    :param socket_path: listen on this unix socket rather than on host and
+                        port, the URLs are then http+unix ones.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, regions=(REGION,),
+                 socket_path=None, **api_kwargs):
+        self.apis = dict((region, StubConveyorAPI(**api_kwargs))
+                         for region in regions)
+        self.keystone = StubKeystone(self.conveyor_urls)
+        self.socket_path = socket_path
+        if socket_path is None:
+            self._server = simple_server.make_server(
+                host, port, self._app, server_class=_ThreadingWSGIServer,
+                handler_class=_QuietHandler)
+        else:
+            self._server = _UnixWSGIServer(socket_path, _QuietHandler)
+            self._server.set_app(self._app)
+        self._thread = None
+
+    @property
+    def api(self):
+        """The conveyor API of the first region."""
+        return self.apis[sorted(self.apis)[0]]
+
+    @property
+    def url(self):
+        if self.socket_path is not None:
+            return unix_socket.url(self.socket_path)
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%s' % (host, port)
+
+    @property
+    def auth_url(self):
+        return self.url + '/identity/v2.0'
+
+    def conveyor_urls(self):
+        return dict((region, '%s/conveyor/%s/v1/%s'
+                     % (self.url, region, TENANT_ID))
+                    for region in self.apis)
+
+    def _app(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith('/identity'):
+            environ['PATH_INFO'] = path[len('/identity'):]
+            environ['stub.identity_url'] = self.url + '/identity'
+            return self.keystone(environ, start_response)
+        match = re.match(r'^/conveyor/([^/]+)(/.*)$', path)
+        if match and match.group(1) in self.apis:
+            environ['PATH_INFO'] = match.group(2)
+            return self.apis[match.group(1)](environ, start_response)
+        return _error(start_response, 404, 'Unknown path %s' % path)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        if self.socket_path is not None:
+            os.unlink(self.socket_path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve a stub keystone and conveyor API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8779)
+    parser.add_argument('--socket', default=None,
+                        help='Listen on this unix socket instead.')
+    parser.add_argument('--regions', default=REGION,
+                        help='Comma separated regions. Default=%s.' % REGION)
+    parser.add_argument('--plans', type=int, default=100)
+    parser.add_argument('--servers', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--max-limit', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    cloud = StubCloud(host=args.host, port=args.port,
+                      regions=args.regions.split(','),
+                      socket_path=args.socket, plans=args.plans,
+                      servers=args.servers, latency=args.latency,
+                      jitter=args.jitter, error_rate=args.error_rate,
+                      error_status=args.error_status,
+                      max_limit=args.max_limit, seed=args.seed)
+    print('Auth URL: %s' % cloud.auth_url)
+    for region, url in sorted(cloud.conveyor_urls().items()):
+        print('Conveyor API (%s): %s' % (region, url))
+    cloud.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        cloud.stop()
+
+
+if __name__ == '__main__':
+    main()
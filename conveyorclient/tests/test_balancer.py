@@ -0,0 +1,118 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from conveyorclient.common import balancer
+from conveyorclient import exceptions
+from conveyorclient.tests import fakes
+from conveyorclient.tests import utils
+
+
+class EndpointPoolTest(utils.TestCase):
+
+    def setUp(self):
+        super(EndpointPoolTest, self).setUp()
+        self.clock = utils.FakeClock()
+
+    def test_round_robin(self):
+        pool = balancer.EndpointPool(clock=self.clock)
+        picked = []
+        for _i in range(4):
+            endpoint = pool.acquire(['a', 'b'])
+            pool.release(endpoint, True)
+            picked.append(endpoint)
+        self.assertEqual(['a', 'b', 'a', 'b'], picked)
+
+    def test_least_outstanding(self):
+        pool = balancer.EndpointPool(balancer.LEAST_OUTSTANDING,
+                                     clock=self.clock)
+        self.assertEqual('a', pool.acquire(['a', 'b']))
+        self.assertEqual('b', pool.acquire(['a', 'b']))
+        pool.release('b', True)
+        self.assertEqual('b', pool.acquire(['a', 'b']))
+
+    def test_unknown_strategy(self):
+        self.assertRaises(ValueError, balancer.EndpointPool, 'random')
+
+    def test_ejection_and_probe(self):
+        pool = balancer.EndpointPool(failure_threshold=2, ejection_time=10,
+                                     clock=self.clock)
+        for _i in range(2):
+            pool.acquire(['a'], exclude=['b'])
+            pool.release('a', False)
+        self.assertTrue(pool.snapshot()['a']['ejected'])
+        self.assertEqual(['b', 'b'],
+                         [pool.acquire(['a', 'b']) for _i in range(2)])
+        self.clock.now += 10
+        # Probed once, then ejected for twice as long.
+        self.assertEqual('a', pool.acquire(['a', 'b']))
+        pool.release('a', False)
+        self.assertEqual(20, pool.snapshot()['a']['ejected_for'])
+        self.clock.now += 20
+        self.assertEqual('a', pool.acquire(['a', 'b']))
+        pool.release('a', True)
+        self.assertFalse(pool.snapshot()['a']['ejected'])
+
+    def test_everything_ejected(self):
+        pool = balancer.EndpointPool(failure_threshold=1, ejection_time=10,
+                                     clock=self.clock)
+        pool.acquire(['a', 'b'])
+        pool.release('a', False)
+        self.clock.now += 1
+        pool.acquire(['a', 'b'], exclude=['a'])
+        pool.release('b', False)
+        self.assertEqual('a', pool.acquire(['a', 'b']))
+
+
+class ClientBalancingTest(utils.TestCase):
+
+    def setUp(self):
+        super(ClientBalancingTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=5, replicas=2)
+        self.first, self.second = self.cloud.endpoints[fakes.REGION]
+
+    def test_spread(self):
+        cs = self.make_client(self.cloud,
+                              load_balancing=balancer.ROUND_ROBIN)
+        for _i in range(6):
+            cs.plans.list()
+        self.assertEqual([3, 3], [self.cloud.count(self.first),
+                                  self.cloud.count(self.second)])
+
+    def test_explicit_endpoints(self):
+        cs = self.make_client(self.cloud,
+                              load_balancing=balancer.ROUND_ROBIN,
+                              endpoints=[self.second])
+        for _i in range(2):
+            cs.plans.list()
+        self.assertEqual(2, self.cloud.count(self.second))
+
+    def test_get_fails_over(self):
+        self.cloud.down.add(self.first)
+        pool = balancer.EndpointPool(failure_threshold=2)
+        cs = self.make_client(self.cloud, load_balancing=pool)
+        for _i in range(4):
+            self.assertEqual(5, len(cs.plans.list()))
+        self.assertEqual(4, self.cloud.count(self.second))
+        self.assertTrue(pool.snapshot()[self.first]['ejected'])
+
+    def test_write_does_not_fail_over(self):
+        self.cloud.down.add(self.first)
+        cs = self.make_client(self.cloud,
+                              load_balancing=balancer.ROUND_ROBIN,
+                              retry_policy=utils.fast_retries(0))
+        cs.authenticate()
+        self.assertRaises(exceptions.ConnectionError, cs.plans.create,
+                          'clone', [{'type': 'OS::Nova::Server',
+                                     'id': 'server'}])
+        self.assertEqual(0, self.cloud.requests)
@@ -0,0 +1,131 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import fixtures
+import requests
+from requests import adapters
+
+from conveyorclient.common import cassette
+from conveyorclient import exceptions
+from conveyorclient.tests import stub_server
+from conveyorclient.tests import utils
+from conveyorclient.v1 import client
+
+PASSWORD = 'hunter2-password'
+
+
+class _EchoAdapter(adapters.BaseAdapter):
+    """Answers every request with a 200, without any network."""
+
+    def send(self, request, **kwargs):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = b''
+        resp.url = request.url
+        resp.request = request
+        return resp
+
+    def close(self):
+        pass
+
+
+class CassetteTest(utils.TestCase):
+
+    def setUp(self):
+        super(CassetteTest, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'session.json')
+
+    def _client(self, cloud, tape):
+        cs = client.Client('user', PASSWORD, 'tenant', cloud.auth_url,
+                           cassette=tape)
+        self.addCleanup(cs.client.close)
+        return cs
+
+    def _record(self, cloud):
+        with cassette.Cassette(self.path, cassette.RECORD) as tape:
+            cs = self._client(cloud, tape)
+            plans = cs.plans.list()
+            plan = cs.plans.get(plans[0].plan_id)
+        return plans, plan
+
+    def test_record_scrubs_secrets(self):
+        cloud = self.start_cloud(plans=3)
+        self._record(cloud)
+        with open(self.path) as f:
+            recorded = f.read()
+        self.assertEqual(3, len(recorded.splitlines()))
+        self.assertIn(cassette.SCRUBBED, recorded)
+        self.assertNotIn(stub_server.TOKEN_ID, recorded)
+        self.assertNotIn(PASSWORD, recorded)
+
+    def test_replay_offline(self):
+        cloud = self.start_cloud(plans=3)
+        plans, plan = self._record(cloud)
+        cloud.stop()
+
+        def no_network(adapter, request, **kwargs):
+            raise AssertionError('%s sent to the network' % request.url)
+
+        self.useFixture(fixtures.MonkeyPatch(
+            'requests.adapters.HTTPAdapter.send', no_network))
+        tape = cassette.Cassette(self.path, cassette.REPLAY, speed=0)
+        cs = self._client(cloud, tape)
+        replayed = cs.plans.list()
+        self.assertEqual([p.plan_id for p in plans],
+                         [p.plan_id for p in replayed])
+        self.assertEqual(plan.plan_name,
+                         cs.plans.get(plan.plan_id).plan_name)
+
+    def test_replay_unrecorded_request(self):
+        cloud = self.start_cloud(plans=3)
+        self._record(cloud)
+        tape = cassette.Cassette(self.path, cassette.REPLAY, speed=0)
+        cs = self._client(cloud, tape)
+        self.assertRaises(exceptions.ConnectionError, cs.plans.get,
+                          'no-such-plan')
+
+    def _session(self, tape, fake_network=False):
+        session = requests.Session()
+        if fake_network:
+            session.mount('http://', _EchoAdapter())
+        tape.mount(session)
+        self.addCleanup(session.close)
+        return session
+
+    def test_url_tokens_scrubbed(self):
+        # The URL of HTTPClient._fetch_endpoints_from_auth.
+        url = ('http://keystone.example.com:5000/v2.0/tokens/'
+               'proxy-token-1234?belongsTo=tenant-1')
+        with cassette.Cassette(self.path, cassette.RECORD) as tape:
+            session = self._session(tape, fake_network=True)
+            session.get(url)
+            session.get('http://conveyor.example.com:8899/v1/plans'
+                        '?limit=1&auth_token=query-token-5678')
+        with open(self.path) as f:
+            recorded = f.read()
+        self.assertNotIn('proxy-token-1234', recorded)
+        self.assertNotIn('query-token-5678', recorded)
+        self.assertIn('belongsTo=tenant-1', recorded)
+        self.assertIn('limit=1', recorded)
+
+        # Replayed whatever the token of the request is.
+        tape = cassette.Cassette(self.path, cassette.REPLAY, speed=0)
+        session = self._session(tape)
+        self.assertEqual(200, session.get(
+            url.replace('proxy-token-1234', 'other-token')).status_code)
+        self.assertRaises(requests.exceptions.ConnectionError, session.get,
+                          url.replace('tenant-1', 'tenant-2'))
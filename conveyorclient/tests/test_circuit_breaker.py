@@ -0,0 +1,148 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from conveyorclient.common import balancer
+from conveyorclient.common import circuit_breaker
+from conveyorclient import exceptions
+from conveyorclient.tests import fakes
+from conveyorclient.tests import utils
+
+
+class CircuitBreakerTest(utils.TestCase):
+
+    def setUp(self):
+        super(CircuitBreakerTest, self).setUp()
+        self.clock = utils.FakeClock()
+        self.breaker = circuit_breaker.CircuitBreaker(
+            'endpoint', failure_threshold=0.5, min_requests=4,
+            reset_timeout=30, clock=self.clock)
+
+    def fail(self, count):
+        for _i in range(count):
+            self.breaker.before_request()
+            self.breaker.record_failure()
+
+    def test_opens(self):
+        self.breaker.before_request()
+        self.breaker.record_success()
+        self.fail(2)
+        self.assertEqual(circuit_breaker.CLOSED, self.breaker.state)
+        self.fail(1)
+        self.assertEqual(circuit_breaker.OPEN, self.breaker.state)
+        self.assertRaises(exceptions.CircuitOpen,
+                          self.breaker.before_request)
+
+    def test_needs_min_requests(self):
+        self.fail(3)
+        self.assertEqual(circuit_breaker.CLOSED, self.breaker.state)
+
+    def test_half_open_probe(self):
+        self.fail(4)
+        self.clock.now += 30
+        self.breaker.before_request()
+        self.assertEqual(circuit_breaker.HALF_OPEN, self.breaker.state)
+        # One probe at a time.
+        self.assertRaises(exceptions.CircuitOpen,
+                          self.breaker.before_request)
+        self.breaker.record_success()
+        self.assertEqual(circuit_breaker.CLOSED, self.breaker.state)
+
+    def test_failed_probe_reopens(self):
+        self.fail(4)
+        self.clock.now += 30
+        self.fail(1)
+        self.assertEqual(circuit_breaker.OPEN, self.breaker.state)
+        self.assertEqual(self.clock.now, self.breaker.opened_at)
+
+    def test_window(self):
+        self.fail(3)
+        self.clock.now += 61
+        self.fail(1)
+        self.assertEqual(circuit_breaker.CLOSED, self.breaker.state)
+
+
+class ClientCircuitBreakerTest(utils.TestCase):
+
+    def setUp(self):
+        super(ClientCircuitBreakerTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=5)
+        self.breakers = circuit_breaker.CircuitBreakers(min_requests=2)
+        self.cs = self.make_client(self.cloud,
+                                   circuit_breakers=self.breakers)
+
+    def test_opens_on_server_errors(self):
+        self.cloud.script.extend([503] * 2)
+        for _i in range(2):
+            self.assertRaises(exceptions.ClientException, self.cs.plans.list)
+        self.assertRaises(exceptions.CircuitOpen, self.cs.plans.list)
+        self.assertEqual(2, self.cloud.requests)
+        self.assertEqual(circuit_breaker.OPEN,
+                         self.cs.get_circuit_breakers()[
+                             self.cloud.endpoint]['state'])
+
+    def test_opens_on_connection_errors(self):
+        self.cloud.down.add(self.cloud.endpoint)
+        for _i in range(2):
+            self.assertRaises(exceptions.ConnectionError,
+                              self.cs.plans.list)
+        self.assertRaises(exceptions.CircuitOpen, self.cs.plans.list)
+
+    def test_client_errors_do_not_count(self):
+        for _i in range(3):
+            self.assertRaises(exceptions.NotFound, self.cs.plans.get,
+                              'missing')
+        snapshot = self.breakers.snapshot()[self.cloud.endpoint]
+        self.assertEqual(circuit_breaker.CLOSED, snapshot['state'])
+        self.assertEqual(0, snapshot['failures'])
+
+
+class EndpointCircuitBreakerTest(utils.TestCase):
+
+    def test_breaker_per_endpoint(self):
+        cloud = self.fake_cloud(plans=5, replicas=2)
+        good, dead = cloud.endpoints[fakes.REGION]
+        cloud.down.add(dead)
+        breakers = circuit_breaker.CircuitBreakers(min_requests=4)
+        cs = self.make_client(
+            cloud, endpoints=[good, dead], circuit_breakers=breakers,
+            load_balancing=balancer.EndpointPool(failure_threshold=100))
+        for _i in range(8):
+            self.assertEqual(5, len(cs.plans.list()))
+        snapshot = breakers.snapshot()
+        # The GETs sent to the dead endpoint failed over to the good one,
+        # only the breaker of the dead one opened.
+        self.assertEqual(circuit_breaker.OPEN, snapshot[dead]['state'])
+        self.assertEqual(circuit_breaker.CLOSED, snapshot[good]['state'])
+        self.assertEqual(0, snapshot[good]['failures'])
+        self.assertEqual(8, snapshot[good]['requests'])
+        self.assertEqual(8, cloud.count(good))
+
+    def test_open_endpoint_is_skipped(self):
+        cloud = self.fake_cloud(plans=5, replicas=2)
+        dead, good = cloud.endpoints[fakes.REGION]
+        cloud.down.add(dead)
+        breakers = circuit_breaker.CircuitBreakers(min_requests=2)
+        cs = self.make_client(
+            cloud, endpoints=[dead, good], circuit_breakers=breakers,
+            load_balancing=balancer.EndpointPool(failure_threshold=100))
+        for _i in range(8):
+            cs.plans.list()
+        self.assertEqual(circuit_breaker.OPEN,
+                         breakers.snapshot()[dead]['state'])
+        # A POST is not failed over on a connection error, but is when
+        # the breaker of the endpoint is open and nothing was sent.
+        for _i in range(2):
+            cs.plans.create('clone', [{'type': 'OS::Nova::Server',
+                                       'id': 'server'}])
+        self.assertEqual(2, cloud.count(good, 'POST'))
@@ -0,0 +1,151 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from conveyorclient.common import concurrency
+from conveyorclient.common import deadline
+from conveyorclient import exceptions
+from conveyorclient import shell
+from conveyorclient.tests import utils
+
+
+class AIMDLimiterTest(utils.TestCase):
+
+    def setUp(self):
+        super(AIMDLimiterTest, self).setUp()
+        self.clock = utils.FakeClock()
+        self.limiter = concurrency.AIMDLimiter(initial=4, max_limit=8,
+                                               clock=self.clock)
+
+    def call(self, seconds=0.1, exc=None):
+        start = self.limiter.acquire()
+        self.clock.now += seconds
+        self.limiter.release(start, exc)
+
+    def test_additive_increase(self):
+        for _i in range(4):
+            self.call()
+        self.assertEqual(5, self.limiter.snapshot()['limit'])
+        for _i in range(100):
+            self.call()
+        self.assertEqual(8, self.limiter.snapshot()['limit'])
+
+    def test_multiplicative_decrease(self):
+        self.call(exc=exceptions.ClientException(503, 'Unavailable'))
+        self.assertEqual(2, self.limiter.snapshot()['limit'])
+        self.assertEqual('overload', self.limiter.history[-1][2])
+
+    def test_one_decrease_per_congestion(self):
+        starts = [self.limiter.acquire() for _i in range(3)]
+        self.clock.now += 0.1
+        throttled = exceptions.ClientException(429, 'Throttled')
+        for start in starts:
+            self.limiter.release(start, throttled)
+        self.assertEqual(2, self.limiter.snapshot()['limit'])
+        self.assertEqual(0, self.limiter.snapshot()['in_flight'])
+
+    def test_latency_decrease(self):
+        self.call(0.1)
+        self.call(1.0)
+        self.assertEqual('latency', self.limiter.history[-1][2])
+
+    def test_not_overload(self):
+        self.assertFalse(concurrency.is_overload(
+            exceptions.NotFound(404)))
+        self.assertTrue(concurrency.is_overload(
+            exceptions.OverLimit(413)))
+        self.assertTrue(concurrency.is_overload(
+            exceptions.ConnectionError()))
+        self.assertFalse(concurrency.is_overload(None))
+
+    def test_shell_default(self):
+        parser = shell.OpenStackConveyorShell().get_base_parser()
+        self.assertEqual(concurrency.DEFAULT_MAX_LIMIT,
+                         parser.parse_args([]).max_concurrency)
+
+
+class BulkTest(utils.TestCase):
+
+    def setUp(self):
+        super(BulkTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=20)
+
+    def test_bulk_delete(self):
+        # Steady latencies, so that the limit only grows.
+        self.cloud.latency[self.cloud.endpoint] = 0.02
+        cs = self.make_client(self.cloud)
+        plan_ids = list(self.cloud.plans)
+        results = cs.plans.delete_many(plan_ids + ['missing'])
+        self.assertEqual(plan_ids + ['missing'],
+                         [item for item, _r, _e in results])
+        self.assertEqual([None] * 20, [e for _i, _r, e in results[:-1]])
+        self.assertIsInstance(results[-1][2], exceptions.NotFound)
+        self.assertEqual({}, dict(self.cloud.plans))
+        self.assertGreater(cs.get_concurrency()['limit'],
+                           concurrency.DEFAULT_INITIAL_LIMIT)
+
+    def test_backs_off_on_overload(self):
+        self.cloud.script.extend([503] * 5)
+        cs = self.make_client(self.cloud,
+                              retry_policy=utils.fast_retries(0))
+        results = cs.plans.delete_many(list(self.cloud.plans))
+        errors = [e for _i, _r, e in results if e is not None]
+        self.assertEqual(5, len(errors))
+        self.assertEqual(5, len(self.cloud.plans))
+        self.assertIn('overload',
+                      [reason for _t, _limit, reason
+                       in cs.get_concurrency()['history']])
+
+    def test_bulk_shares_the_deadline(self):
+        self.cloud.latency[self.cloud.endpoint] = 1
+        cs = self.make_client(self.cloud)
+        cs.authenticate()
+        with deadline.scope(0.2):
+            results = cs.bulk(lambda plan_id: cs.plans.get(plan_id),
+                              ['a', 'b'])
+        self.assertEqual(
+            [exceptions.DeadlineExceeded] * 2,
+            [e.__class__ for _item, _result, e in results])
+
+
+class FanOutTest(utils.TestCase):
+
+    def test_map_threads(self):
+        results = concurrency.map_threads(lambda item: 10 // item, [5, 0])
+        self.assertEqual([(5, 2, None)], results[:1])
+        self.assertIsInstance(results[1][2], ZeroDivisionError)
+
+    def test_nested_bulk(self):
+        cloud = self.fake_cloud(plans=3, regions=('RegionOne', 'RegionTwo'))
+        # Fewer slots than regions: a fan out taking bulk slots would
+        # leave none to the bulk calls of the regions.
+        cs = self.make_client(cloud, max_concurrency=1)
+        cs.authenticate()
+        plan_ids = list(cloud.plans)
+        results = []
+
+        def get_plans(region_cs):
+            return [result.plan_id for _item, result, _e
+                    in region_cs.bulk(region_cs.plans.get, plan_ids)]
+
+        thread = threading.Thread(
+            target=lambda: results.extend(cs.fan_out(get_plans)))
+        thread.daemon = True
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([('RegionOne', plan_ids, None),
+                          ('RegionTwo', plan_ids, None)],
+                         [result[:3] for result in results])
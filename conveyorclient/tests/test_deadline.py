@@ -0,0 +1,109 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+from conveyorclient.common import deadline
+from conveyorclient.common import retry
+from conveyorclient import exceptions
+from conveyorclient.tests import utils
+
+
+class DeadlineTest(utils.TestCase):
+
+    def test_scope(self):
+        clock = utils.FakeClock()
+        self.assertIsNone(deadline.current())
+        with deadline.scope(10, clock) as outer:
+            self.assertIs(outer, deadline.current())
+            # The tighter deadline wins.
+            with deadline.scope(20, clock) as inner:
+                self.assertIs(outer, inner)
+            with deadline.scope(None, clock) as inner:
+                self.assertIs(outer, inner)
+            with deadline.scope(5, clock) as inner:
+                self.assertEqual(5, inner.remaining())
+            self.assertIs(outer, deadline.current())
+        self.assertIsNone(deadline.current())
+
+    def test_timeout(self):
+        clock = utils.FakeClock()
+        self.assertEqual(30, deadline.timeout(30))
+        with deadline.scope(10, clock):
+            self.assertEqual(10, deadline.timeout())
+            self.assertEqual(3, deadline.timeout(3))
+            clock.now += 8
+            self.assertEqual(2, deadline.timeout(30))
+            self.assertTrue(deadline.allows(1))
+            self.assertFalse(deadline.allows(2))
+            clock.now += 2
+            self.assertRaises(exceptions.DeadlineExceeded, deadline.timeout)
+
+    def test_sleep(self):
+        slept = []
+        with deadline.scope(1):
+            self.assertRaises(exceptions.DeadlineExceeded, deadline.sleep,
+                              5, slept.append)
+        self.assertEqual(1, len(slept))
+        self.assertLessEqual(slept[0], 1)
+
+
+class ClientDeadlineTest(utils.TestCase):
+
+    def setUp(self):
+        super(ClientDeadlineTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=5)
+
+    def test_slow_answer(self):
+        self.cloud.latency[self.cloud.endpoint] = 1
+        cs = self.make_client(self.cloud, request_deadline=0.3)
+        cs.authenticate()
+        start = time.time()
+        self.assertRaises(exceptions.DeadlineExceeded, cs.plans.list)
+        self.assertLess(time.time() - start, 0.9)
+
+    def test_no_retry_past_the_deadline(self):
+        self.cloud.script.extend([503] * 3)
+        cs = self.make_client(
+            self.cloud, request_deadline=0.5,
+            retry_policy=retry.RetryPolicy(max_attempts=3, base_delay=1))
+        start = time.time()
+        e = self.assertRaises(exceptions.ClientException, cs.plans.list)
+        self.assertEqual(503, e.code)
+        self.assertEqual(1, self.cloud.requests)
+        self.assertLess(time.time() - start, 0.5)
+
+    def test_caller_deadline(self):
+        self.cloud.latency[self.cloud.endpoint] = 1
+        cs = self.make_client(self.cloud)
+        cs.authenticate()
+        with deadline.scope(0.2):
+            self.assertRaises(exceptions.DeadlineExceeded, cs.plans.list)
+
+    def test_coalesced_caller_deadline(self):
+        self.cloud.latency[self.cloud.endpoint] = 1
+        cs = self.make_client(self.cloud, coalesce_requests=True)
+        cs.authenticate()
+        leader = threading.Thread(target=cs.plans.list)
+        leader.start()
+        self.addCleanup(leader.join)
+        while not self.cloud.requests:
+            time.sleep(0.01)
+        # Waits for the request of the leader, but not past its deadline.
+        start = time.time()
+        with deadline.scope(0.2):
+            self.assertRaises(exceptions.DeadlineExceeded, cs.plans.list)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(1, cs.client.coalescer.shared)
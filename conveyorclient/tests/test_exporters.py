@@ -0,0 +1,137 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import socket
+
+import fixtures
+import testtools
+
+from conveyorclient.common import exporters
+from conveyorclient.common import metrics
+
+
+class StatsdTest(testtools.TestCase):
+
+    def setUp(self):
+        super(StatsdTest, self).setUp()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.server.close)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.settimeout(5)
+        self.registry = metrics.Registry(buckets=(0.1, 1.0))
+        self.exporter = exporters.Statsd(
+            self.registry, port=self.server.getsockname()[1])
+        self.addCleanup(self.exporter.stop)
+
+    def receive(self):
+        return self.server.recv(65536).decode('utf-8').split('\n')
+
+    def test_lines(self):
+        self.registry.inc('retries', method='GET')
+        self.registry.observe('call_seconds', 0.5, operation='plans.list')
+        self.exporter.flush()
+        # The le_0_1 bucket did not change, it is not sent.
+        self.assertEqual(
+            ['conveyorclient.call_seconds.plans.list.count:1|c',
+             'conveyorclient.call_seconds.plans.list.sum:0.500000|c',
+             'conveyorclient.call_seconds.plans.list.le_1:1|c',
+             'conveyorclient.call_seconds.plans.list.le_inf:1|c',
+             'conveyorclient.retries.GET:1|c'],
+            self.receive())
+
+    def test_sends_increases(self):
+        self.registry.inc('retries', method='GET')
+        self.exporter.flush()
+        self.receive()
+        self.registry.inc('retries', 2, method='GET')
+        self.registry.inc('retries', method='POST')
+        self.exporter.flush()
+        self.assertEqual(['conveyorclient.retries.GET:2|c',
+                          'conveyorclient.retries.POST:1|c'],
+                         self.receive())
+
+    def test_datagrams_are_split(self):
+        for i in range(100):
+            self.registry.inc('retries', method='METHOD%03d' % i)
+        self.exporter.flush()
+        lines = []
+        while len(lines) < 100:
+            datagram = self.server.recv(65536)
+            self.assertLessEqual(len(datagram), exporters.MAX_DATAGRAM)
+            lines.extend(datagram.decode('utf-8').split('\n'))
+        self.assertEqual('conveyorclient.retries.METHOD099:1|c', lines[-1])
+
+
+class PrometheusTextfileTest(testtools.TestCase):
+
+    def setUp(self):
+        super(PrometheusTextfileTest, self).setUp()
+        self.directory = self.useFixture(fixtures.TempDir()).path
+        self.registry = metrics.Registry(buckets=(0.1, 1.0))
+        self.exporter = exporters.PrometheusTextfile(
+            self.registry, self.directory, labels={'job': 'test'})
+        self.path = os.path.join(self.directory,
+                                 exporters.DEFAULT_TEXTFILE_NAME)
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read().split('\n')
+
+    def test_render(self):
+        self.registry.inc('retries', method='GET')
+        self.registry.observe('call_seconds', 0.5, operation='plans.list')
+        self.exporter.flush()
+        lines = self.read()
+        self.assertIn('# TYPE conveyorclient_retries_total counter', lines)
+        self.assertIn('conveyorclient_retries_total{job="test",method="GET"}'
+                      ' 1', lines)
+        self.assertIn('# TYPE conveyorclient_call_seconds histogram', lines)
+        self.assertIn('conveyorclient_call_seconds_bucket{job="test",'
+                      'le="1.0",operation="plans.list"} 1', lines)
+        self.assertIn('conveyorclient_call_seconds_bucket{job="test",'
+                      'le="+Inf",operation="plans.list"} 1', lines)
+        self.assertIn('conveyorclient_call_seconds_count{job="test",'
+                      'operation="plans.list"} 1', lines)
+        self.assertEqual('', lines[-1])
+
+    def test_replaced_atomically(self):
+        self.registry.inc('retries', method='GET')
+        self.exporter.flush()
+        with open(self.path) as reader:
+            self.registry.inc('retries', method='GET')
+            self.exporter.flush()
+            # The open file is the one written first, not a half written
+            # one, and no temporary file is left over.
+            self.assertIn('conveyorclient_retries_total{job="test",'
+                          'method="GET"} 1', reader.read().split('\n'))
+        self.assertIn('conveyorclient_retries_total{job="test",'
+                      'method="GET"} 2', self.read())
+        self.assertEqual([exporters.DEFAULT_TEXTFILE_NAME],
+                         os.listdir(self.directory))
+        self.assertEqual(0o644, os.stat(self.path).st_mode & 0o777)
+
+    def test_failed_write_keeps_the_file(self):
+        self.exporter.flush()
+        before = self.read()
+        self.useFixture(fixtures.MonkeyPatch(
+            'os.rename', self._fail_rename))
+        self.registry.inc('retries', method='GET')
+        self.exporter.flush()
+        self.assertEqual(before, self.read())
+        self.assertEqual([exporters.DEFAULT_TEXTFILE_NAME],
+                         os.listdir(self.directory))
+
+    def _fail_rename(self, source, destination):
+        raise OSError('Injected failure')
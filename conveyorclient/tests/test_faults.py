@@ -0,0 +1,118 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from conveyorclient.common import deadline
+from conveyorclient import exceptions
+from conveyorclient.tests import stub_server
+from conveyorclient.tests import utils
+
+
+class FaultTest(utils.TestCase):
+
+    def test_schedule(self):
+        fault = stub_server.Fault(stub_server.ERROR, start=1, duration=2)
+        self.assertFalse(fault.active(0.5))
+        self.assertTrue(fault.active(1))
+        self.assertTrue(fault.active(2.5))
+        self.assertFalse(fault.active(3))
+        self.assertTrue(stub_server.Fault(stub_server.ERROR).active(1e6))
+
+    def test_unknown_kind(self):
+        self.assertRaises(ValueError, stub_server.Fault, 'meteor')
+
+
+class InjectedFaultTest(utils.TestCase):
+
+    def test_errors_retried(self):
+        cloud = self.start_cloud(
+            plans=5, seed=1,
+            faults=[stub_server.Fault(stub_server.ERROR, rate=0.5)])
+        cs = self.make_client(cloud, retry_policy=utils.fast_retries(10))
+        for _i in range(10):
+            self.assertEqual(5, len(cs.plans.list()))
+        self.assertGreater(cloud.api.injected[stub_server.ERROR], 0)
+        self.assertEqual(10 + cloud.api.injected[stub_server.ERROR],
+                         cloud.api.requests)
+
+    def test_connection_reset(self):
+        cloud = self.start_cloud(
+            plans=5, faults=[stub_server.Fault(stub_server.RESET)])
+        cs = self.make_client(cloud, retry_policy=utils.fast_retries(2))
+        self.assertRaises(exceptions.ConnectionError, cs.plans.list)
+        self.assertEqual(3, cloud.api.injected[stub_server.RESET])
+
+    def test_throttled(self):
+        cloud = self.start_cloud(
+            plans=5, faults=[stub_server.Fault(stub_server.THROTTLE,
+                                               duration=0.3,
+                                               retry_after=0.5)])
+        cs = self.make_client(cloud, retry_policy=utils.fast_retries(3))
+        self.assertEqual(5, len(cs.plans.list()))
+        self.assertEqual(1, cloud.api.injected[stub_server.THROTTLE])
+        self.assertEqual(2, cloud.api.requests)
+
+    def test_slow_answer_past_the_deadline(self):
+        cloud = self.start_cloud(
+            plans=5, faults=[stub_server.Fault(stub_server.SLOW, delay=1)])
+        cs = self.make_client(cloud)
+        cs.authenticate()
+        with deadline.scope(0.2):
+            self.assertRaises(exceptions.DeadlineExceeded, cs.plans.list)
+        self.assertEqual(1, cloud.api.injected[stub_server.SLOW])
+
+    def test_bulk_backs_off_on_overload(self):
+        cloud = self.start_cloud(
+            plans=20, seed=3,
+            faults=[stub_server.Fault(stub_server.ERROR, rate=0.5)])
+        cs = self.make_client(cloud)
+        results = cs.plans.delete_many(list(cloud.api.plans))
+        errors = [e for _i, _r, e in results if e is not None]
+        self.assertEqual(cloud.api.injected[stub_server.ERROR], len(errors))
+        self.assertIn('overload',
+                      [reason for _t, _limit, reason
+                       in cs.get_concurrency()['history']])
+
+
+class TokenExpiryFaultTest(utils.TestCase):
+
+    def setUp(self):
+        super(TokenExpiryFaultTest, self).setUp()
+        self.cloud = self.start_cloud(
+            plans=5, faults=[stub_server.Fault(stub_server.EXPIRE)])
+        self.cs = self.make_client(self.cloud)
+        self.cs.authenticate()
+        # Expire the token: the API now rejects it with a 401.
+        self.cloud.api.restart_faults()
+
+    def test_reauthenticates(self):
+        self.assertEqual(5, len(self.cs.plans.list()))
+        self.assertEqual(2, self.cloud.keystone.tokens_issued)
+        self.assertEqual(2, self.cloud.api.requests)
+        self.assertEqual(1, self.cloud.api.injected[stub_server.EXPIRE])
+
+    def test_reauthenticates_once_for_all_threads(self):
+        counts = []
+
+        def list_plans():
+            counts.append(len(self.cs.plans.list()))
+
+        threads = [threading.Thread(target=list_plans) for _i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([5] * 5, counts)
+        self.assertEqual(2, self.cloud.keystone.tokens_issued)
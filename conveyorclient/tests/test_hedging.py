@@ -0,0 +1,151 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+from conveyorclient.common import hedging
+from conveyorclient.common import rate_limit
+from conveyorclient import exceptions
+from conveyorclient.tests import fakes
+from conveyorclient.tests import utils
+
+
+class HedgerTest(utils.TestCase):
+
+    def test_no_hedge_when_fast(self):
+        hedger = hedging.Hedger(initial_delay=1)
+        self.assertEqual('a', hedger.call(lambda target: target, ['a', 'b']))
+        self.assertEqual({'calls': 1, 'hedges': 0, 'hedge_wins': 0},
+                         hedger.stats())
+
+    def test_hedge_wins(self):
+        hedger = hedging.Hedger(initial_delay=0.05)
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def send(target):
+            if target == 'slow':
+                release.wait(5)
+            return target
+
+        self.assertEqual('fast', hedger.call(send, ['slow', 'fast']))
+        self.assertEqual({'calls': 1, 'hedges': 1, 'hedge_wins': 1},
+                         hedger.stats())
+
+    def test_hedge_on_server_error(self):
+        hedger = hedging.Hedger(initial_delay=5)
+
+        def send(target):
+            if target == 'broken':
+                raise exceptions.ClientException(503, 'Unavailable')
+            return target
+
+        start = time.time()
+        self.assertEqual('ok', hedger.call(send, ['broken', 'ok']))
+        self.assertLess(time.time() - start, 1)
+
+    def test_client_error_is_an_answer(self):
+        hedger = hedging.Hedger(initial_delay=5)
+        sent = []
+
+        def send(target):
+            sent.append(target)
+            raise exceptions.NotFound(404)
+
+        self.assertRaises(exceptions.NotFound, hedger.call, send,
+                          ['a', 'b'])
+        self.assertEqual(['a'], sent)
+
+    def test_delay_percentile(self):
+        hedger = hedging.Hedger(percentile=0.9, min_samples=10,
+                                initial_delay=1, min_delay=0.01)
+        for i in range(9):
+            hedger.record(i / 100.0)
+        self.assertEqual(1, hedger.delay())
+        hedger.record(0.09)
+        self.assertEqual(0.08, hedger.delay())
+
+    def test_before_hedge(self):
+        hedger = hedging.Hedger(initial_delay=5)
+        waited = []
+
+        def send(target):
+            if target == 'broken':
+                raise exceptions.ClientException(503, 'Unavailable')
+            return target
+
+        self.assertEqual('ok', hedger.call(
+            send, ['broken', 'ok'], before_hedge=lambda: waited.append(1)))
+        self.assertEqual([1], waited)
+
+
+class CountingRateLimiter(rate_limit.RateLimiter):
+
+    def __init__(self, *args, **kwargs):
+        super(CountingRateLimiter, self).__init__(*args, **kwargs)
+        self.acquired = 0
+
+    def acquire(self, path):
+        self.acquired += 1
+        return super(CountingRateLimiter, self).acquire(path)
+
+
+class ClientHedgingTest(utils.TestCase):
+
+    def setUp(self):
+        super(ClientHedgingTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=5, replicas=2)
+        self.slow, self.fast = self.cloud.endpoints[fakes.REGION]
+        self.hedger = hedging.Hedger(initial_delay=0.1)
+
+    def test_hedge_to_the_other_endpoint(self):
+        self.cloud.latency[self.slow] = 1
+        cs = self.make_client(self.cloud, hedge_gets=self.hedger)
+        cs.authenticate()
+        start = time.time()
+        self.assertEqual(5, len(cs.plans.list()))
+        self.assertLess(time.time() - start, 0.9)
+        self.assertEqual(1, self.hedger.stats()['hedge_wins'])
+        self.assertEqual(1, self.cloud.count(self.fast))
+
+    def test_hedges_are_rate_limited(self):
+        self.cloud.latency[self.slow] = 1
+        limiter = CountingRateLimiter(rate=100)
+        cs = self.make_client(self.cloud, hedge_gets=self.hedger,
+                              rate_limiter=limiter)
+        cs.authenticate()
+        self.assertEqual(5, len(cs.plans.list()))
+        self.assertEqual(1, self.hedger.stats()['hedges'])
+        self.assertEqual(2, limiter.acquired)
+
+    def test_hedges_do_not_take_a_bulk_slot(self):
+        self.cloud.latency[self.slow] = 1
+        cs = self.make_client(self.cloud, hedge_gets=self.hedger,
+                              max_concurrency=1)
+        cs.authenticate()
+        start = time.time()
+        results = cs.bulk(lambda _item: len(cs.plans.list()), ['a'])
+        self.assertEqual([('a', 5, None)], results)
+        self.assertLess(time.time() - start, 0.9)
+        self.assertEqual(1, self.hedger.stats()['hedge_wins'])
+
+    def test_writes_are_not_hedged(self):
+        self.cloud.latency[self.slow] = 0.2
+        hedger = hedging.Hedger(initial_delay=0.01)
+        cs = self.make_client(self.cloud, hedge_gets=hedger)
+        plan_id = cs.plans.list()[0].plan_id
+        requests = self.cloud.requests
+        cs.plans.update(plan_id, {'plan_name': 'renamed'})
+        self.assertEqual(requests + 1, self.cloud.requests)
@@ -0,0 +1,61 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from conveyorclient.tests import utils
+
+
+class ResponseCacheTest(utils.TestCase):
+
+    def setUp(self):
+        super(ResponseCacheTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=20)
+        self.cs = self.make_client(self.cloud)
+        self.cache = self.cs.client.response_cache
+        self.plan_id = list(self.cloud.plans)[0]
+
+    def test_revalidation_saves_the_body(self):
+        self.cs.plans.list()
+        sent = self.cloud.bytes_sent
+        self.assertEqual(20, len(self.cs.plans.list()))
+        self.assertEqual(1, self.cloud.not_modified)
+        self.assertEqual(sent, self.cloud.bytes_sent)
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(self.cache.size, self.cache.bytes_saved)
+
+    def test_cached_body_is_not_shared(self):
+        expected = self.cs.plans.get(self.plan_id)._info['plan_name']
+        # Modify what the resource got from the cache, as a caller may.
+        cached = self.cs.plans.get(self.plan_id)
+        cached._info['plan_name'] = 'changed'
+        cached._info['clone_resources'].append({'obj_id': 'added'})
+
+        plan = self.cs.plans.get(self.plan_id)
+        self.assertEqual(2, self.cloud.not_modified)
+        self.assertEqual(expected, plan._info['plan_name'])
+        self.assertNotIn({'obj_id': 'added'},
+                         plan._info['clone_resources'])
+
+    def test_changed_resource_is_fetched(self):
+        self.cs.plans.get(self.plan_id)
+        self.cs.plans.update(self.plan_id, {'plan_name': 'renamed'})
+        plan = self.cs.plans.get(self.plan_id)
+        self.assertEqual(0, self.cloud.not_modified)
+        self.assertEqual('renamed', plan._info['plan_name'])
+
+    def test_disabled(self):
+        cs = self.make_client(self.cloud, response_cache_size=0)
+        for _i in range(2):
+            cs.plans.get(self.plan_id)
+        self.assertEqual(0, self.cloud.not_modified)
+        self.assertIsNone(cs.client.response_cache)
@@ -0,0 +1,64 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import testtools
+
+from conveyorclient.common import loadgen
+from conveyorclient import exceptions
+
+
+class LoadGeneratorTest(testtools.TestCase):
+
+    def test_open_loop_keeps_late_calls(self):
+        # One worker, a call every 10ms taking 30ms: most calls wait.
+        generator = loadgen.LoadGenerator(
+            [('slow', 1, lambda: time.sleep(0.03))], duration=0.19,
+            concurrency=1, rate=50)
+        report = generator.run()
+        total = report['operations'][None]
+        self.assertEqual(10, total['requests'])
+        self.assertGreater(report['late'], 5)
+        # The last call, scheduled at 0.18s, waited for the 9 before it
+        # to end at 0.27s: its latency counts that wait.
+        self.assertGreater(total['max'], 0.1)
+
+    def test_open_loop_on_time(self):
+        generator = loadgen.LoadGenerator(
+            [('fast', 1, lambda: None)], duration=0.19, concurrency=2,
+            rate=20)
+        report = generator.run()
+        self.assertEqual(4, report['operations'][None]['requests'])
+        self.assertEqual(0, report['late'])
+
+    def test_closed_loop_errors(self):
+        def fail():
+            raise exceptions.NotFound(404)
+
+        generator = loadgen.LoadGenerator(
+            [('ok', 1, lambda: time.sleep(0.001)), ('fail', 1, fail)],
+            duration=0.1, concurrency=2, seed=1)
+        report = generator.run()
+        fail_summary = report['operations']['fail']
+        self.assertEqual(fail_summary['requests'],
+                         fail_summary['errors'])
+        self.assertEqual({('fail', '404 NotFound'): fail_summary['errors']},
+                         report['errors'])
+        self.assertEqual(0, report['operations']['ok']['errors'])
+
+    def test_percentile(self):
+        self.assertIsNone(loadgen.percentile([], 0.5))
+        self.assertEqual(50, loadgen.percentile(list(range(101)), 0.5))
+        self.assertEqual(99, loadgen.percentile(list(range(101)), 0.99))
@@ -0,0 +1,62 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from conveyorclient.common import metrics
+from conveyorclient.tests import utils
+
+
+def _operations(snapshot, name):
+    return sorted(sample['labels']['operation']
+                  for sample in snapshot.get(name, {}).get('samples', ()))
+
+
+class MetricsTest(utils.TestCase):
+
+    def setUp(self):
+        super(MetricsTest, self).setUp()
+        self.cloud = self.start_cloud(plans=5)
+        self.cs = self.make_client(self.cloud)
+
+    def test_api_methods_only(self):
+        plan_id = self.cs.plans.list()[0].plan_id
+        self.cs.plans.find(plan_id=plan_id)
+        self.cs.resources.invalidate_plan_cache(plan_id)
+        snapshot = self.cs.get_metrics()
+        # find() lists the plans, only that list is recorded.
+        self.assertEqual(['plans.list'],
+                         _operations(snapshot, 'call_seconds'))
+        self.assertEqual(2, snapshot['call_seconds']['samples'][0]['count'])
+
+    def test_every_api_method_exists(self):
+        for name in ('clones', 'resources', 'plans', 'migrates', 'configs'):
+            manager = getattr(self.cs, name)
+            for attr, method in metrics.manager_methods(manager):
+                self.assertTrue(callable(method), '%s.%s' % (name, attr))
+
+    def test_call_errors(self):
+        self.assertRaises(Exception, self.cs.plans.get, 'missing')
+        snapshot = self.cs.get_metrics()
+        self.assertEqual(['plans.get'], _operations(snapshot, 'call_errors'))
+        self.assertEqual('NotFound',
+                         snapshot['call_errors']['samples'][0]['labels'][
+                             'error'])
+
+    def test_requests(self):
+        self.cs.plans.list()
+        self.cs.plans.list()
+        samples = self.cs.get_metrics()['request_seconds']['samples']
+        counts = dict((sample['labels']['status'], sample['count'])
+                      for sample in samples
+                      if sample['labels']['method'] == 'GET')
+        self.assertEqual({'2xx': 1, '3xx': 1}, counts)
@@ -0,0 +1,101 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import pstats
+
+import fixtures
+import six
+import testtools
+
+from conveyorclient.common import profiling
+from conveyorclient import shell
+from conveyorclient.tests import utils
+
+
+class ProfileTest(utils.TestCase):
+
+    def setUp(self):
+        super(ProfileTest, self).setUp()
+        self.stats_file = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'run.prof')
+
+    def test_stats_saved(self):
+        stream = six.StringIO()
+        with profiling.profile(self.stats_file, stream=stream):
+            sorted(range(1000))
+        stats = pstats.Stats(self.stats_file)
+        self.assertIn('sorted', str(list(stats.stats)))
+        self.assertIn('Profile saved to %s' % self.stats_file,
+                      stream.getvalue())
+
+    def test_stats_saved_on_error(self):
+        stream = six.StringIO()
+
+        def run():
+            with profiling.profile(self.stats_file, stream=stream):
+                raise KeyError('failed')
+
+        self.assertRaises(KeyError, run)
+        self.assertTrue(os.path.exists(self.stats_file))
+
+    @testtools.skipIf(profiling.tracemalloc is None, 'needs tracemalloc')
+    def test_memory(self):
+        stream = six.StringIO()
+        with profiling.profile(memory=True, top=3, stream=stream):
+            data = [str(i) for i in range(10000)]
+        self.assertEqual(10000, len(data))
+        self.assertIn('KiB at the peak', stream.getvalue())
+        self.assertFalse(profiling.tracemalloc.is_tracing())
+
+
+class ShellProfileTest(utils.TestCase):
+
+    def setUp(self):
+        super(ShellProfileTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=3)
+        self.stats_file = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'run.prof')
+        self.stderr = self.useFixture(fixtures.MonkeyPatch(
+            'sys.stderr', six.StringIO())).new_value
+        self.stdout = self.useFixture(fixtures.MonkeyPatch(
+            'sys.stdout', six.StringIO())).new_value
+
+    def run_command(self, *args):
+        return shell.OpenStackConveyorShell().main(
+            ['--profile', self.stats_file,
+             '--os-auth-url', self.cloud.auth_url, '--os-username', 'user',
+             '--os-password', 'password', '--os-tenant-name', 'tenant'] +
+            list(args))
+
+    def test_profile(self):
+        self.run_command('plan-list')
+        self.assertIn('plan-000002', self.stdout.getvalue())
+        stats = pstats.Stats(self.stats_file)
+        self.assertIn('do_plan_list', str(list(stats.stats)))
+        self.assertIn('Profile saved to', self.stderr.getvalue())
+
+    def test_exit_code(self):
+        self.useFixture(fixtures.MockPatchObject(
+            shell.OpenStackConveyorShell, '_main', return_value=3))
+        self.assertEqual(3, self.run_command('plan-list'))
+        self.assertTrue(os.path.exists(self.stats_file))
+
+    def test_exception(self):
+        self.useFixture(fixtures.MockPatchObject(
+            shell.OpenStackConveyorShell, '_main',
+            side_effect=SystemExit(2)))
+        e = self.assertRaises(SystemExit, self.run_command, 'plan-list')
+        self.assertEqual(2, e.code)
+        self.assertTrue(os.path.exists(self.stats_file))
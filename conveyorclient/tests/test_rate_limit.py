@@ -0,0 +1,88 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+from conveyorclient.common import deadline
+from conveyorclient.common import rate_limit
+from conveyorclient import exceptions
+from conveyorclient.tests import utils
+
+
+class TokenBucketTest(utils.TestCase):
+
+    def test_reserve(self):
+        clock = utils.FakeClock()
+        bucket = rate_limit.TokenBucket(rate=2, burst=2, clock=clock)
+        self.assertEqual([0.0, 0.0, 0.5, 1.0],
+                         [bucket.reserve() for _i in range(4)])
+        clock.now += 2
+        self.assertEqual(0.0, bucket.reserve())
+
+    def test_invalid_rate(self):
+        self.assertRaises(ValueError, rate_limit.TokenBucket, 0)
+
+
+class RateLimiterTest(utils.TestCase):
+
+    def setUp(self):
+        super(RateLimiterTest, self).setUp()
+        self.clock = utils.FakeClock()
+        self.slept = []
+
+    def limiter(self, **kwargs):
+        return rate_limit.RateLimiter(clock=self.clock,
+                                      sleep=self.slept.append, **kwargs)
+
+    def test_path_classes(self):
+        limiter = self.limiter(path_classes={'resources': (1, 1)})
+        self.assertEqual('resources',
+                         limiter.path_class('/resources/detail?type=x'))
+        self.assertEqual(0, limiter.acquire('/resources/detail'))
+        self.assertEqual(1, limiter.acquire('/resources/detail'))
+        self.assertEqual(0, limiter.acquire('/plans/detail'))
+        self.assertEqual([1], self.slept)
+        self.assertEqual(1, limiter.waited)
+
+    def test_overall_and_path_class(self):
+        limiter = self.limiter(rate=10, burst=1,
+                               path_classes={'plans': (1, 1)})
+        limiter.acquire('/plans/detail')
+        self.assertEqual(1, limiter.acquire('/plans/detail'))
+        self.assertAlmostEqual(0.2, limiter.acquire('/resources'))
+
+    def test_deadline(self):
+        limiter = self.limiter(rate=1, burst=1)
+        limiter.acquire('/plans')
+        with deadline.scope(0.5, self.clock):
+            self.assertRaises(exceptions.DeadlineExceeded,
+                              limiter.acquire, '/plans')
+
+    def test_default_sleep(self):
+        self.assertIs(rate_limit.sleep, rate_limit.RateLimiter()._sleep)
+
+
+class ClientRateLimitTest(utils.TestCase):
+
+    def test_requests_are_spaced(self):
+        cloud = self.fake_cloud(plans=5)
+        limiter = rate_limit.RateLimiter(rate=20, burst=1)
+        cs = self.make_client(cloud, rate_limiter=limiter, timings=True)
+        start = time.time()
+        for _i in range(5):
+            cs.plans.list()
+        self.assertGreaterEqual(time.time() - start, 0.18)
+        self.assertGreater(limiter.waited, 0)
+        self.assertAlmostEqual(
+            limiter.waited, sum(t['throttled'] for t in cs.get_timings()))
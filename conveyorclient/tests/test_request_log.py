@@ -0,0 +1,111 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import random
+
+import six
+
+from conveyorclient.common import request_log
+from conveyorclient import exceptions
+from conveyorclient.tests import utils
+
+
+class RequestLogTest(utils.TestCase):
+
+    def setUp(self):
+        super(RequestLogTest, self).setUp()
+        self.stream = six.StringIO()
+
+    def test_sampling(self):
+        log = request_log.RequestLog(self.stream, sample_rate=0.25,
+                                     rng=random.Random(1))
+        sampled = len([i for i in range(1000) if log.sampled()])
+        self.assertGreater(sampled, 200)
+        self.assertLess(sampled, 300)
+        self.assertTrue(request_log.RequestLog(self.stream).sampled())
+        never = request_log.RequestLog(self.stream, sample_rate=0)
+        self.assertFalse(any(never.sampled() for _i in range(100)))
+
+    def test_bad_sample_rate(self):
+        self.assertRaises(ValueError, request_log.RequestLog, self.stream,
+                          sample_rate=1.5)
+
+    def test_truncation(self):
+        log = request_log.RequestLog(self.stream, max_body=10)
+        body = 'x' * 100
+        self.assertEqual('x' * 10 + '...(100 bytes)', log._truncate(body))
+        self.assertEqual('short', log._truncate(b'short'))
+        self.assertIsNone(log._truncate(None))
+
+    def test_masking(self):
+        log = request_log.RequestLog(self.stream, max_body=40)
+        body = json.dumps({'auth': {'passwordCredentials': {
+            'username': 'user', 'password': 'hunter2'}}})
+        truncated = log._truncate(body)
+        self.assertNotIn('hunter2', truncated)
+        # Masked even where the truncation cuts the body.
+        log = request_log.RequestLog(self.stream, max_body=len(body) - 5)
+        self.assertNotIn('hunt', log._truncate(body))
+
+
+class ClientRequestLogTest(utils.TestCase):
+
+    def setUp(self):
+        super(ClientRequestLogTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=3)
+        self.stream = six.StringIO()
+
+    def make_log_client(self, **kwargs):
+        log = request_log.RequestLog(self.stream, rng=random.Random(1),
+                                     **kwargs)
+        return self.make_client(self.cloud, request_log=log)
+
+    def entries(self):
+        return [json.loads(line)
+                for line in self.stream.getvalue().splitlines()]
+
+    def test_logged(self):
+        cs = self.make_log_client()
+        cs.plans.list()
+        entry, = self.entries()
+        self.assertEqual('GET', entry['method'])
+        self.assertEqual('/plans/detail', entry['path'])
+        self.assertEqual(200, entry['status'])
+        self.assertEqual(0, entry['retry'])
+        self.assertTrue(entry['request_id'].startswith('req-'))
+        self.assertGreater(entry['response_bytes'], 0)
+        self.assertNotIn('response_body', entry)
+
+    def test_bodies_masked(self):
+        cs = self.make_log_client(max_body=200)
+        plan_id = list(self.cloud.plans)[0]
+        cs.plans.update(plan_id, {'plan_name': 'renamed',
+                                  'password': 'hunter2'})
+        entry, = self.entries()
+        self.assertIn('renamed', entry['request_body'])
+        self.assertNotIn('hunter2', self.stream.getvalue())
+
+    def test_errors_always_logged(self):
+        cs = self.make_log_client(sample_rate=0)
+        cs.plans.list()
+        self.assertRaises(exceptions.NotFound, cs.plans.get, 'missing')
+        entry, = self.entries()
+        self.assertEqual(404, entry['status'])
+        self.assertIn('NotFound', entry['error'])
+
+    def test_errors_sampled(self):
+        cs = self.make_log_client(sample_rate=0, log_errors=False)
+        self.assertRaises(exceptions.NotFound, cs.plans.get, 'missing')
+        self.assertEqual([], self.entries())
@@ -0,0 +1,127 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import requests
+
+from conveyorclient.common import retry
+from conveyorclient import exceptions
+from conveyorclient.tests import utils
+
+
+class RetryPolicyTest(utils.TestCase):
+
+    def test_parse_retry_after(self):
+        self.assertEqual(3.0, retry.parse_retry_after('3'))
+        self.assertEqual(0.0, retry.parse_retry_after('-1'))
+        self.assertEqual(10.0, retry.parse_retry_after(
+            'Thu, 01 Jan 1970 00:00:20 GMT', now=10))
+        self.assertIsNone(retry.parse_retry_after('soon'))
+        self.assertIsNone(retry.parse_retry_after(None))
+
+    def test_next_delay(self):
+        state = retry.RetryPolicy(max_attempts=3, base_delay=1,
+                                  max_delay=2).start()
+        self.assertIsNone(state.next_delay(404))
+        delay = state.next_delay(503)
+        self.assertTrue(1 <= delay <= 2, delay)
+        self.assertIsNotNone(state.next_delay())
+        # The third attempt was the last one.
+        state.retries = 2
+        self.assertIsNone(state.next_delay(503))
+
+    def test_retry_after(self):
+        policy = retry.RetryPolicy(max_attempts=3, base_delay=0.1,
+                                   max_retry_after=10)
+        self.assertEqual(5.0, policy.start().next_delay(429, '5'))
+        self.assertIsNone(policy.start().next_delay(429, '60'))
+        # Only the throttling statuses carry a meaningful Retry-After.
+        self.assertLess(policy.start().next_delay(500, '5'), 1)
+
+    def test_per_status_limit(self):
+        state = retry.RetryPolicy(max_attempts=5, base_delay=0.1,
+                                  retry_statuses={503: 1}).start()
+        self.assertIsNotNone(state.next_delay(503))
+        self.assertIsNone(state.next_delay(503))
+        self.assertIsNone(state.next_delay(500))
+
+    def test_connection_errors(self):
+        policy = retry.RetryPolicy(max_attempts=3,
+                                   retry_connection_errors=False)
+        self.assertIsNone(policy.start().next_delay())
+
+
+class RetryTest(utils.TestCase):
+
+    def setUp(self):
+        super(RetryTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=5)
+
+    def test_gives_up(self):
+        self.cloud.script.extend([503] * 3)
+        cs = self.make_client(self.cloud, retry_policy=utils.fast_retries(2))
+        e = self.assertRaises(exceptions.ClientException, cs.plans.list)
+        self.assertEqual(503, e.code)
+        self.assertEqual(3, self.cloud.requests)
+
+    def test_not_retried(self):
+        cs = self.make_client(self.cloud, retry_policy=utils.fast_retries(2))
+        self.assertRaises(exceptions.NotFound, cs.plans.get, 'missing')
+        self.assertEqual(1, self.cloud.requests)
+
+    def test_recovers(self):
+        self.cloud.script.extend([500, None, 503, 502, None])
+        cs = self.make_client(self.cloud, retry_policy=utils.fast_retries(3),
+                              timings=True)
+        for _i in range(3):
+            self.assertEqual(5, len(cs.plans.list()))
+        self.assertEqual(6, self.cloud.requests)
+        self.assertEqual([1, 2, 0],
+                         [timing['retries'] for timing in cs.get_timings()
+                          if timing['request'].startswith('GET')])
+
+    def test_connection_reset(self):
+        self.cloud.script.extend(
+            requests.exceptions.ConnectionError('Connection reset by peer')
+            for _i in range(3))
+        cs = self.make_client(self.cloud, retry_policy=utils.fast_retries(2))
+        self.assertRaises(exceptions.ConnectionError, cs.plans.list)
+        self.assertEqual(3, self.cloud.requests)
+
+    def test_429_retry_after(self):
+        self.cloud.script.extend([(429, {'Retry-After': '1'})] * 2)
+        cs = self.make_client(self.cloud, retry_policy=retry.RetryPolicy(
+            max_attempts=2, base_delay=0.01))
+        start = time.time()
+        e = self.assertRaises(exceptions.ClientException, cs.plans.list)
+        self.assertEqual(429, e.code)
+        self.assertEqual('1', e.retry_after)
+        self.assertEqual(2, self.cloud.requests)
+        self.assertGreaterEqual(time.time() - start, 1)
+
+    def test_429_retry_after_too_long(self):
+        self.cloud.script.append((429, {'Retry-After': '60'}))
+        cs = self.make_client(self.cloud, retry_policy=retry.RetryPolicy(
+            max_attempts=3, base_delay=0.01, max_retry_after=10))
+        self.assertRaises(exceptions.ClientException, cs.plans.list)
+        self.assertEqual(1, self.cloud.requests)
+
+    def test_throttled(self):
+        self.cloud.script.append((503, {'Retry-After': '0.5'}))
+        cs = self.make_client(self.cloud, retry_policy=utils.fast_retries(3))
+        start = time.time()
+        self.assertEqual(5, len(cs.plans.list()))
+        self.assertEqual(2, self.cloud.requests)
+        self.assertGreaterEqual(time.time() - start, 0.5)
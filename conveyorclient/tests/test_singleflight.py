@@ -0,0 +1,151 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from conveyorclient.common import singleflight
+from conveyorclient.tests import utils
+
+
+class SingleFlightTest(utils.TestCase):
+
+    def run_threads(self, count, target):
+        threads = [threading.Thread(target=target) for _i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def test_shared_result(self):
+        flight = singleflight.SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return 'result'
+
+        def caller():
+            results.append(flight.do('key', fn))
+
+        threads = self.run_threads(5, caller)
+        # Wait for the followers to queue behind the leader.
+        while flight.shared < 4:
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(calls))
+        self.assertEqual(['result'] * 5, results)
+
+    def test_shared_exception(self):
+        flight = singleflight.SingleFlight()
+        release = threading.Event()
+        errors = []
+
+        def fn():
+            release.wait(5)
+            raise ValueError('boom')
+
+        def caller():
+            try:
+                flight.do('key', fn)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = self.run_threads(3, caller)
+        while flight.shared < 2:
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(3, len(errors))
+        self.assertEqual(1, len(set(id(e) for e in errors)))
+
+    def test_keys_are_independent(self):
+        flight = singleflight.SingleFlight()
+        self.assertEqual(1, flight.do('a', lambda: 1))
+        self.assertEqual(2, flight.do('a', lambda: 2))
+        self.assertEqual(0, flight.shared)
+
+    def test_waiters_get_a_copy(self):
+        flight = singleflight.SingleFlight(copy=list)
+        release = threading.Event()
+        results = []
+
+        def fn():
+            release.wait(5)
+            return ['result']
+
+        def caller():
+            results.append(flight.do('key', fn))
+
+        threads = self.run_threads(3, caller)
+        while flight.shared < 2:
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([['result']] * 3, results)
+        self.assertEqual(3, len(set(id(result) for result in results)))
+
+
+class ClientCoalescingTest(utils.TestCase):
+
+    def setUp(self):
+        super(ClientCoalescingTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=5)
+        self.cs = self.make_client(self.cloud, coalesce_requests=True)
+        self.cs.authenticate()
+        self.cloud.latency[self.cloud.endpoint] = 0.3
+
+    def run_threads(self, count, target):
+        threads = [threading.Thread(target=target) for _i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_gets_are_coalesced(self):
+        counts = []
+
+        def list_plans():
+            counts.append(len(self.cs.plans.list()))
+
+        self.run_threads(5, list_plans)
+        self.assertEqual([5] * 5, counts)
+        self.assertEqual(1, self.cloud.requests)
+        self.assertEqual(4, self.cs.client.coalescer.shared)
+
+    def test_each_caller_gets_its_own_body(self):
+        bodies = []
+
+        def get_plans():
+            bodies.append(self.cs.client.get('/plans/detail')[1])
+
+        self.run_threads(3, get_plans)
+        self.assertEqual(1, self.cloud.requests)
+        self.assertEqual([bodies[0]] * 3, bodies)
+        self.assertEqual(3, len(set(id(body['plans']) for body in bodies)))
+
+    def test_writes_are_not_coalesced(self):
+        plan_id = list(self.cloud.plans)[0]
+
+        def update_plan():
+            self.cs.plans.update(plan_id, {'plan_name': 'renamed'})
+
+        self.run_threads(3, update_plan)
+        self.assertEqual(3, self.cloud.count(method='PUT'))
+        self.assertEqual(0, self.cs.client.coalescer.shared)
@@ -0,0 +1,85 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import fixtures
+import requests
+
+from conveyorclient.common import unix_socket
+from conveyorclient import exceptions
+from conveyorclient.tests import stub_server
+from conveyorclient.tests import utils
+
+
+class StubCloudTest(utils.TestCase):
+
+    def test_client(self):
+        cloud = self.start_cloud(plans=5, servers=3)
+        cs = self.make_client(cloud)
+        plans = cs.plans.list()
+        self.assertEqual(5, len(plans))
+        self.assertEqual(plans[0].plan_id,
+                         cs.plans.get(plans[0].plan_id).plan_id)
+        self.assertEqual(1, cloud.keystone.tokens_issued)
+        self.assertEqual(2, cloud.api.requests)
+        self.assertEqual(self.conveyor_url(cloud),
+                         cs.client.management_url)
+
+    def test_seeded_data_set(self):
+        first = stub_server.StubConveyorAPI(plans=5, seed=1)
+        second = stub_server.StubConveyorAPI(plans=5, seed=1)
+        other = stub_server.StubConveyorAPI(plans=5, seed=2)
+        self.assertEqual(sorted(first.plans), sorted(second.plans))
+        self.assertNotEqual(sorted(first.plans), sorted(other.plans))
+
+    def test_regions(self):
+        cloud = self.start_cloud(plans=2, regions=('RegionOne', 'RegionTwo'))
+        cs = self.make_client(cloud)
+        self.assertEqual(['RegionOne', 'RegionTwo'], cs.get_regions())
+        cs.for_region('RegionTwo').plans.list()
+        self.assertEqual(0, cloud.apis['RegionOne'].requests)
+        self.assertEqual(1, cloud.apis['RegionTwo'].requests)
+
+    def test_conditional_get(self):
+        cloud = self.start_cloud(plans=5)
+        url = self.conveyor_url(cloud) + '/plans/detail'
+        resp = requests.get(url)
+        self.assertEqual(200, resp.status_code)
+        resp = requests.get(url,
+                            headers={'If-None-Match': resp.headers['ETag']})
+        self.assertEqual(304, resp.status_code)
+        self.assertEqual(1, cloud.api.not_modified)
+
+    def test_max_limit(self):
+        cloud = self.start_cloud(plans=5, max_limit=2)
+        resp = requests.get(self.conveyor_url(cloud) + '/plans/detail')
+        self.assertEqual(2, len(resp.json()['plans']))
+
+    def test_injected_errors(self):
+        cloud = self.start_cloud(plans=5, error_rate=1.0, error_status=429,
+                                 retry_after=7)
+        cs = self.make_client(cloud, retry_policy=utils.fast_retries(0))
+        e = self.assertRaises(exceptions.ClientException, cs.plans.list)
+        self.assertEqual(429, e.code)
+        self.assertEqual('7', e.retry_after)
+        self.assertEqual(1, cloud.api.errors)
+
+    def test_unix_socket(self):
+        socket_path = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'conveyor.sock')
+        cloud = self.start_cloud(plans=5, socket_path=socket_path)
+        self.assertEqual(unix_socket.url(socket_path), cloud.url)
+        cs = self.make_client(cloud)
+        self.assertEqual(5, len(cs.plans.list()))
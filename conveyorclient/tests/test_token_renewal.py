@@ -0,0 +1,83 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+from conveyorclient.tests import utils
+
+
+class TokenRenewalTest(utils.TestCase):
+
+    def test_renewed_before_expiry(self):
+        cloud = self.fake_cloud(plans=5, token_ttl=2)
+        cs = self.make_client(cloud, token_renewal_margin=600)
+        cs.plans.list()
+        self.assertEqual(1, cloud.tokens_issued)
+        # Renewed half way through the lifetime of the token at the
+        # latest, by the next request.
+        time.sleep(1.1)
+        cs.plans.list()
+        self.assertEqual(2, cloud.tokens_issued)
+        self.assertEqual(2, cloud.requests)
+
+    def test_background_renewal(self):
+        cloud = self.fake_cloud(plans=5, token_ttl=2)
+        cs = self.make_client(cloud, token_renewal_margin=600,
+                              background_token_renewal=True)
+        cs.authenticate()
+        deadline = time.time() + 5
+        while cloud.tokens_issued < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(2, cloud.tokens_issued)
+        cs.client.close()
+        self.assertIsNone(cs.client._renewal_timer)
+
+    def test_not_renewed_early(self):
+        cloud = self.fake_cloud(plans=5)
+        cs = self.make_client(cloud)
+        for _i in range(3):
+            cs.plans.list()
+        self.assertEqual(1, cloud.tokens_issued)
+
+
+class TokenExpiryTest(utils.TestCase):
+
+    def setUp(self):
+        super(TokenExpiryTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=5)
+        self.cs = self.make_client(self.cloud)
+        self.cs.authenticate()
+        # The API now rejects the token with a 401.
+        self.cloud.revoke_tokens()
+
+    def test_reauthenticates(self):
+        self.assertEqual(5, len(self.cs.plans.list()))
+        self.assertEqual(2, self.cloud.tokens_issued)
+        self.assertEqual(2, self.cloud.requests)
+
+    def test_reauthenticates_once_for_all_threads(self):
+        self.cloud.latency[self.cloud.endpoint] = 0.1
+        counts = []
+
+        def list_plans():
+            counts.append(len(self.cs.plans.list()))
+
+        threads = [threading.Thread(target=list_plans) for _i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([5] * 5, counts)
+        self.assertEqual(2, self.cloud.tokens_issued)
@@ -0,0 +1,82 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+from conveyorclient.common import hedging
+from conveyorclient.common import tracing
+from conveyorclient.tests import stub_server
+from conveyorclient.tests import utils
+
+
+class TracingTest(utils.TestCase):
+
+    def setUp(self):
+        super(TracingTest, self).setUp()
+        self.spans = []
+        self._lock = threading.Lock()
+        self.tracer = tracing.Tracer(report=self.report)
+
+    def report(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def named(self, name):
+        return [span for span in self.spans if span.name == name]
+
+    def test_request_span(self):
+        cloud = self.start_cloud(plans=5)
+        cs = self.make_client(cloud, tracer=self.tracer)
+        cs.plans.list()
+        call, = self.named('plans.list')
+        get, = self.named('HTTP GET')
+        self.assertEqual(call.span_id, get.parent_id)
+        self.assertEqual(call.trace_id, get.trace_id)
+        self.assertEqual(200, get.tags['http.status_code'])
+        self.assertTrue(get.tags['request_id'].startswith('req-'))
+        self.assertEqual(['00-%s-%s-01' % (get.trace_id, get.span_id)],
+                         cloud.api.traceparents)
+
+    def test_span_per_reauthenticated_request(self):
+        cloud = self.start_cloud(
+            plans=5, faults=[stub_server.Fault(stub_server.EXPIRE)])
+        cs = self.make_client(cloud, tracer=self.tracer)
+        cs.authenticate()
+        # The token is now older than the fault, it gets a 401 once.
+        cloud.api.restart_faults()
+        cs.plans.list()
+        call, = self.named('plans.list')
+        gets = self.named('HTTP GET')
+        self.assertEqual([401, 200],
+                         [span.tags['http.status_code'] for span in gets])
+        self.assertEqual([call.span_id] * 2,
+                         [span.parent_id for span in gets])
+        self.assertEqual(2, len(set(cloud.api.traceparents)))
+
+    def test_span_per_hedged_request(self):
+        cloud = self.start_cloud(plans=5, latency=0.2)
+        hedger = hedging.Hedger(initial_delay=0.05, min_delay=0.01)
+        cs = self.make_client(cloud, tracer=self.tracer, hedge_gets=hedger)
+        cs.plans.list()
+        # The losing request finishes in the background.
+        deadline = time.time() + 5
+        while len(self.named('HTTP GET')) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        call, = self.named('plans.list')
+        gets = self.named('HTTP GET')
+        self.assertEqual(1, hedger.hedges)
+        self.assertEqual([call.span_id] * 2,
+                         [span.parent_id for span in gets])
+        self.assertEqual(2, len(set(span.span_id for span in gets)))
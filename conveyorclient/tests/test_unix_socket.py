@@ -0,0 +1,111 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import os
+import threading
+
+import fixtures
+from keystoneclient import session
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+from conveyorclient import client
+from conveyorclient.common import unix_socket
+from conveyorclient.tests import fakes
+from conveyorclient.tests import utils
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn,
+                      socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answer with the fakes.FakeCloud of the server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def handle_one_request(self):
+        self.raw_requestline = self.rfile.readline(65537)
+        if not self.raw_requestline or not self.parse_request():
+            self.close_connection = True
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length).decode('utf-8') if length else None
+        resp = self.server.cloud.request(
+            self.command, self.server.base_url + self.path, data=data,
+            headers=dict(self.headers.items()))
+        self.send_response(resp.status_code)
+        for name, value in resp.headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(resp.content)))
+        self.end_headers()
+        self.wfile.write(resp.content)
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixSocketTest(utils.TestCase):
+
+    def setUp(self):
+        super(UnixSocketTest, self).setUp()
+        socket_path = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'conveyor.sock')
+        base_url = unix_socket.url(socket_path)
+        # The fake answers the requests received on the socket, it does
+        # not replace requests.Session.request here.
+        self.cloud = fakes.FakeCloud(plans=5)
+        self.cloud.auth_url = base_url + '/v2.0'
+        self.conveyor_url = '%s/v1/%s' % (base_url, fakes.TENANT_ID)
+        self.cloud.endpoints = collections.OrderedDict(
+            [(fakes.REGION, [self.conveyor_url])])
+        server = _UnixHTTPServer(socket_path, _Handler)
+        server.cloud = self.cloud
+        server.base_url = base_url
+        thread = threading.Thread(target=server.serve_forever,
+                                  kwargs={'poll_interval': 0.05})
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+    def test_url(self):
+        self.assertEqual('http+unix://%2Ftmp%2Fconveyor.sock/v1',
+                         unix_socket.url('/tmp/conveyor.sock', '/v1'))
+
+    def test_authenticate_and_list(self):
+        cs = self.make_client(self.cloud)
+        self.assertEqual(5, len(cs.plans.list()))
+        self.assertEqual(self.conveyor_url, cs.client.management_url)
+        self.assertEqual('1', cs.get_conveyor_api_version_from_endpoint())
+
+    def test_revalidation(self):
+        cs = self.make_client(self.cloud)
+        plan_id = cs.plans.list()[0].plan_id
+        first = cs.plans.get(plan_id)
+        second = cs.plans.get(plan_id)
+        self.assertEqual(1, self.cloud.not_modified)
+        self.assertEqual(first._info, second._info)
+
+    def test_session_client_endpoints(self):
+        # No auth plugin, hence no catalog: the version comes from the
+        # endpoints given.
+        cs = client.SessionClient(session=session.Session(),
+                                  endpoints=[self.conveyor_url])
+        self.assertEqual('1', cs.get_conveyor_api_version_from_endpoint())
+        resp, body = cs.get('/plans/detail', authenticated=False)
+        self.assertEqual(5, len(body['plans']))
@@ -0,0 +1,69 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fixtures
+import testtools
+
+from conveyorclient.common import retry
+from conveyorclient.tests import fakes
+from conveyorclient.tests import stub_server
+from conveyorclient.v1 import client
+
+
+def fast_retries(retries):
+    """Return a policy making retries retries, a few ms apart."""
+    return retry.RetryPolicy(max_attempts=retries + 1, base_delay=0.01,
+                             max_delay=0.02)
+
+
+class FakeClock(object):
+    """A clock moved forward by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCase(testtools.TestCase):
+    """Base of the tests of the clients."""
+
+    def setUp(self):
+        super(TestCase, self).setUp()
+        # Keep the uuid caches of the managers out of the home directory.
+        cache_dir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.EnvironmentVariable(
+            'V2VCLIENT_UUID_CACHE_DIR', cache_dir))
+
+    def fake_cloud(self, **kwargs):
+        """Answer the requests of the clients with a fakes.FakeCloud."""
+        return self.useFixture(fakes.FakeCloud(**kwargs))
+
+    def start_cloud(self, **kwargs):
+        """Start a stub_server.StubCloud, stopped at the end of the test."""
+        cloud = stub_server.StubCloud(**kwargs).start()
+        self.addCleanup(cloud.stop)
+        return cloud
+
+    def conveyor_url(self, cloud):
+        """Return the conveyor URL of the first region of a StubCloud."""
+        return cloud.conveyor_urls()[stub_server.REGION]
+
+    def make_client(self, cloud, **kwargs):
+        """Return a v1 client of cloud, closed at the end of the test."""
+        cs = client.Client('user', 'password', 'tenant', cloud.auth_url,
+                           **kwargs)
+        self.addCleanup(cs.client.close)
+        return cs
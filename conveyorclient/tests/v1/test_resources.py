@@ -0,0 +1,144 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+from conveyorclient import exceptions
+from conveyorclient.tests import fakes
+from conveyorclient.tests import utils
+from conveyorclient.v1 import resources
+
+
+class ResourceTypesCacheTest(utils.TestCase):
+
+    def setUp(self):
+        super(ResourceTypesCacheTest, self).setUp()
+        resources._RESOURCE_TYPES_CACHE.clear()
+        self.addCleanup(resources._RESOURCE_TYPES_CACHE.clear)
+        self.cloud = self.fake_cloud()
+
+    def type_list(self, cs, **kwargs):
+        return [t.type for t in cs.resources.resource_type_list(**kwargs)]
+
+    def test_process_cache(self):
+        cs = self.make_client(self.cloud)
+        self.assertEqual(list(fakes.RESOURCE_TYPES), self.type_list(cs))
+        self.assertEqual(list(fakes.RESOURCE_TYPES), self.type_list(cs))
+        self.assertEqual(1, self.cloud.requests)
+
+    def test_shared_by_the_clients(self):
+        self.type_list(self.make_client(self.cloud))
+        self.type_list(self.make_client(self.cloud))
+        self.assertEqual(1, self.cloud.requests)
+
+    def test_disk_cache(self):
+        self.type_list(self.make_client(self.cloud))
+        # As in a new process.
+        resources._RESOURCE_TYPES_CACHE.clear()
+        cs = self.make_client(self.cloud)
+        self.assertEqual(list(fakes.RESOURCE_TYPES), self.type_list(cs))
+        self.assertEqual(1, self.cloud.requests)
+
+    def test_refresh(self):
+        cs = self.make_client(self.cloud)
+        self.type_list(cs)
+        self.type_list(cs, refresh=True)
+        self.assertEqual(2, self.cloud.requests)
+        self.type_list(cs)
+        self.assertEqual(2, self.cloud.requests)
+
+    def test_expiry(self):
+        cs = self.make_client(self.cloud, resource_types_ttl=0.2)
+        self.type_list(cs)
+        time.sleep(0.3)
+        self.type_list(cs)
+        self.assertEqual(2, self.cloud.requests)
+
+    def test_disabled(self):
+        cs = self.make_client(self.cloud, resource_types_ttl=0)
+        for _i in range(2):
+            self.type_list(cs)
+        self.assertEqual(2, self.cloud.requests)
+
+
+class LookupCacheTest(utils.TestCase):
+
+    def setUp(self):
+        super(LookupCacheTest, self).setUp()
+        self.cloud = self.fake_cloud()
+        self.cs = self.make_client(self.cloud)
+        self.plan_id = list(self.cloud.plans)[0]
+
+    def zones(self, **kwargs):
+        return self.cs.resources.list_clone_resources_attribute(
+            self.plan_id, 'availability_zone', **kwargs)
+
+    def test_zones_cached(self):
+        for _i in range(2):
+            self.assertEqual(list(fakes.ZONES),
+                             self.cs.resources.list_all_availability_zones())
+        self.assertEqual(1, self.cloud.requests)
+        self.cs.resources.list_all_availability_zones(refresh=True)
+        self.assertEqual(2, self.cloud.requests)
+
+    def test_attributes_cached(self):
+        for _i in range(2):
+            self.assertEqual(list(fakes.ZONES), self.zones())
+        self.assertEqual(1, self.cloud.requests)
+        self.zones(refresh=True)
+        self.assertEqual(2, self.cloud.requests)
+
+    def test_attributes_cached_per_plan(self):
+        self.zones()
+        self.cs.resources.list_clone_resources_attribute(
+            list(self.cloud.plans)[1], 'availability_zone')
+        self.assertEqual(2, self.cloud.requests)
+
+    def test_disabled(self):
+        cs = self.make_client(self.cloud, availability_zones_ttl=0)
+        for _i in range(2):
+            cs.resources.list_all_availability_zones()
+        self.assertEqual(2, self.cloud.requests)
+
+    def assertInvalidated(self, action):
+        self.zones()
+        action()
+        requests = self.cloud.requests
+        self.zones()
+        self.assertEqual(requests + 1, self.cloud.requests)
+
+    def test_invalidated_by_clone(self):
+        self.assertInvalidated(lambda: self.cs.clones.clone(
+            self.plan_id, {'az01': 'az02'}, []))
+
+    def test_invalidated_by_migrate(self):
+        self.assertInvalidated(lambda: self.cs.migrates.migrate(
+            self.plan_id, 'az02'))
+
+    def test_invalidated_by_delete(self):
+        self.assertInvalidated(lambda: self.cs.plans.delete(self.plan_id))
+
+    def test_invalidated_by_failed_action(self):
+        self.cloud.script.extend([None, 500])
+        self.assertInvalidated(lambda: self.assertRaises(
+            exceptions.ClientException, self.cs.migrates.migrate,
+            self.plan_id, 'az02'))
+
+    def test_returns_a_copy(self):
+        self.zones().append('changed')
+        self.cs.resources.list_all_availability_zones().append('changed')
+        self.assertEqual(list(fakes.ZONES), self.zones())
+        self.assertEqual(list(fakes.ZONES),
+                         self.cs.resources.list_all_availability_zones())
+        self.assertEqual(2, self.cloud.requests)
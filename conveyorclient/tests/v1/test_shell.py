@@ -0,0 +1,121 @@
+# Copyright (c) 2017 Huawei, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import argparse
+import re
+
+import fixtures
+import six
+
+from conveyorclient import shell as conveyor_shell
+from conveyorclient.tests import fakes
+from conveyorclient.tests import utils
+from conveyorclient.v1 import resources
+from conveyorclient.v1 import shell
+
+
+class ResourceTypeListTest(utils.TestCase):
+
+    def setUp(self):
+        super(ResourceTypeListTest, self).setUp()
+        resources._RESOURCE_TYPES_CACHE.clear()
+        self.addCleanup(resources._RESOURCE_TYPES_CACHE.clear)
+        self.cloud = self.fake_cloud()
+        self.cs = self.make_client(self.cloud)
+        self.stdout = self.useFixture(fixtures.MonkeyPatch(
+            'sys.stdout', six.StringIO())).new_value
+
+    def test_cached(self):
+        for _i in range(2):
+            shell.do_resource_type_list(
+                self.cs, argparse.Namespace(refresh=False))
+        self.assertEqual(1, self.cloud.requests)
+        self.assertIn(fakes.RESOURCE_TYPES[0], self.stdout.getvalue())
+
+    def test_refresh(self):
+        for _i in range(2):
+            shell.do_resource_type_list(
+                self.cs, argparse.Namespace(refresh=True))
+        self.assertEqual(2, self.cloud.requests)
+
+    def test_known_type(self):
+        self.cs.resources.resource_type_list()
+        self.assertEqual(
+            list(fakes.RESOURCE_TYPES),
+            shell._get_resource_type_list(
+                self.cs, ['obj_type=OS::Nova::Server,obj_id=server'],
+                'obj_type'))
+        self.assertEqual(1, self.cloud.requests)
+
+    def test_unknown_type_refreshes(self):
+        self.cs.resources.resource_type_list()
+        shell._get_resource_type_list(
+            self.cs, ['obj_type=OS::Nova::Server,obj_id=server',
+                      'obj_type=OS::New::Type,obj_id=new'], 'obj_type')
+        self.assertEqual(2, self.cloud.requests)
+
+
+class PlanListAllRegionsTest(utils.TestCase):
+
+    def setUp(self):
+        super(PlanListAllRegionsTest, self).setUp()
+        self.cloud = self.fake_cloud(plans=3,
+                                     regions=('RegionOne', 'RegionTwo'))
+
+    def run_command(self, *args):
+        stdout = self.useFixture(fixtures.MonkeyPatch(
+            'sys.stdout', six.StringIO())).new_value
+        conveyor_shell.OpenStackConveyorShell().main(
+            ['--os-auth-url', self.cloud.auth_url, '--os-username', 'user',
+             '--os-password', 'password', '--os-tenant-name', 'tenant'] +
+            list(args))
+        return stdout.getvalue()
+
+    def plan_names(self, out):
+        return re.findall(r'(?m)^\| (Region\w+) +\| \S+ \| (plan-\d+)',
+                          out)
+
+    def test_newest_first(self):
+        out = self.run_command('plan-list', '--all-regions')
+        self.assertEqual([('RegionOne', 'plan-000002'),
+                          ('RegionTwo', 'plan-000002'),
+                          ('RegionOne', 'plan-000001'),
+                          ('RegionTwo', 'plan-000001'),
+                          ('RegionOne', 'plan-000000'),
+                          ('RegionTwo', 'plan-000000')],
+                         self.plan_names(out))
+
+    def test_sort_dir(self):
+        out = self.run_command('plan-list', '--all-regions',
+                               '--sort-dir', 'asc')
+        self.assertEqual(['plan-000000', 'plan-000000', 'plan-000001',
+                          'plan-000001', 'plan-000002', 'plan-000002'],
+                         [name for _region, name in self.plan_names(out)])
+
+    def test_missing_sort_key_last(self):
+        plan_ids = list(self.cloud.plans)
+        self.cloud.plans[plan_ids[1]]['expired_at'] = '2017-06-01T00:00:00'
+        for sort_dir in ('asc', 'desc'):
+            out = self.run_command('plan-list', '--all-regions',
+                                   '--sort-key', 'expired_at',
+                                   '--sort-dir', sort_dir)
+            self.assertEqual(['plan-000001'] * 2,
+                             [name for _region, name
+                              in self.plan_names(out)][:2])
+        # The plans missing the key were not loaded again.
+        self.assertEqual(4, self.cloud.count(method='GET'))
+
+    def test_timings(self):
+        out = self.run_command('--timings', 'plan-list', '--all-regions')
+        self.assertEqual(2, len(re.findall(r'\| GET /plans/detail', out)))
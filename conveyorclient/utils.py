@@ -169,7 +169,7 @@ def _print(pt, order):
         print(encodeutils.safe_encode(pt.get_string(sortby=order)))
 
 
-def print_list(objs, fields, formatters={}, order_by=None):
+def print_list(objs, fields, formatters={}, order_by=None, sort=True):
     mixed_case_fields = ['serverId']
     pt = prettytable.PrettyTable([f for f in fields], caching=False)
     pt.aligns = ['l' for f in fields]
@@ -191,7 +191,7 @@ def print_list(objs, fields, formatters={}, order_by=None):
                 row.append(data)
         pt.add_row(row)
 
-    if order_by is None:
+    if order_by is None and sort:
         order_by = fields[0]
     _print(pt, order_by)
 
@@ -13,7 +13,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import time
+
 from conveyorclient import client
+from conveyorclient.common import concurrency
+from conveyorclient.common import deadline
+from conveyorclient.common import http_cache
+from conveyorclient.common import metrics
+from conveyorclient.common import tracing
 from conveyorclient.v1 import clones
 from conveyorclient.v1 import configuration
 from conveyorclient.v1 import migrates
@@ -21,6 +29,9 @@ from conveyorclient.v1 import plans
 from conveyorclient.v1 import resources
 
 DEFAULT_CONVEYOR_SERVICE_TYPE = 'conveyor'
+DEFAULT_RESOURCE_TYPES_TTL = 3600
+DEFAULT_AVAILABILITY_ZONES_TTL = 60
+DEFAULT_PLAN_ATTRIBUTES_TTL = 60
 
 
 class Client(object):
@@ -36,6 +47,42 @@ class Client(object):
         >>> client.volumes.list()
         ...
 
+    A client may be shared by several threads. Authentication is
+    serialized: when the token is rejected only one thread fetches a new
+    one while the others wait for it and then reuse it.
+
+    ``rate_limiter`` caps the requests sent by all the managers: either a
+    rate in requests per second, or a
+    :class:`conveyorclient.common.rate_limit.RateLimiter` to set a burst,
+    limit path classes (eg: 'resources') or share a quota between clients.
+
+    ``hedge_gets=True`` sends a second GET to another endpoint of the
+    catalog (or of ``endpoints``) when the first one is slower than usual,
+    and uses the first answer. Pass a
+    :class:`conveyorclient.common.hedging.Hedger` to tune it.
+
+    ``load_balancing='round_robin'`` (or ``'least_outstanding'``) spreads
+    the requests over all these endpoints, ejecting for a while those that
+    keep failing. Pass a
+    :class:`conveyorclient.common.balancer.EndpointPool` to tune it.
+
+    ``cassette``, a :class:`conveyorclient.common.cassette.Cassette`,
+    records the HTTP exchanges of the client to a file, or replays them
+    offline.
+
+    The calls of the managers and the HTTP requests are counted and timed,
+    see :meth:`get_metrics`. ``metrics=False`` disables it, and a
+    :class:`conveyorclient.common.metrics.Registry` may be shared between
+    clients.
+
+    ``tracer``, a :class:`conveyorclient.common.tracing.Tracer` (or
+    :class:`~conveyorclient.common.tracing.OSProfilerTracer`), opens a span
+    around every call of the managers and every HTTP request, and sends
+    the trace context along with the requests.
+
+    ``request_log`` logs the HTTP requests as JSON lines, with sampling
+    and truncated bodies: a file name, or a
+    :class:`conveyorclient.common.request_log.RequestLog` to tune it.
     """
 
     def __init__(self, username=None, api_key=None, project_id=None,
@@ -45,24 +92,44 @@ class Client(object):
                  service_type=DEFAULT_CONVEYOR_SERVICE_TYPE, service_name=None,
                  retries=None, http_log_debug=False,
                  cacert=None, auth_system='keystone', auth_plugin=None,
-                 session=None, **kwargs):
+                 session=None,
+                 resource_types_ttl=DEFAULT_RESOURCE_TYPES_TTL,
+                 availability_zones_ttl=DEFAULT_AVAILABILITY_ZONES_TTL,
+                 plan_attributes_ttl=DEFAULT_PLAN_ATTRIBUTES_TTL,
+                 response_cache_size=http_cache.DEFAULT_MAX_ENTRIES,
+                 coalesce_requests=False,
+                 token_renewal_margin=client.DEFAULT_TOKEN_RENEWAL_MARGIN,
+                 background_token_renewal=False,
+                 retry_policy=None, timings=False, circuit_breakers=None,
+                 request_deadline=None, rate_limiter=None,
+                 max_concurrency=concurrency.DEFAULT_MAX_LIMIT,
+                 hedge_gets=None, endpoints=None, load_balancing=None,
+                 cassette=None, metrics=True, tracer=None, request_log=None,
+                 **kwargs):
         # FIXME(comstud): Rename the api_key argument above when we
         # know it's not being used as keyword argument
         password = api_key
 
-        # extensions
-        self.clones = clones.ClonesServiceManager(self)
-        self.resources = resources.ResourceManager(self)
-        self.plans = plans.PlanManager(self)
-        self.migrates = migrates.MigratesServiceManager(self)
-        self.configs = configuration.ConfigurationServiceManager(self)
+        # Seconds the read-only lookups are cached for, <= 0 disables
+        # caching.
+        self.resource_types_ttl = resource_types_ttl
+        self.availability_zones_ttl = availability_zones_ttl
+        self.plan_attributes_ttl = plan_attributes_ttl
 
-        # Add in any extensions...
-        if extensions:
-            for extension in extensions:
-                if extension.manager_class:
-                    setattr(self, extension.name,
-                            extension.manager_class(self))
+        # Bulk operations adapt their concurrency up to max_concurrency.
+        self.bulk_executor = concurrency.BulkExecutor(
+            concurrency.AIMDLimiter(
+                initial=min(concurrency.DEFAULT_INITIAL_LIMIT,
+                            max_concurrency),
+                max_limit=max_concurrency))
+
+        # Counters and latency histograms of the calls, see get_metrics().
+        self.metrics = client._make_metrics(metrics)
+        # Spans of the calls and of their requests, see tracing.Tracer.
+        self.tracer = tracer
+
+        self.extensions = extensions
+        self._init_managers()
 
         self.client = client._construct_http_client(
             username=username,
@@ -84,8 +151,48 @@ class Client(object):
             auth_system=auth_system,
             auth_plugin=auth_plugin,
             session=session,
+            response_cache_size=response_cache_size,
+            coalesce_requests=coalesce_requests,
+            token_renewal_margin=token_renewal_margin,
+            background_token_renewal=background_token_renewal,
+            retry_policy=retry_policy,
+            timings=timings,
+            circuit_breakers=circuit_breakers,
+            request_deadline=request_deadline,
+            rate_limiter=rate_limiter,
+            hedge_gets=hedge_gets,
+            endpoints=endpoints,
+            load_balancing=load_balancing,
+            cassette=cassette,
+            metrics=self.metrics,
+            tracer=tracer,
+            request_log=request_log,
             **kwargs)
 
+    def _init_managers(self):
+        # extensions
+        self.clones = clones.ClonesServiceManager(self)
+        self.resources = resources.ResourceManager(self)
+        self.plans = plans.PlanManager(self)
+        self.migrates = migrates.MigratesServiceManager(self)
+        self.configs = configuration.ConfigurationServiceManager(self)
+
+        # Add in any extensions...
+        if self.extensions:
+            for extension in self.extensions:
+                if extension.manager_class:
+                    setattr(self, extension.name,
+                            extension.manager_class(self))
+
+        names = ['clones', 'resources', 'plans', 'migrates', 'configs']
+        names.extend(extension.name for extension in self.extensions or ()
+                     if extension.manager_class)
+        for name in names:
+            if self.metrics is not None:
+                metrics.instrument(getattr(self, name), name, self.metrics)
+            if self.tracer is not None:
+                tracing.instrument(getattr(self, name), name, self.tracer)
+
     def authenticate(self):
         """
         Authenticate against the server.
@@ -98,5 +205,126 @@ class Client(object):
         """
         self.client.authenticate()
 
+    def deadline(self, budget):
+        """
+        Bound the calls made in a ``with`` block to budget seconds overall.
+
+        Retries, backoff sleeps and status polling all count against the
+        budget, each request gets the time left as its timeout, and
+        :exc:`exceptions.DeadlineExceeded` is raised once it is spent::
+
+            with cs.deadline(60):
+                cs.clones.clone(plan_id, destination, resources)
+
+        ``Client(request_deadline=...)`` sets such a budget for every
+        single API call instead.
+        """
+        return deadline.scope(budget)
+
+    def bulk(self, fn, items):
+        """
+        Call fn(item) for every item, concurrently.
+
+        The concurrency grows while the API answers quickly and is cut on
+        5xx, 413 or 429 answers, connection errors or rising latency. It
+        is shared by all the bulk operations of the client.
+
+        Returns a list of (item, result, exception) tuples in the order of
+        items.
+        """
+        return self.bulk_executor.map(fn, items)
+
+    def get_regions(self):
+        """
+        Return the regions of the service catalog having a conveyor
+        endpoint.
+        """
+        return self.client.get_regions()
+
+    def for_region(self, region_name):
+        """
+        Return a client of the conveyor API of another region.
+
+        It reuses the authentication of this client, and its options.
+        """
+        region_client = copy.copy(self)
+        region_client.client = self.client.for_region(region_name)
+        region_client._init_managers()
+        return region_client
+
+    def fan_out(self, fn, regions=None):
+        """
+        Call fn(region_client) for every region, concurrently.
+
+        Authenticates once and gets the conveyor endpoint of each region
+        from the same service catalog.
+
+        :param regions: the regions to query, all the regions of the
+                        catalog having a conveyor endpoint by default.
+        :rtype: list of (region, result, exception, seconds) tuples,
+                sorted by region.
+        """
+        if regions is None:
+            regions = self.get_regions()
+
+        def call(region):
+            start = time.time()
+            try:
+                result = fn(self.for_region(region))
+            except Exception as e:
+                return None, e, time.time() - start
+            return result, None, time.time() - start
+
+        # Not self.bulk(): fn may run bulk operations, which must not wait
+        # for the concurrency slots held by the regions.
+        return [(region,) + outcome for region, outcome, _e
+                in concurrency.map_threads(call, sorted(regions))]
+
+    def get_concurrency(self):
+        """
+        Return the current concurrency limit of the bulk operations and
+        its recent changes.
+        """
+        return self.bulk_executor.limiter.snapshot()
+
+    def get_timings(self):
+        return self.client.get_timings()
+
+    def get_circuit_breakers(self):
+        """
+        Return the state of the circuit breaker of every endpoint used so
+        far, or None when circuit breakers are disabled.
+
+        Enable them with ``Client(circuit_breakers=True)``, or pass a
+        :class:`conveyorclient.common.circuit_breaker.CircuitBreakers` to
+        tune the thresholds.
+        """
+        if self.client.circuit_breakers is None:
+            return None
+        return self.client.circuit_breakers.snapshot()
+
+    def get_metrics(self):
+        """
+        Return the metrics recorded so far, or None when they are disabled
+        with ``Client(metrics=False)``.
+
+        See :meth:`conveyorclient.common.metrics.Registry.snapshot`.
+        """
+        if self.metrics is None:
+            return None
+        return self.metrics.snapshot()
+
+    def get_endpoints_state(self):
+        """
+        Return the load balancing state of every endpoint used so far, or
+        None when load balancing is disabled.
+        """
+        if self.client.balancer is None:
+            return None
+        return self.client.balancer.snapshot()
+
+    def reset_timings(self):
+        self.client.reset_timings()
+
     def get_conveyor_api_version_from_endpoint(self):
         return self.client.get_conveyor_api_version_from_endpoint()
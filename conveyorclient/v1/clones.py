@@ -43,6 +43,8 @@ class ClonesServiceManager(base.ManagerWithFind):
     Manage :class:`Clones` resources.
     """
     resource_class = ClonesService
+    api_methods = ('list', 'export_clone_template', 'clone', 'clone_many',
+                   'export_template_and_clone')
 
     def list(self):
         pass
@@ -79,6 +81,14 @@ class ClonesServiceManager(base.ManagerWithFind):
                                 'copy_data': copy_data
                             })
 
+    def clone_many(self, clones):
+        """
+        Clone several plans concurrently.
+        :param clones: dicts of the keyword arguments of :meth:`clone`.
+        :rtype: list of (kwargs, result, exception) tuples.
+        """
+        return self.api.bulk(lambda kwargs: self.clone(**kwargs), clones)
+
     def _action(self, action, plan, info=None, **kwargs):
         """
         Perform a plan "action" export_clone_template/clone etc.
@@ -86,7 +96,12 @@ class ClonesServiceManager(base.ManagerWithFind):
         body = {action: info}
         self.run_hooks('modify_body_for_action', body, **kwargs)
         url = '/clones/%s/action' % base.getid(plan)
-        return self.api.client.post(url, body=body)
+        try:
+            return self.api.client.post(url, body=body)
+        finally:
+            # NOTE: the action changes what the plan's resources look like,
+            #       so cached lookups about the plan are stale now.
+            self.api.resources.invalidate_plan_cache(base.getid(plan))
 
     def export_template_and_clone(self, plan, destination,
                                   resources={},
@@ -26,6 +26,7 @@ class ConfigurationServiceManager(base.ManagerWithFind):
     Manage :class:`Clones` resources.
     """
     resource_class = ConfigurationService
+    api_methods = ('list', 'update_configs', 'register_configs')
 
     def list(self):
         pass
@@ -34,6 +34,7 @@ class ListExtResource(base.Resource):
 
 class ListExtManager(base.Manager):
     resource_class = ListExtResource
+    api_methods = ('show_all',)
 
     def show_all(self):
         return self._list("/extensions", 'extensions')
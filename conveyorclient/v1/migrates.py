@@ -34,6 +34,7 @@ class MigratesServiceManager(base.ManagerWithFind):
     Manage :class:`Clones` resources.
     """
     resource_class = MigratesService
+    api_methods = ('list', 'export_migrate_template', 'migrate')
 
     def list(self):
         pass
@@ -61,4 +62,9 @@ class MigratesServiceManager(base.ManagerWithFind):
         body = {action: info}
         self.run_hooks('modify_body_for_action', body, **kwargs)
         url = '/migrates/%s/action' % base.getid(plan)
-        return self.api.client.post(url, body=body)
+        try:
+            return self.api.client.post(url, body=body)
+        finally:
+            # NOTE: the action changes what the plan's resources look like,
+            #       so cached lookups about the plan are stale now.
+            self.api.resources.invalidate_plan_cache(base.getid(plan))
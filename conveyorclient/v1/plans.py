@@ -35,6 +35,10 @@ class PlanManager(base.ManagerWithFind):
     Manage :class:`Resource` resources.
     """
     resource_class = Plan
+    api_methods = ('get', 'delete', 'delete_many', 'update', 'list', 'create',
+                   'create_plan_by_template', 'download_template',
+                   'reset_plan_state', 'force_delete_plan',
+                   'reset_plans_state', 'force_delete_plans')
 
     def get(self, plan):
         """
@@ -49,7 +53,18 @@ class PlanManager(base.ManagerWithFind):
         Delete a plan.
         :param plan: The :class:`Plan` to delete.
         """
-        return self._delete("/plans/%s" % plan)
+        try:
+            return self._delete("/plans/%s" % plan)
+        finally:
+            self.api.resources.invalidate_plan_cache(base.getid(plan))
+
+    def delete_many(self, plans):
+        """
+        Delete several plans concurrently.
+        :param plans: The plans to delete.
+        :rtype: list of (plan, result, exception) tuples.
+        """
+        return self.api.bulk(self.delete, plans)
 
     def update(self, plan, values):
         """
@@ -61,7 +76,10 @@ class PlanManager(base.ManagerWithFind):
             return
 
         body = {"plan": values}
-        self._update("/plans/%s" % plan, body)
+        try:
+            self._update("/plans/%s" % plan, body)
+        finally:
+            self.api.resources.invalidate_plan_cache(base.getid(plan))
 
     def list(self, search_opts=None, marker=None, limit=None, sort_key=None,
              sort_dir=None):
@@ -146,6 +164,21 @@ class PlanManager(base.ManagerWithFind):
     def force_delete_plan(self, plan):
         self._action('force_delete-plan', plan, {'plan_id': plan})
 
+    def reset_plans_state(self, plans, state):
+        """
+        Reset the state of several plans concurrently.
+        :rtype: list of (plan, result, exception) tuples.
+        """
+        return self.api.bulk(lambda plan: self.reset_plan_state(plan, state),
+                             plans)
+
+    def force_delete_plans(self, plans):
+        """
+        Force delete several plans concurrently.
+        :rtype: list of (plan, result, exception) tuples.
+        """
+        return self.api.bulk(self.force_delete_plan, plans)
+
     def _action(self, action, plan, info=None, **kwargs):
         """
         Perform a plan "action" -- download_templdate etc.
@@ -11,6 +11,7 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import os
 import uuid
 
 try:
@@ -19,6 +20,12 @@ except ImportError:
     from urllib.parse import urlencode
 
 from conveyorclient import base
+from conveyorclient.common import cache
+
+# NOTE: shared by every ResourceManager of the process and keyed by the
+#       conveyor endpoint, so that bulk scripts creating many clients only
+#       fetch the resource types once.
+_RESOURCE_TYPES_CACHE = cache.TTLCache()
 
 
 class Resource(base.Resource):
@@ -43,6 +50,24 @@ class ResourceManager(base.ManagerWithFind):
     Manage :class:`Resource` resources.
     """
     resource_class = Resource
+    api_methods = ('get_resource_detail', 'get_resource_details', 'list',
+                   'resource_type_list', 'build_resources_topo',
+                   'list_clone_resources_attribute',
+                   'list_all_availability_zones', 'delete_cloned_resources')
+
+    def __init__(self, api):
+        super(ResourceManager, self).__init__(api)
+        self._zones_cache = cache.TTLCache(
+            getattr(api, 'availability_zones_ttl', None))
+        self._plan_attributes_cache = cache.TTLCache(
+            getattr(api, 'plan_attributes_ttl', None))
+
+    def invalidate_plan_cache(self, plan_id):
+        """
+        Forget the cached lookups of a plan, eg: after it was cloned.
+        :param plan_id: The id of the plan.
+        """
+        self._plan_attributes_cache.remove_if(lambda k: k[0] == plan_id)
 
     def get_resource_detail(self, res_type, res_id):
         """
@@ -56,6 +81,15 @@ class ResourceManager(base.ManagerWithFind):
                                           body=body)
         return body['resource']
 
+    def get_resource_details(self, resources):
+        """
+        Get the details of several resources concurrently.
+        :param resources: (res_type, res_id) tuples.
+        :rtype: list of ((res_type, res_id), detail, exception) tuples.
+        """
+        return self.api.bulk(lambda res: self.get_resource_detail(*res),
+                             resources)
+
     def list(self, search_opts):
         """
         Get a list of resources with a specified type. Type is required in
@@ -72,12 +106,40 @@ class ResourceManager(base.ManagerWithFind):
         query_string = "?%s" % urlencode(qparams) if qparams else ""
         return self._list("/resources/detail%s" % query_string, "resources")
 
-    def resource_type_list(self):
+    def resource_type_list(self, refresh=False):
         """
         Get the types of resources which can be cloned or migrated.
+
+        The types rarely change, so they are cached per endpoint, in process
+        and on disk, for ``resource_types_ttl`` seconds (see
+        :class:`conveyorclient.v1.client.Client`).
+        :param refresh: Ignore the cached types and fetch them again.
         :rtype: :class:`ResourceType`
         """
-        return self._list("/resources/types", "types", obj_class=ResourceType)
+        ttl = getattr(self.api, 'resource_types_ttl', None)
+        if not ttl or ttl <= 0:
+            return self._list("/resources/types", "types",
+                              obj_class=ResourceType)
+
+        endpoint = self.api.client.get_endpoint()
+        path = os.path.join(self._get_cache_dir(endpoint),
+                            'resource-types-cache.json')
+        types = None
+        if not refresh:
+            types = _RESOURCE_TYPES_CACHE.get(endpoint)
+            if types is None:
+                types, remaining = cache.load_json_cache(path)
+                if types is not None:
+                    _RESOURCE_TYPES_CACHE.set(endpoint, types,
+                                              ttl=min(ttl, remaining))
+
+        if types is None:
+            types = [t._info for t in self._list("/resources/types", "types",
+                                                 obj_class=ResourceType)]
+            _RESOURCE_TYPES_CACHE.set(endpoint, types, ttl=ttl)
+            cache.save_json_cache(path, types, ttl)
+
+        return [ResourceType(self, t, loaded=True) for t in types]
 
     def build_resources_topo(self, plan_id,
                              az_map, search_opt=None):
@@ -88,22 +150,56 @@ class ResourceManager(base.ManagerWithFind):
                                             body=body)
         return result['topo']
 
-    def list_clone_resources_attribute(self, plan_id, attribute_name):
+    def list_clone_resources_attribute(self, plan_id, attribute_name,
+                                       refresh=False):
+        """
+        Get the values of an attribute of the resources in a plan.
+
+        Results are cached per plan for ``plan_attributes_ttl`` seconds and
+        dropped when the plan is cloned or migrated by this client. Every
+        call returns a list of its own.
+        :param refresh: Ignore the cached values and fetch them again.
+        """
+        key = (plan_id, attribute_name)
+        if not refresh:
+            attribute_list = self._plan_attributes_cache.get(key)
+            if attribute_list is not None:
+                return list(attribute_list)
+
         body = {"list-clone_resources_attribute":
                 {"plan_id": plan_id,
                  "attribute_name": attribute_name}}
         resp, result = self.api.client.post("/resources/%s/action" % plan_id,
                                             body=body)
-        return result['attribute_list']
+        attribute_list = result['attribute_list']
+        self._plan_attributes_cache.set(key, list(attribute_list))
+        return attribute_list
+
+    def list_all_availability_zones(self, refresh=False):
+        """
+        Get all the availability zones.
+
+        Results are cached for ``availability_zones_ttl`` seconds. Every
+        call returns a list of its own.
+        :param refresh: Ignore the cached zones and fetch them again.
+        """
+        if not refresh:
+            zones = self._zones_cache.get('availability_zones')
+            if zones is not None:
+                return list(zones)
 
-    def list_all_availability_zones(self):
         body = {"list-all_availability_zones": {}}
         resp, result = \
             self.api.client.post("/resources/%s/action" % uuid.uuid4(),
                                  body=body)
-        return result['availability_zone_list']
+        zones = result['availability_zone_list']
+        self._zones_cache.set('availability_zones', list(zones))
+        return zones
 
     def delete_cloned_resources(self, plan_id):
         body = {"delete-cloned_resource": {'plan_id': plan_id}}
-        self.api.client.post("/resources/%s/action" % plan_id,
-                             body=body)
+        try:
+            self.api.client.post("/resources/%s/action" % plan_id,
+                                 body=body)
+        finally:
+            self.invalidate_plan_cache(plan_id)
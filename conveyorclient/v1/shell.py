@@ -16,13 +16,15 @@ from __future__ import print_function
 
 import argparse
 import os
+import random
 import re
 import six
 import sys
-import time
 
 from conveyorclient.common import constants
+from conveyorclient.common import deadline
 from conveyorclient.common.gettextutils import _
+from conveyorclient.common import loadgen
 from conveyorclient.common import template_utils
 from conveyorclient import exceptions
 from conveyorclient import utils
@@ -31,8 +33,12 @@ DEFAULT_V2V_SERVICE_TYPE = 'conveyor'
 
 
 def _poll_for_status(poll_fn, obj_id, action, final_ok_states,
-                     poll_period=5, show_progress=True):
-    """Blocks while an action occurs. Periodically shows progress."""
+                     poll_period=5, show_progress=True, timeout=None):
+    """Blocks while an action occurs. Periodically shows progress.
+
+    Gives up with DeadlineExceeded after timeout seconds, or when the
+    deadline of the command (--deadline) is reached.
+    """
     def print_progress(progress):
         if show_progress:
             msg = ('\rInstance %(action)s... %(progress)s%% complete'
@@ -44,20 +50,21 @@ def _poll_for_status(poll_fn, obj_id, action, final_ok_states,
         sys.stdout.flush()
 
     print()
-    while True:
-        obj = poll_fn(obj_id)
-        status = obj.status.lower()
-        progress = getattr(obj, 'progress', None) or 0
-        if status in final_ok_states:
-            print_progress(100)
-            print("\nFinished")
-            break
-        elif status == "error":
-            print("\nError %(action)s instance" % {'action': action})
-            break
-        else:
-            print_progress(progress)
-            time.sleep(poll_period)
+    with deadline.scope(timeout):
+        while True:
+            obj = poll_fn(obj_id)
+            status = obj.status.lower()
+            progress = getattr(obj, 'progress', None) or 0
+            if status in final_ok_states:
+                print_progress(100)
+                print("\nFinished")
+                break
+            elif status == "error":
+                print("\nError %(action)s instance" % {'action': action})
+                break
+            else:
+                print_progress(progress)
+                deadline.sleep(poll_period)
 
 
 def _print_resource(resource):
@@ -169,8 +176,8 @@ def do_clone(cs, args):
                 "<src_az>:<dst_az>[,<src_az>:<dst_az>]")
         dst_dict[key_value[0]] = key_value[1]
     if args.clone_resources:
-        res_types = cs.resources.resource_type_list()
-        res_type_list = [t.type for t in res_types]
+        res_type_list = _get_resource_type_list(cs, args.clone_resources,
+                                                'type')
         clone_resources = \
             _extract_clone_resources_argument(args.clone_resources,
                                               res_type_list)
@@ -217,10 +224,15 @@ def do_endpoints(cs, args):
         utils.print_dict(e['endpoints'][0], e['name'])
 
 
+@utils.arg(
+    '--refresh',
+    action='store_true',
+    default=False,
+    help='Ignore the locally cached types and fetch them from the server.')
 @utils.service_type(DEFAULT_V2V_SERVICE_TYPE)
 def do_resource_type_list(cs, args):
     """Get the types of resources which can be cloned or migrated."""
-    types = cs.resources.resource_type_list()
+    types = cs.resources.resource_type_list(refresh=args.refresh)
     utils.print_list(types, ["type"])
 
 
@@ -383,6 +395,20 @@ def do_list_plan_zone(cs, args):
          'option of Conveyor API, limit "osapi_max_limit" will be used '
          'instead.'
 )
+@utils.arg(
+    '--region',
+    dest='regions',
+    metavar='<region-name>',
+    action='append',
+    default=[],
+    help='List the plans of this region. Specify option multiple times '
+         'to list the plans of several regions at once.')
+@utils.arg(
+    '--all-regions',
+    dest='all_regions',
+    action='store_true',
+    default=False,
+    help='List the plans of every region having a conveyor endpoint.')
 @utils.service_type(DEFAULT_V2V_SERVICE_TYPE)
 def do_plan_list(cs, args):
     """Get a list of all plans."""
@@ -395,16 +421,49 @@ def do_plan_list(cs, args):
         'plan_status': args.plan_status
     }
 
-    plans = cs.plans.list(search_opts=search_opts,
-                          marker=args.marker,
-                          limit=args.limit,
-                          sort_key=args.sort_key,
-                          sort_dir=args.sort_dir)
+    def list_plans(region_cs):
+        return region_cs.plans.list(search_opts=search_opts,
+                                    marker=args.marker,
+                                    limit=args.limit,
+                                    sort_key=args.sort_key,
+                                    sort_dir=args.sort_dir)
+
     key_list = ['plan_id', 'plan_name', 'plan_type', 'plan_status',
                 'task_status', 'created_at']
     if all_tenants:
         key_list.append('project_id')
-    utils.print_list(plans, key_list)
+
+    if not (args.all_regions or args.regions):
+        utils.print_list(list_plans(cs), key_list)
+        return
+
+    results = cs.fan_out(list_plans,
+                         regions=None if args.all_regions else args.regions)
+    plans = []
+    summary = []
+    for region, region_plans, e, seconds in results:
+        for plan in region_plans or []:
+            plan.region = region
+            plans.append(plan)
+        summary.append({'Region': region,
+                        'Plans': len(region_plans or []),
+                        'Seconds': "%.3f" % seconds,
+                        'Error': six.text_type(e) if e else ''})
+    # Sorted like the API does: newest first unless told otherwise. The
+    # plans missing the key come last. Reading _info rather than the
+    # attributes keeps a missing key from loading the plan again.
+    sort_key = args.sort_key or 'created_at'
+    missing = [plan for plan in plans if plan._info.get(sort_key) is None]
+    plans = sorted((plan for plan in plans
+                    if plan._info.get(sort_key) is not None),
+                   key=lambda plan: plan._info[sort_key],
+                   reverse=args.sort_dir != 'asc') + missing
+    utils.print_list(plans, ['region'] + key_list, sort=False)
+    utils.print_list(summary, ['Region', 'Plans', 'Seconds', 'Error'],
+                     sort=False)
+    if all(e is not None for _r, _p, e, _s in results):
+        raise exceptions.CommandError("Unable to list the plans of any "
+                                      "region.")
 
 
 @utils.arg('plan', metavar="<plan>", help="UUID of plan to show")
@@ -421,11 +480,13 @@ def do_plan_show(cs, args):
 def do_plan_delete(cs, args):
     """Delete a plan."""
     failure_count = 0
-    for plan in args.plan:
-        try:
-            utils.isUUID(plan, "plan")
-            cs.plans.delete(plan)
-        except Exception as e:
+
+    def delete(plan):
+        utils.isUUID(plan, "plan")
+        cs.plans.delete(plan)
+
+    for plan, _result, e in cs.bulk(delete, args.plan):
+        if e is not None:
             failure_count += 1
             print("Delete for plan %s failed: %s" % (plan, e))
     if failure_count == len(args.plan):
@@ -438,11 +499,13 @@ def do_plan_delete(cs, args):
 def do_plan_force_delete(cs, args):
     """Delete a plan."""
     failure_count = 0
-    for plan in args.plan:
-        try:
-            utils.isUUID(plan, "plan")
-            cs.plans.force_delete_plan(plan)
-        except Exception as e:
+
+    def force_delete(plan):
+        utils.isUUID(plan, "plan")
+        cs.plans.force_delete_plan(plan)
+
+    for plan, _result, e in cs.bulk(force_delete, args.plan):
+        if e is not None:
             failure_count += 1
             print("Force delete for plan %s failed: %s" % (plan, e))
     if failure_count == len(args.plan):
@@ -482,8 +545,8 @@ def do_plan_create(cs, args):
     if args.plan_name:
         plan_name = args.plan_name
     if args.plan_type and args.resources:
-        res_types = cs.resources.resource_type_list()
-        res_type_list = [t.type for t in res_types]
+        res_type_list = _get_resource_type_list(cs, args.resources,
+                                                'obj_type')
         resources = _extract_resource_argument(args.resources, res_type_list)
 
         if args.plan_type not in ["clone", "migrate"]:
@@ -516,10 +579,11 @@ def do_reset_plan_state(cs, args):
     """Explicitly updates the plan state."""
     failure_flag = False
 
-    for plan in args.plan:
-        try:
-            utils.find_plan(cs, plan).reset_plan_state(args.state)
-        except Exception as e:
+    def reset_state(plan):
+        utils.find_plan(cs, plan).reset_plan_state(args.state)
+
+    for plan, _result, e in cs.bulk(reset_state, args.plan):
+        if e is not None:
             failure_flag = True
             msg = "Reset state for plan %s failed: %s" % (plan, e)
             print(msg)
@@ -594,6 +658,141 @@ def do_config_register(cs, args):
         raise exceptions.CommandError(msg)
 
 
+BENCH_OPERATIONS = ('plan-list', 'plan-show', 'resource-list',
+                    'resource-show', 'topology')
+
+
+@utils.arg(
+    '--mix',
+    metavar='<operation=weight[,...]>',
+    default='plan-list=3,plan-show=3,resource-list=2,resource-show=1,'
+            'topology=1',
+    help='Weighted operations to run, among %(ops)s. '
+         'Default=%%(default)s.' % {'ops': ', '.join(BENCH_OPERATIONS)})
+@utils.arg(
+    '--duration',
+    metavar='<seconds>',
+    type=float,
+    default=10,
+    help='Seconds to generate load for. Default=10.')
+@utils.arg(
+    '--concurrency',
+    metavar='<workers>',
+    type=int,
+    default=10,
+    help='Most requests in flight. Default=10, the size of the connection '
+         'pool of the client.')
+@utils.arg(
+    '--rate',
+    metavar='<requests/s>',
+    type=float,
+    default=None,
+    help='Start requests at this rate instead of back to back.')
+@utils.arg(
+    '--resource-type',
+    metavar='<type>',
+    default='OS::Nova::Server',
+    help='Type of the resources listed and shown. '
+         'Default=OS::Nova::Server.')
+@utils.arg(
+    '--az-map',
+    metavar='<src_az=dst_az>',
+    default=None,
+    help='Availability zone map of the topology builds.')
+@utils.arg(
+    '--seed',
+    metavar='<seed>',
+    type=int,
+    default=None,
+    help='Seed of the choice of the operations and of their targets.')
+@utils.service_type(DEFAULT_V2V_SERVICE_TYPE)
+def do_bench(cs, args):
+    """Generate load on the conveyor API and report its latency."""
+    mix = []
+    for item in args.mix.split(','):
+        name, _sep, weight = item.partition('=')
+        name = name.strip()
+        if name not in BENCH_OPERATIONS:
+            raise exceptions.CommandError(
+                "Unknown operation %s, must be one of %s."
+                % (name, ', '.join(BENCH_OPERATIONS)))
+        try:
+            weight = float(weight or 1)
+        except ValueError:
+            raise exceptions.CommandError("Invalid weight of %s: %s."
+                                          % (name, weight))
+        if weight > 0:
+            mix.append((name, weight))
+    names = [name for name, _weight in mix]
+
+    az_map = {}
+    if args.az_map:
+        src_az, _sep, dst_az = args.az_map.partition('=')
+        az_map[src_az] = dst_az
+
+    # The targets of the show and topology operations, looked up once.
+    rng = random.Random(args.seed)
+    plan_ids = []
+    resource_ids = []
+    if 'plan-show' in names or 'topology' in names:
+        plan_ids = [plan.plan_id for plan in cs.plans.list(limit=100)]
+        if not plan_ids:
+            raise exceptions.CommandError("No plan to show or build the "
+                                          "topology of.")
+    if 'resource-show' in names:
+        resource_ids = [resource.id for resource in cs.resources.list(
+            {'type': args.resource_type})]
+        if not resource_ids:
+            raise exceptions.CommandError("No %s resource to show."
+                                          % args.resource_type)
+
+    functions = {
+        'plan-list': lambda: cs.plans.list(),
+        'plan-show': lambda: cs.plans.get(rng.choice(plan_ids)),
+        'resource-list': lambda: cs.resources.list(
+            {'type': args.resource_type}),
+        'resource-show': lambda: cs.resources.get_resource_detail(
+            args.resource_type, rng.choice(resource_ids)),
+        'topology': lambda: cs.resources.build_resources_topo(
+            rng.choice(plan_ids), az_map),
+    }
+    try:
+        generator = loadgen.LoadGenerator(
+            [(name, weight, functions[name]) for name, weight in mix],
+            duration=args.duration, concurrency=args.concurrency,
+            rate=args.rate, seed=args.seed)
+    except ValueError as e:
+        raise exceptions.CommandError(six.text_type(e))
+    report = generator.run()
+
+    def ms(seconds):
+        return '' if seconds is None else '%.1f' % (seconds * 1000)
+
+    rows = []
+    for name in names + [None]:
+        summary = report['operations'][name]
+        rows.append({'Operation': name or 'total',
+                     'Requests': summary['requests'],
+                     'Errors': summary['errors'],
+                     'Req/s': '%.1f' % summary['throughput'],
+                     'p50 (ms)': ms(summary['p50']),
+                     'p90 (ms)': ms(summary['p90']),
+                     'p99 (ms)': ms(summary['p99']),
+                     'Max (ms)': ms(summary['max'])})
+    utils.print_list(rows, ['Operation', 'Requests', 'Errors', 'Req/s',
+                            'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'Max (ms)'],
+                     sort=False)
+    if report['errors']:
+        utils.print_list([{'Operation': name, 'Error': error, 'Count': count}
+                          for (name, error), count
+                          in sorted(report['errors'].items())],
+                         ['Operation', 'Error', 'Count'], sort=False)
+    print("%.1f seconds, concurrency %s%s." % (
+        report['elapsed'], args.concurrency,
+        ', target rate %s/s, %s requests started late because every worker '
+        'was busy' % (args.rate, report['late']) if args.rate else ''))
+
+
 def _extract_plan_resource_update_args(res_args):
     res = []
 
@@ -632,6 +831,22 @@ def _extract_plan_resource_update_args(res_args):
     return res
 
 
+def _get_resource_type_list(cs, arg_res, type_key):
+    """Return the supported resource types for validating arg_res.
+
+    The types come from the client side cache; it is refreshed once when
+    one of the requested types is unknown, in case the cache predates it.
+    """
+    res_type_list = [t.type for t in cs.resources.resource_type_list()]
+    for res in arg_res:
+        for param in res.split(","):
+            k, _sep, v = param.partition("=")
+            if k == type_key and v and v not in res_type_list:
+                res_types = cs.resources.resource_type_list(refresh=True)
+                return [t.type for t in res_types]
+    return res_type_list
+
+
 def _extract_resource_argument(arg_res, res_type_list):
     resources = []
 